@@ -7,7 +7,14 @@ to establish a stable environment for the application.
 
 :Contains:
     :Function:
-        - install_and_import
+        - bootstrap
+        - install_packages
+        - is_installed
+        - main
+        - missing_packages
+        - run_gui
+        - run_headless
+        - run_rollback
 """
 
 ###############################################################################
@@ -18,112 +25,223 @@ to establish a stable environment for the application.
 # for details.
 ###############################################################################
 
+import argparse
 import importlib
+import importlib.metadata
+import importlib.util
 import os
+import site
 import subprocess
 import sys
+import tarfile
+import time
+
+from mia_install_backends import select_backend
+from mia_install_trace import run_command
+
+# Used to measure the time between the launch and the display of the window
+LAUNCH_TIME = time.perf_counter()
 
 # We use this module only in user mode.
 os.environ["MIA_DEV_MODE"] = "0"
 
+# Packages required before the installation widget can be displayed.
+# Keys are the PyPi distribution names, values the Python import names.
+REQUIRED_PACKAGES = {
+    "PyQt5": "PyQt5",
+    "pyyaml": "yaml",
+    "packaging": "packaging",
+    "cryptography": "cryptography",
+}
 
-def install_and_import(module_name):
-    """Tries to import the specified module.
 
-    If the module is not found, it installs the module using pip and then
-    imports it.
-    If running inside a virtual environment, it installs the module there;
-    otherwise, it adds the '--user' flag for a user-level installation.
+def is_installed(package):
+    """Checks whether a package is installed, without importing it.
 
-    Args:
-        module_name (str): The name of the module to import or install.
+    The check is done in two steps: first the import machinery is asked
+    whether a module spec can be found for the import name (this does not
+    execute the module), then the distribution metadata is read to make
+    sure the package was actually installed (and not just a stray folder
+    of the same name lying on the Python path).
 
-    Raises:
-        subprocess.CalledProcessError: If the pip installation fails.
-        ImportError: If the module cannot be imported even after installation.
+    Args:
+        package (str): The PyPi name of the package (e.g. 'pyyaml').
 
-    Example:
-        install_and_import('pyyaml')
-        install_and_import('requests')
+    Returns:
+        bool: True if the package is installed, False otherwise.
 
     Note:
         Some module names differ between PyPi and Python import names,
-        such as "pyyaml" (PyPi) vs. "yaml" (Python).
+        such as "pyyaml" (PyPi) vs. "yaml" (Python). The mapping is taken
+        from REQUIRED_PACKAGES.
     """
-    import_name = "yaml" if module_name == "pyyaml" else module_name
+    import_name = REQUIRED_PACKAGES.get(package, package)
 
     try:
-        # Try to import the module
-        importlib.import_module(import_name)
-
-    except ImportError:
-        # Module not found, install it
-        print(f"{module_name} not found. Installing...")
-
-        # Check if running in a virtual environment
-        is_venv = sys.prefix != sys.base_prefix
-        pip_install_command = [
-            sys.executable,
-            "-m",
-            "pip",
-            "install",
-            module_name,
-        ]
-
-        # Add '--user' flag only if not in a virtual environment
-        if not is_venv:
-            pip_install_command.insert(4, "--user")
-
-        subprocess.check_call(pip_install_command)
-
-        # Try to import the module again after installation
-        try:
-            importlib.import_module(import_name)
 
-        except ImportError:
-            raise ImportError(
-                f"Failed to import {module_name} after " f"installation."
-            )
+        if importlib.util.find_spec(import_name) is None:
+            return False
 
+    except (ImportError, ValueError):
+        return False
 
-if __name__ == "__main__":
-    print("Please wait, installation in progress! ...\n")
-    # List of required packages
-    packages = ["PyQt5", "pyyaml", "packaging", "cryptography"]
+    try:
+        importlib.metadata.version(package)
+
+    except importlib.metadata.PackageNotFoundError:
+        return False
+
+    return True
 
-    for package in packages:
+
+def missing_packages(packages):
+    """Returns the packages that are not installed yet.
+
+    Args:
+        packages (list): The PyPi names of the packages to check.
+
+    Returns:
+        list: The PyPi names of the packages that need to be installed,
+              in the order they were given.
+    """
+    return [package for package in packages if not is_installed(package)]
+
+
+def install_packages(packages, wheel_cache=None, offline=False):
+    """Installs several packages with a single pip call.
+
+    Installing all the missing packages at once means that pip is started
+    only once and that its resolver runs only once for the whole set.
+    The command is built by the preferred installer backend (see
+    `mia_install_backends.select_backend`): if running inside a virtual
+    environment, the packages are installed there; otherwise, the '--user'
+    flag is added for a user-level installation.
+
+    When a wheel cache is given, the packages are installed from the wheels
+    found in it, without looking at PyPi. Only if some wheels are missing
+    from the cache, the binary wheels for the current platform are first
+    downloaded into it, unless the installation is offline.
+
+    Args:
+        packages (list): The PyPi names of the packages to install.
+        wheel_cache (str): The path to a local folder of wheels.
+        offline (bool): If True, the packages are only installed from the
+                        wheel cache, which is never filled from PyPi.
+
+    Raises:
+        subprocess.CalledProcessError: If the pip installation fails.
+        ImportError: If a package cannot be found even after installation.
+    """
+    backend = select_backend()
+    pip_install_command = backend.command("install")
+
+    if wheel_cache is None:
+        run_command(pip_install_command + list(packages), check=True)
+
+    else:
+        pip_install_command += ["--no-index", "--find-links", wheel_cache]
 
         try:
-            install_and_import(package)
+            run_command(pip_install_command + list(packages), check=True)
 
         except subprocess.CalledProcessError:
-            print(
-                f"Failed to install {package}. Please check your "
-                f"pip installation."
-            )
 
-        except ImportError:
-            print(
-                f"Could not import {package} after installation. "
-                "Please check compatibility or try reinstalling manually."
+            if offline:
+                raise
+
+            print(f"Downloading the missing wheels into {wheel_cache}...")
+            run_command(
+                backend.command(
+                    "download",
+                    "--only-binary=:all:",
+                    "--dest",
+                    wheel_cache,
+                    *packages,
+                ),
+                check=True,
             )
+            run_command(pip_install_command + list(packages), check=True)
+
+    # The import system caches directory listings, and the user site
+    # directory is not on sys.path if it did not exist at startup
+    importlib.invalidate_caches()
 
-    # Clear specific packages from sys.modules to avoid conflicts
-    for key in list(sys.modules):
+    if not backend.is_venv and site.ENABLE_USER_SITE:
+        user_site = site.getusersitepackages()
 
-        if key.startswith("PyQt5") or key in {
-            "yaml",
-            "packaging",
-            "cryptography",
-        }:
-            del sys.modules[key]
+        if user_site not in sys.path and os.path.isdir(user_site):
+            site.addsitedir(user_site)
+
+    still_missing = missing_packages(packages)
+
+    if still_missing:
+        raise ImportError(
+            f"Failed to find {', '.join(still_missing)} after installation."
+        )
+
+
+def bootstrap(packages, wheel_cache=None, offline=False):
+    """Makes sure that all the given packages are installed.
+
+    All packages are checked without being imported, then every missing
+    package is installed in one go.
+
+    Args:
+        packages (list): The PyPi names of the required packages.
+        wheel_cache (str): The path to a local folder of wheels to install
+                           the missing packages from (see
+                           `install_packages`).
+        offline (bool): If True, the missing packages are only installed
+                        from the wheel cache.
+
+    Returns:
+        float: The time, in seconds, taken by the bootstrap.
+
+    Raises:
+        subprocess.CalledProcessError: If the pip installation fails.
+        ImportError: If a package cannot be found even after installation.
+
+    Example:
+        bootstrap(['pyyaml', 'packaging'])
+    """
+    start = time.perf_counter()
+    missing = missing_packages(packages)
+
+    if missing:
+        print(f"{', '.join(missing)} not found. Installing...")
+        install_packages(missing, wheel_cache, offline)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Bootstrap completed in {elapsed:.2f} s "
+        f"({len(missing)} package(s) installed).\n"
+    )
+    return elapsed
+
+
+def run_gui(exit_when_shown=False, answers=None):
+    """Initializes and displays the Mia installation widget.
+
+    The time elapsed between the launch of the installer and the display of
+    the window is printed once the event loop has started.
+
+    Args:
+        exit_when_shown (bool): If True, the application quits as soon as
+                                the window is displayed (used to measure
+                                the launch-to-window time).
+        answers (dict): The installation parameters not set in the widget
+                        (e.g. the wheelhouse).
+
+    Returns:
+        int: The exit status of the Qt application.
+    """
 
     try:
         import crypt  # noqa: F401
 
         import packaging  # noqa: F401
         import yaml  # noqa: F401
-        from PyQt5 import QtWidgets
+        from PyQt5 import QtCore, QtWidgets
 
         # FIXME: Replace 'crypt' with updated libraries like legacycrypt,
         #        bcrypt, argon2-cffi, hashlib, and passlib when upgrading
@@ -141,7 +259,7 @@ if __name__ == "__main__":
 
     # Initialize and display Mia installation widget
     app = QtWidgets.QApplication(sys.argv)
-    mia_install_widget = MIAInstallWidget()
+    mia_install_widget = MIAInstallWidget(answers)
 
     # Center widget on screen
     frame_gm = mia_install_widget.frameGeometry()
@@ -155,4 +273,245 @@ if __name__ == "__main__":
     mia_install_widget.move(frame_gm.topLeft())
 
     mia_install_widget.show()
-    app.exec()
+
+    def report_window_shown():
+        """Prints the launch-to-window time."""
+        print(
+            f"Window displayed {time.perf_counter() - LAUNCH_TIME:.2f} s "
+            f"after launch."
+        )
+
+        if exit_when_shown:
+            app.quit()
+
+    QtCore.QTimer.singleShot(0, report_window_shown)
+    return app.exec()
+
+
+def _create_installer(answers_file=None, answers=None):
+    """Creates the installation engine from the installation parameters.
+
+    Args:
+        answers_file (str): The path to the YAML answers file (see
+                            `mia_install_engine.load_answers`). If None,
+                            the default parameters are used.
+        answers (dict): Installation parameters overriding those of the
+                        answers file.
+
+    Returns:
+        MIAInstaller: The installation engine, or None if the answers file
+                      cannot be read or if the parameters are invalid (the
+                      error is printed).
+    """
+
+    try:
+        import yaml
+
+        from mia_install_engine import MIAInstaller, load_answers
+
+    except ImportError as e:
+        sys.exit(
+            f"\n{e}...\n\nPython package environment was not correctly "
+            "updated!\n"
+        )
+
+    try:
+        return MIAInstaller(
+            {
+                **(load_answers(answers_file) if answers_file else {}),
+                **(answers or {}),
+            }
+        )
+
+    except (OSError, yaml.YAMLError, ValueError) as e:
+        # The YAML errors span several lines
+        print(f"Invalid installation parameters: {' '.join(str(e).split())}")
+        return None
+
+
+def run_headless(answers_file=None, answers=None):
+    """Installs Mia without any graphical user interface.
+
+    Neither PyQt5 nor a display are needed: all the installation parameters
+    are read from the answers file.
+
+    Args:
+        answers_file (str): The path to the YAML answers file (see
+                            `mia_install_engine.load_answers`). If None,
+                            the default parameters are used.
+        answers (dict): Installation parameters overriding those of the
+                        answers file.
+
+    Returns:
+        int: 0 if the installation has been completed, 1 otherwise.
+    """
+    installer = _create_installer(answers_file, answers)
+
+    if installer is None:
+        return 1
+
+    return 0 if installer.install() else 1
+
+
+def run_rollback(answers_file=None, answers=None):
+    """Restores the configuration folder replaced by a staged installation.
+
+    Args:
+        answers_file (str): The path to the YAML answers file (see
+                            `mia_install_engine.load_answers`), giving the
+                            configuration folder. If None, the default
+                            parameters are used.
+        answers (dict): Installation parameters overriding those of the
+                        answers file.
+
+    Returns:
+        int: 0 if the previous configuration folder has been restored, 1
+             otherwise.
+    """
+    installer = _create_installer(answers_file, answers)
+
+    if installer is None:
+        return 1
+
+    try:
+        return 0 if installer.rollback() else 1
+
+    except OSError as e:
+        print(f"The previous configuration folder cannot be restored: {e}")
+        return 1
+
+
+def main(argv=None, wheel_cache=None):
+    """Bootstraps the required packages and runs the installation.
+
+    Args:
+        argv (list): The command line arguments (sys.argv[1:] if None).
+        wheel_cache (str): The path to a local folder of wheels to install
+                           the missing packages from (see
+                           `install_packages`).
+
+    Returns:
+        int: The exit status of the installation.
+    """
+    parser = argparse.ArgumentParser(description="Installer for populse_mia.")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="install without graphical user interface (PyQt5 and a "
+        "display are not needed)",
+    )
+    parser.add_argument(
+        "--answers",
+        metavar="FILE",
+        help="YAML file with the installation parameters (headless mode "
+        "only)",
+    )
+    offline = parser.add_mutually_exclusive_group()
+    offline.add_argument(
+        "--wheelhouse",
+        metavar="DIR",
+        help="install all the Python packages from the wheels of DIR, "
+        "without any index lookup (no internet access is needed)",
+    )
+    offline.add_argument(
+        "--from-bundle",
+        metavar="ARCHIVE",
+        help="install everything from an offline bundle built by "
+        "mia_install_bundle.py (no internet access is needed)",
+    )
+    parser.add_argument(
+        "--lockfile",
+        metavar="FILE",
+        help="install the exact packages of FILE without dependency "
+        "resolution, or record FILE after the installation if it does not "
+        "exist",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="export the timing of the installation steps and commands to "
+        "FILE, a Chrome trace file (to open with https://ui.perfetto.dev)",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="build the new configuration folder aside and switch it in "
+        "only once the installation is completed, keeping the previous one "
+        "for --rollback",
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="restore the configuration folder replaced by the last staged "
+        "installation, and exit",
+    )
+    parser.add_argument(
+        "--startup-time",
+        action="store_true",
+        help="quit as soon as the window is displayed (used to measure the "
+        "launch-to-window time)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.answers and not (args.headless or args.rollback):
+        parser.error(
+            "--answers can only be used with --headless or --rollback"
+        )
+
+    print("Please wait, installation in progress! ...\n")
+    packages = list(REQUIRED_PACKAGES)
+    answers = dict()
+
+    if args.headless or args.rollback:
+        packages.remove("PyQt5")
+
+    if args.from_bundle:
+        from mia_install_bundle import unpack_bundle
+
+        try:
+            answers.update(unpack_bundle(args.from_bundle))
+
+        except (OSError, ValueError, tarfile.TarError) as e:
+            print(f"The bundle cannot be used: {e}")
+            return 1
+
+    elif args.wheelhouse:
+        answers["wheelhouse"] = os.path.abspath(args.wheelhouse)
+
+    if answers:
+        wheel_cache = answers["wheelhouse"]
+
+    offline = bool(answers)
+
+    if args.lockfile:
+        answers["lockfile"] = os.path.abspath(args.lockfile)
+
+    if args.staged:
+        answers["staged"] = True
+
+    if args.trace:
+        answers["trace_file"] = os.path.abspath(args.trace)
+
+    try:
+        bootstrap(packages, wheel_cache, offline)
+
+    except subprocess.CalledProcessError:
+        print(
+            "Failed to install the required packages. Please check your "
+            "pip installation."
+        )
+
+    except ImportError as e:
+        print(f"{e}\nPlease check compatibility or try reinstalling manually.")
+
+    if args.rollback:
+        return run_rollback(args.answers, answers)
+
+    if args.headless:
+        return run_headless(args.answers, answers)
+
+    return run_gui(args.startup_time, answers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""The package installer backends used during mia's installation.
+
+All the package operations of the installer (install, uninstall, wheel
+builds and version queries) go through a backend, which builds the command
+lines for the current Python environment. This is also the only place
+where the `--user` flag is added, when not running in a virtual
+environment:
+
+    backend = select_backend()
+    subprocess.check_call(backend.command("install", "populse_mia"))
+
+Two backends are available:
+    - pip, always available.
+    - uv, a much faster replacement of pip's install and uninstall
+      commands (with the same upgrade strategy), used automatically when
+      its executable is found and when running in a virtual environment
+      (uv cannot install in the user site-packages).
+
+The backends can be compared on the resolution of a set of requirements:
+
+    python3 mia_install_backends.py --benchmark populse_mia
+
+This module only uses the Python standard library.
+
+:Contains:
+    :Class:
+        - PipBackend
+        - UvBackend
+    :Function:
+        - benchmark_backends
+        - main
+        - select_backend
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+from mia_install_utils import installed_version
+
+# The pip install options followed by a value
+VALUE_OPTIONS = (
+    "-c",
+    "--constraint",
+    "-f",
+    "--find-links",
+    "-i",
+    "--index-url",
+    "--extra-index-url",
+    "-r",
+    "--requirement",
+)
+
+
+def _upgrade_packages(args):
+    """Replaces pip's --upgrade option by uv's --upgrade-package options.
+
+    uv's --upgrade upgrades all the dependencies of the requirements, while
+    pip's only upgrades a dependency when the requirements need it: the
+    requirements themselves are upgraded instead, one --upgrade-package
+    option each (the name of a local wheel is read from its file name).
+
+    Args:
+        args (tuple): The arguments of a pip install command.
+
+    Returns:
+        list: The arguments of the uv install command.
+    """
+    options = []
+    packages = []
+    values = iter(args)
+
+    for arg in values:
+
+        if arg in ("-U", "--upgrade"):
+            continue
+
+        options.append(arg)
+
+        if arg in VALUE_OPTIONS:
+            options.append(next(values, ""))
+
+        elif not arg.startswith("-"):
+
+            if arg.endswith(".whl"):
+                packages.append(os.path.basename(arg).split("-")[0])
+
+            else:
+                packages.append(re.match(r"[\w.-]*", arg).group(0))
+
+    for package in packages:
+        options += ["--upgrade-package", package]
+
+    return options
+
+
+class PipBackend:
+    """The pip backend, run with the current Python interpreter.
+
+    :Contains:
+        :Method:
+            - __init__
+            - available
+            - command
+            - query
+    """
+
+    name = "pip"
+
+    def __init__(self):
+        """Constructor"""
+        # Check if running in a virtual environment
+        self.is_venv = sys.prefix != sys.base_prefix
+
+    @classmethod
+    def available(cls):
+        """Checks whether the backend can be used.
+
+        Returns:
+            bool: True if the backend can be used in the current Python
+                  environment.
+        """
+        return True
+
+    def command(self, command, *args):
+        """Returns the command line of a package operation.
+
+        The `--user` flag is added to the install commands if not running
+        in a virtual environment, and the uninstall commands do not ask for
+        confirmation.
+
+        Args:
+            command (str): The pip command (e.g. 'install', 'uninstall',
+                           'wheel' or 'download').
+            *args (str): The arguments of the command.
+
+        Returns:
+            list: The command line.
+        """
+        pip_command = [sys.executable, "-m", "pip", command]
+
+        # Add '--user' flag only if not in a virtual environment
+        if command == "install" and not self.is_venv:
+            pip_command.append("--user")
+
+        if command == "uninstall":
+            pip_command.append("--yes")
+
+        return pip_command + list(args)
+
+    def query(self, package):
+        """Returns the installed version of a package.
+
+        Args:
+            package (str): The PyPi name of the package.
+
+        Returns:
+            str: The installed version, or None if the package is not
+                 installed.
+        """
+        return installed_version(package)
+
+
+class UvBackend(PipBackend):
+    """The uv backend, for the install and uninstall commands.
+
+    The other commands (e.g. 'wheel', or the install reports used to record
+    a lockfile) are run by pip, as uv does not provide them.
+
+    :Contains:
+        :Method:
+            - available
+            - command
+            - executable
+    """
+
+    name = "uv"
+
+    # The commands run by uv
+    COMMANDS = ("install", "uninstall")
+
+    @staticmethod
+    def executable():
+        """Returns the path to the uv executable.
+
+        Returns:
+            str: The path to uv, or None if it is not found.
+        """
+        return shutil.which("uv")
+
+    @classmethod
+    def available(cls):
+        """Checks whether the backend can be used.
+
+        Returns:
+            bool: True if uv is found and the current Python environment is
+                  a virtual environment.
+        """
+        return sys.prefix != sys.base_prefix and cls.executable() is not None
+
+    def command(self, command, *args):
+        """Returns the command line of a package operation.
+
+        The `--upgrade` option of an install command only upgrades the
+        requirements themselves, as pip's (see `_upgrade_packages`).
+
+        Args:
+            command (str): The pip command (e.g. 'install').
+            *args (str): The arguments of the command.
+
+        Returns:
+            list: The command line, run by uv for the current Python
+                  interpreter if uv provides the command, by pip otherwise.
+        """
+
+        if command not in self.COMMANDS or "--report" in args:
+            return super().command(command, *args)
+
+        if command == "install" and ("--upgrade" in args or "-U" in args):
+            args = _upgrade_packages(args)
+
+        return [
+            self.executable(),
+            "pip",
+            command,
+            "--python",
+            sys.executable,
+            *args,
+        ]
+
+
+# The available backends, from the preferred one
+BACKENDS = {"uv": UvBackend, "pip": PipBackend}
+
+
+def select_backend(name="auto"):
+    """Returns the backend to use.
+
+    Args:
+        name (str): The name of the backend, or "auto" for the preferred
+                    available one.
+
+    Returns:
+        PipBackend: The backend.
+
+    Raises:
+        ValueError: If the backend is unknown or not available.
+    """
+
+    if name == "auto":
+        return next(
+            backend() for backend in BACKENDS.values() if backend.available()
+        )
+
+    if name not in BACKENDS or not BACKENDS[name].available():
+        raise ValueError(f"The '{name}' installer backend is not available.")
+
+    return BACKENDS[name]()
+
+
+def benchmark_backends(requirements, runs=1):
+    """Compares the available backends on a set of requirements.
+
+    Each backend resolves the requirements without installing anything
+    (`install --dry-run`), which measures the startup, index access and
+    dependency resolution time.
+
+    Args:
+        requirements (list): The requirements (e.g. ['populse_mia']).
+        runs (int): The number of runs of each backend.
+
+    Returns:
+        dict: For each available backend name, the best time, in seconds.
+
+    Raises:
+        subprocess.CalledProcessError: If a backend fails.
+    """
+    times = dict()
+
+    for name, backend in BACKENDS.items():
+
+        if not backend.available():
+            continue
+
+        command = backend().command("install", "--dry-run", *requirements)
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, capture_output=True)
+            elapsed = time.perf_counter() - start
+            times[name] = min(times.get(name, elapsed), elapsed)
+
+        print(f"{name}: {times[name]:.2f} s")
+
+    return times
+
+
+def main(argv=None):
+    """Benchmarks the installer backends from the command line.
+
+    Args:
+        argv (list): The command line arguments (sys.argv[1:] if None).
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare the installer backends."
+    )
+    parser.add_argument(
+        "--benchmark",
+        nargs="+",
+        default=["populse_mia"],
+        metavar="REQUIREMENT",
+        help="requirements to resolve (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=1,
+        help="number of runs of each backend (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    benchmark_backends(args.benchmark, args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""The offline bundles of mia's installation.
+
+A bundle is a single compressed archive containing everything the
+installation downloads: the wheels of all the Python packages (the
+bootstrap packages, populse_mia and its dependencies, soma-base,
+soma-workflow and capsul), and git bundles of the mri_conv, miaresources,
+soma-base, soma-workflow and capsul repositories. A manifest, stored first
+in the archive, lists the sha256 checksum of each file:
+
+    python3 mia_install_bundle.py --output mia_bundle.tar.gz
+
+On a machine without internet access, the bundle is unpacked (by streaming,
+the checksums being verified on the fly) and the installation then uses its
+wheels and git bundles instead of PyPi and the git servers:
+
+    python3 install_mia.py --from-bundle mia_bundle.tar.gz
+
+The unpacking only uses the Python standard library, so that it can be done
+before the installer's dependencies are bootstrapped.
+
+:Contains:
+    :Function:
+        - build_bundle
+        - extract_bundle
+        - main
+        - unpack_bundle
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tarfile
+import tempfile
+import time
+
+from mia_install_utils import cache_dir, file_sha256
+
+# The version of the bundle format
+BUNDLE_FORMAT = 1
+
+# The name of the manifest, which is the first member of the archive
+MANIFEST_NAME = "manifest.json"
+
+# The size of the chunks read while streaming the archive
+CHUNK_SIZE = 1024**2
+
+
+def build_bundle(output="mia_bundle.tar.gz", answers=None):
+    """Builds an offline bundle of the installation.
+
+    The bundle is built with the installation engine itself:
+        1. A git bundle of each repository is written from the git mirror
+           cache (see `mia_install_git.create_bundle`).
+        2. soma-base, soma-workflow and capsul are cloned from these git
+           bundles (see `MIAInstaller.git_clone`).
+        3. The wheels of all the Python packages are built (or downloaded)
+           with a single `pip wheel` call, so that their dependencies are
+           resolved only once.
+        4. The manifest and all the files are written to a gzip-compressed
+           tar archive.
+
+    Args:
+        output (str): The path of the archive to create.
+        answers (dict): The installation parameters (see
+                        `mia_install_engine.DEFAULT_ANSWERS`) used to build
+                        the bundle.
+
+    Returns:
+        str: The path of the created archive.
+
+    Raises:
+        subprocess.CalledProcessError: If a git or pip command fails.
+    """
+    from install_mia import REQUIRED_PACKAGES
+    from mia_install_engine import REPOSITORIES, SOMA_REPOS, MIAInstaller
+    from mia_install_git import bundle_name, create_bundle
+
+    staging = tempfile.mkdtemp()
+
+    try:
+        git_dir = os.path.join(staging, "git")
+        wheel_dir = os.path.join(staging, "wheels")
+        os.makedirs(git_dir)
+        installer = MIAInstaller({**(answers or {}), "git_bundles": git_dir})
+        repositories = dict()
+
+        for name, url in {**REPOSITORIES, **SOMA_REPOS}.items():
+            print(f"Bundling {url}...")
+            head = create_bundle(url, os.path.join(git_dir, bundle_name(url)))
+            repositories[name] = {
+                "url": url,
+                "bundle": f"git/{bundle_name(url)}",
+                "head": head,
+            }
+
+        sources = []
+
+        for package in SOMA_REPOS:
+            sources.append(os.path.join(staging, "src", package))
+            installer.git_clone(SOMA_REPOS[package], sources[-1])
+
+        # setuptools and wheel are needed to build the MATLAB Engine API
+        subprocess.check_call(
+            installer.pip_command(
+                "wheel",
+                "--wheel-dir",
+                wheel_dir,
+                "populse_mia",
+                *REQUIRED_PACKAGES,
+                "setuptools",
+                "wheel",
+                *sources,
+            )
+        )
+        files = dict()
+
+        for folder in ("wheels", "git"):
+
+            for name in sorted(os.listdir(os.path.join(staging, folder))):
+                files[f"{folder}/{name}"] = file_sha256(
+                    os.path.join(staging, folder, name)
+                )
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(
+                timespec="seconds"
+            ),
+            "python": sys.implementation.cache_tag,
+            "platform": sysconfig.get_platform(),
+            "repositories": repositories,
+            "files": files,
+        }
+        data = json.dumps(manifest, indent=2).encode("utf8")
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(data)
+        info.mtime = int(time.time())
+
+        with tarfile.open(output, "w:gz") as tar:
+            tar.addfile(info, io.BytesIO(data))
+
+            for name in files:
+                tar.add(os.path.join(staging, *name.split("/")), name)
+
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    print(
+        f"{output} has been created "
+        f"({os.path.getsize(output) / 1024 ** 2:.1f} MB, "
+        f"{len(files) - len(repositories)} wheel(s), "
+        f"{len(repositories)} git bundle(s))."
+    )
+    return output
+
+
+def extract_bundle(archive, destination):
+    """Extracts an offline bundle, verifying its checksums.
+
+    The archive is read as a stream: each file is written to its final
+    place while its checksum is computed, without any temporary copy of the
+    archive or of its contents.
+
+    Args:
+        archive (str): The path to the bundle.
+        destination (str): The folder to extract the bundle to.
+
+    Returns:
+        dict: The manifest of the bundle.
+
+    Raises:
+        ValueError: If the archive is not a valid bundle, or if a checksum
+                    does not match.
+        tarfile.TarError: If the archive cannot be read.
+    """
+    manifest = None
+    extracted = set()
+
+    with tarfile.open(archive, "r|gz") as tar:
+
+        for member in tar:
+
+            if manifest is None:
+
+                if member.name != MANIFEST_NAME:
+                    raise ValueError(f"'{archive}' is not a Mia bundle.")
+
+                manifest = json.load(tar.extractfile(member))
+
+                if manifest.get("format") != BUNDLE_FORMAT:
+                    raise ValueError(
+                        f"Unsupported bundle format: {manifest.get('format')}."
+                    )
+
+                with open(
+                    os.path.join(destination, MANIFEST_NAME),
+                    "w",
+                    encoding="utf8",
+                ) as stream:
+                    json.dump(manifest, stream, indent=2)
+
+                continue
+
+            checksum = manifest["files"].get(member.name)
+            parts = member.name.split("/")
+
+            if (
+                checksum is None
+                or not member.isfile()
+                or ".." in parts
+                or os.path.isabs(member.name)
+            ):
+                raise ValueError(
+                    f"Unexpected member '{member.name}' in '{archive}'."
+                )
+
+            path = os.path.join(destination, *parts)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            digest = hashlib.sha256()
+
+            with tar.extractfile(member) as source, open(path, "wb") as dest:
+
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dest.write(chunk)
+
+            if digest.hexdigest() != checksum:
+                raise ValueError(f"Checksum mismatch for '{member.name}'.")
+
+            extracted.add(member.name)
+
+    if manifest is None:
+        raise ValueError(f"'{archive}' is not a Mia bundle.")
+
+    missing = set(manifest["files"]) - extracted
+
+    if missing:
+        raise ValueError(
+            f"Missing file(s) in '{archive}': {', '.join(sorted(missing))}."
+        )
+
+    return manifest
+
+
+def unpack_bundle(archive):
+    """Unpacks an offline bundle into the installer's cache.
+
+    Args:
+        archive (str): The path to the bundle.
+
+    Returns:
+        dict: The installation parameters (see
+              `mia_install_engine.DEFAULT_ANSWERS`) to install from the
+              bundle: the wheelhouse and the git_bundles folders.
+
+    Raises:
+        ValueError: If the archive is not a valid bundle, or if a checksum
+                    does not match.
+        tarfile.TarError: If the archive cannot be read.
+    """
+    name = os.path.basename(archive).split(".")[0]
+    destination = cache_dir("bundles", name)
+    shutil.rmtree(destination)
+    os.makedirs(destination)
+    print(f"Unpacking {archive}...")
+    manifest = extract_bundle(archive, destination)
+
+    if (manifest["python"], manifest["platform"]) != (
+        sys.implementation.cache_tag,
+        sysconfig.get_platform(),
+    ):
+        print(
+            f"Warning: the bundle has been built for {manifest['python']} "
+            f"on {manifest['platform']}, some wheels may not be compatible."
+        )
+
+    return {
+        "wheelhouse": os.path.join(destination, "wheels"),
+        "git_bundles": os.path.join(destination, "git"),
+    }
+
+
+def main(argv=None):
+    """Builds an offline bundle from the command line.
+
+    Args:
+        argv (list): The command line arguments (sys.argv[1:] if None).
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build an offline bundle of the Mia installation."
+    )
+    parser.add_argument(
+        "--output",
+        default="mia_bundle.tar.gz",
+        help="path of the archive to create (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    build_bundle(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2848 @@
+"""The Qt-free engine used for mia's installation and configuration.
+
+This module contains all the installation steps, independently of any
+graphical user interface. The installation widget is one front end to it,
+the command line is another one:
+
+    python install_mia.py --headless --answers site.yml
+
+It can also be used directly from Python:
+
+    from mia_install_engine import MIAInstaller
+    MIAInstaller({"mia_config_path": "/opt/mia"}).install()
+
+The installation parameters are given as an "answers" dictionary (or YAML
+file), whose keys are those of DEFAULT_ANSWERS.
+
+:Contains:
+    :Class:
+        - MIAInstaller
+    :Function:
+        - load_answers
+        - load_install_state
+        - run_step_graph
+        - save_install_state
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+
+import asyncio
+import glob
+import hashlib
+import importlib
+import importlib.metadata
+import json
+import os
+import re
+import shutil
+import site
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.request import urlopen
+
+import yaml
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.version import InvalidVersion, Version
+
+from mia_install_backends import BACKENDS, select_backend
+from mia_install_git import (
+    bundle_name,
+    checkout_url,
+    evict_mirrors,
+    fast_forward,
+    local_changes,
+    mirror_path,
+    remote_head,
+    repository_id,
+    same_repository,
+    update_mirror,
+)
+from mia_install_matlab import (
+    find_matlab_installations,
+    installed_matlab_engine_version,
+    matlab_engine_fingerprint,
+    matlab_engine_wheel_dir,
+    matlab_engine_wheel_version,
+)
+from mia_install_store import has_tree, import_tree, link_view
+from mia_install_trace import describe_command, run_command, traced, tracer
+from mia_install_trash import Trash
+from mia_install_utils import cache_dir, file_sha256, folder_size
+
+# The engine is only used in user mode (populse_mia's Config reads this
+# variable), even when it is not run by install_mia.py
+os.environ.setdefault("MIA_DEV_MODE", "0")
+
+# Default values of the installation parameters
+DEFAULT_ANSWERS = {
+    # Folder in which the usr/ configuration folder is created
+    "mia_config_path": os.path.join(os.path.expanduser("~"), ".populse_mia"),
+    # Folder in which the projects_mia folder is created
+    "projects_path": os.path.join(
+        os.path.expanduser("~"), "Documents", "user_mia_projects"
+    ),
+    # "host" or "casa_distro"
+    "install_target": "host",
+    # "research" or "clinical"
+    "operating_mode": "research",
+    "use_matlab": False,
+    # Path to the Matlab executable (found automatically if empty)
+    "matlab_path": "",
+    "matlab_standalone_path": "",
+    "use_spm": False,
+    "spm_path": "",
+    "use_spm_standalone": False,
+    "spm_standalone_path": "",
+    # How the git repositories are cloned: "shallow" (last commit only),
+    # "partial" (all the commits, but only the files of the checked out
+    # one), "full", or "auto" (the cheapest one that works)
+    "git_fetch": "auto",
+    # Maximum size, in GB, of the cache of git mirrors shared by the
+    # installations (0 to disable the cache): a mirror holds the full
+    # history of a repository, so the cache only pays off when the
+    # repositories are cloned again (e.g. on a shared server)
+    "git_cache_size": 0,
+    # Folder of wheels from which all the Python packages are installed,
+    # without any index lookup (e.g. for a workstation without internet
+    # access); the packages are downloaded from PyPi if empty
+    "wheelhouse": "",
+    # Folder of the wheels built from the git sources of soma-base,
+    # soma-workflow and capsul, keyed by repository and commit, which can
+    # be shared between workstations (in the installer's cache if empty)
+    "build_cache": "",
+    # Site-wide, content-addressed store of the miaresources files (see
+    # mia_install_store): the user's miaresources folder is then made of
+    # links into the store instead of a full clone (not used if empty)
+    "resources_store": "",
+    # The tool installing the Python packages: "pip", "uv" (much faster,
+    # only in a virtual environment) or "auto" (uv if it is available)
+    "backend": "auto",
+    # Folder of git bundles (see mia_install_bundle) from which the git
+    # repositories are cloned instead of their URLs, if not empty
+    "git_bundles": "",
+    # Lockfile of the exact versions and hashes of populse_mia and its
+    # dependencies: installed without dependency resolution if it exists,
+    # recorded after the installation otherwise (not used if empty)
+    "lockfile": "",
+    # Chrome trace file (see mia_install_trace) to which the timing of the
+    # installation steps and commands is exported (not written if empty)
+    "trace_file": "",
+    # Build the new configuration folder in a staging folder and switch it
+    # in with renames at the end, keeping the previous one for a rollback
+    # (see MIAInstaller.commit_staging), instead of modifying it in place
+    "staged": False,
+    # What to do with an already existing folder: "overwrite", "keep",
+    # "abort" or, for a git working tree, "update" (which falls back to
+    # "overwrite" if the folder is not a clone of the expected repository)
+    "existing_folders": {
+        "projects_mia": "keep",
+        "mri_conv": "update",
+        "miaresources": "update",
+    },
+}
+
+# The git repositories of the folders created during the installation
+REPOSITORIES = {
+    "mri_conv": "https://github.com/populse/mri_conv.git",
+    "miaresources": "https://gricad-gitlab.univ-grenoble-alpes.fr/"
+    "condamie/miaresources.git",
+}
+
+# The packages upgraded from their sources for a Host installation, with
+# their git repositories
+SOMA_REPOS = {
+    "soma-base": "https://github.com/populse/soma-base.git",
+    "soma-workflow": "https://github.com/populse/soma-workflow.git",
+    "capsul": "https://github.com/populse/capsul.git",
+}
+
+# The name and version of a wheel or source distribution file
+DISTRIBUTION_FILE_PATTERN = re.compile(
+    r"^(.+?)-(\d[^-]*?)(?:-.*\.whl|\.tar\.gz|\.zip)$"
+)
+
+# The choices allowed for some installation parameters
+ANSWER_CHOICES = {
+    "install_target": ("host", "casa_distro"),
+    "operating_mode": ("research", "clinical"),
+    "existing_folders": ("overwrite", "keep", "abort", "update"),
+    "git_fetch": ("auto", "shallow", "partial", "full"),
+    "backend": ("auto", *BACKENDS),
+}
+
+# The description of the type of the installation parameters, by the type
+# of their default value
+ANSWER_TYPES = {
+    bool: "true or false",
+    str: "a string",
+    dict: "a mapping",
+    int: "a non-negative number",
+}
+
+# The git clone options of each fetch strategy, from the cheapest one
+GIT_FETCH_OPTIONS = {
+    "shallow": ["--depth", "1"],
+    "partial": ["--filter=blob:none"],
+    "full": [],
+}
+
+
+def load_answers(answers_file):
+    """Reads the installation parameters from a YAML answers file.
+
+    Only the parameters to be changed have to be given in the file, the
+    other ones keep the values of DEFAULT_ANSWERS.
+
+    Args:
+        answers_file (str): The path to the YAML answers file.
+
+    Returns:
+        dict: The installation parameters.
+
+    Raises:
+        ValueError: If the file does not contain a YAML mapping.
+
+    Example:
+        An answers file for a clinical installation without Matlab::
+
+            mia_config_path: /opt/populse_mia
+            projects_path: /data/mia
+            operating_mode: clinical
+            existing_folders:
+              mri_conv: keep
+    """
+    with open(answers_file, encoding="utf8") as stream:
+        answers = yaml.safe_load(stream)
+
+    if answers is None:
+        answers = dict()
+
+    if not isinstance(answers, dict):
+        raise ValueError(
+            f"The answers file '{answers_file}' must contain a mapping."
+        )
+
+    return answers
+
+
+def _canonical_name(package):
+    """Returns the normalized name of a package (PEP 503).
+
+    Args:
+        package (str): The name of the package.
+
+    Returns:
+        str: The lower case name, with runs of "-", "_" and "." replaced
+             by "-".
+    """
+    return re.sub(r"[-_.]+", "-", package).lower()
+
+
+def _version_key(version):
+    """Returns a sort key for a version.
+
+    Args:
+        version (str): The version.
+
+    Returns:
+        tuple: The key, the invalid versions being sorted first.
+    """
+
+    try:
+        return (1, Version(version))
+
+    except InvalidVersion:
+        return (0, version)
+
+
+def _is_up_to_date(installed, required):
+    """Checks whether an installed version satisfies a required version.
+
+    Args:
+        installed (str): The installed version (None if not installed).
+        required (str): The required version (None if unknown).
+
+    Returns:
+        bool: True if the installed version is the required version or a
+              newer one, False otherwise (or if a version is unknown).
+    """
+
+    if installed is None or required is None:
+        return False
+
+    return _version_key(installed) >= _version_key(required)
+
+
+def _installed_dependencies(packages):
+    """Returns the installed distributions needed by a set of packages.
+
+    The requirements of the installed distributions are followed
+    recursively, with their extras and environment markers. The
+    requirements which are not installed are ignored.
+
+    Args:
+        packages (iterable): The PyPi names of the packages.
+
+    Returns:
+        dict: The installed distributions (importlib.metadata.Distribution),
+              for each normalized name (see `_canonical_name`).
+    """
+    # The packages may have been installed since the import system has
+    # cached the directory listings
+    importlib.invalidate_caches()
+    distributions = dict()
+    pending = [(package, frozenset()) for package in packages]
+    seen = set()
+
+    while pending:
+        package, extras = pending.pop()
+        name = _canonical_name(package)
+
+        if (name, extras) in seen:
+            continue
+
+        seen.add((name, extras))
+
+        try:
+            distribution = importlib.metadata.distribution(package)
+
+        except importlib.metadata.PackageNotFoundError:
+            continue
+
+        distributions[name] = distribution
+
+        for line in distribution.requires or ():
+
+            try:
+                requirement = Requirement(line)
+
+            except InvalidRequirement:
+                continue
+
+            if requirement.marker is not None and not any(
+                requirement.marker.evaluate({"extra": extra})
+                for extra in extras or {""}
+            ):
+                continue
+
+            pending.append((requirement.name, frozenset(requirement.extras)))
+
+    return distributions
+
+
+def _install_state_file():
+    """Returns the file recording the packages installed from git.
+
+    There is one file per Python environment (and per user site-packages).
+
+    Returns:
+        str: The path to the JSON state file.
+    """
+    key = hashlib.sha256(
+        f"{sys.prefix}|{site.getusersitepackages()}".encode("utf8")
+    ).hexdigest()[:12]
+    return os.path.join(cache_dir("state"), f"{key}.json")
+
+
+def load_install_state():
+    """Reads the record of the packages installed from git.
+
+    Returns:
+        dict: For each package name, a dictionary with the "commit" it has
+              been built from and the "version" it has been installed with.
+    """
+
+    try:
+
+        with open(_install_state_file(), encoding="utf8") as stream:
+            return json.load(stream)
+
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_install_state(state):
+    """Writes the record of the packages installed from git.
+
+    Args:
+        state (dict): See `load_install_state`.
+    """
+    path = _install_state_file()
+
+    with open(f"{path}.tmp", "w", encoding="utf8") as stream:
+        json.dump(state, stream, indent=2)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def _describe_error(error):
+    """Returns a one-line description of an error.
+
+    Args:
+        error (Exception): The error.
+
+    Returns:
+        str: The description. For a failed command, the command name, its
+             exit code and the last line of its error output.
+    """
+
+    if isinstance(error, subprocess.CalledProcessError):
+        output = (error.stderr or "").strip().splitlines()
+        return (
+            f"'{describe_command(error.cmd)}' failed with error code "
+            f"{error.returncode}" + (f": {output[-1]}" if output else "")
+        )
+
+    return str(error)
+
+
+def run_step_graph(steps, step_done=None):
+    """Runs a graph of steps, running the independent steps concurrently.
+
+    Each step is run in a thread of an asyncio executor as soon as all the
+    steps it depends on are done. The steps that use site-packages are
+    serialized: at most one of them runs at any time.
+
+    Args:
+        steps (dict): The steps, as described in
+                      `MIAInstaller.install_steps`.
+        step_done (callable): Called as `step_done(name)` when a step is
+                              done.
+
+    Raises:
+        ValueError: If a step depends on an unknown step, or if the
+                    dependencies contain a cycle.
+        Exception: The first exception raised by a step (in the order of
+                   the steps). The steps that depend on a failed step are
+                   not run, the other ones are completed.
+    """
+    done = set()
+    pending = dict(steps)
+
+    # Checking that the graph can be run to completion
+    while pending:
+        ready = [
+            name
+            for name, step in pending.items()
+            if set(step["after"]) <= done
+        ]
+
+        if not ready:
+            raise ValueError(
+                f"Unknown or cyclic dependencies in steps: "
+                f"{', '.join(sorted(pending))}."
+            )
+
+        for name in ready:
+            done.add(name)
+            del pending[name]
+
+    asyncio.run(_run_step_graph(steps, step_done or (lambda name: None)))
+
+
+async def _run_step_graph(steps, step_done):
+    """Runs a graph of steps in the current event loop.
+
+    Args:
+        steps (dict): See `run_step_graph`.
+        step_done (callable): See `run_step_graph`.
+    """
+    site_packages_lock = asyncio.Lock()
+    tasks = dict()
+
+    async def run_step(name):
+        """Runs a step once all the steps it depends on are done."""
+        step = steps[name]
+        await asyncio.gather(*(tasks[after] for after in step["after"]))
+
+        def run():
+            """Runs the step in a span of the installation trace."""
+
+            with tracer.span(name, "step"):
+                step["run"]()
+
+        if step["site_packages"]:
+
+            async with site_packages_lock:
+                await asyncio.to_thread(run)
+
+        else:
+            await asyncio.to_thread(run)
+
+        step_done(name)
+
+    for name in steps:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+
+    # The steps independent of a failed step are completed before the
+    # failure is raised
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    for result in results:
+
+        if isinstance(result, BaseException):
+            raise result
+
+
+class MIAInstaller:
+    """Installs and configures mia, without any graphical user interface.
+
+    The user is never asked anything directly: all the choices come from
+    the answers given to the constructor. When an already existing folder
+    is found, the `resolve_existing_folder` callback is used (by default,
+    the choice given in the `existing_folders` answer is applied).
+
+    :Contains:
+        :Method:
+            - __init__
+            - build_matlab_api_wheel
+            - build_soma_wheels
+            - can_update_folder
+            - check_existing_folders
+            - clone_miaResources
+            - commit_staging
+            - completed_steps
+            - discard
+            - find_matlab_path
+            - git_clone
+            - init_projects_folder
+            - init_properties_folder
+            - install
+            - install_miaresources
+            - install_mri_conv
+            - install_requirements
+            - install_steps
+            - latest_version
+            - link_miaResources
+            - live_path
+            - make_mrifilemanager_folder
+            - matlab_api_installed
+            - pip_command
+            - prepare_staging
+            - release_hashes
+            - require_matlab_api
+            - require_populse_mia
+            - rollback
+            - run_steps
+            - set_answers
+            - source_wheel_dir
+            - update_checkout
+            - write_config
+            - write_configuration_path
+            - write_lockfile
+    """
+
+    # Names of the installation steps, in the order they are completed
+    STEPS = ("mia", "mri_conv", "config", "pkgs")
+
+    def __init__(
+        self,
+        answers=None,
+        resolve_existing_folder=None,
+        progress=None,
+        log=None,
+    ):
+        """Constructor
+
+        Args:
+            answers (dict): The installation parameters, see
+                            DEFAULT_ANSWERS for the available keys.
+            resolve_existing_folder (callable): Called as
+                `resolve_existing_folder(name, path)` when a folder to be
+                created already exists. Must return "overwrite", "keep"
+                or "abort".
+            progress (callable): Called as `progress(step)` each time one
+                                 of the steps in STEPS is completed.
+            log (callable): Called with each message to display (print by
+                            default).
+        """
+        # The Matlab installation folder
+        self.matlab_path = ""
+        self.resolve_existing_folder = (
+            resolve_existing_folder or self._answered_existing_folder
+        )
+        self.progress = progress or (lambda step: None)
+        self.log = log or print
+        self.folder_choices = dict()
+        # The packages found up to date during the installation
+        self.skipped = []
+        # The requirements of the pip transaction, for each package name
+        self.requirements = dict()
+        # The errors of the packages which could not be installed
+        self.package_errors = dict()
+        # The commits the packages built from sources are built from
+        self.source_commits = dict()
+        # The temporary folder of the wheels built during the installation
+        self.build_dir = None
+        # The background deletion of the replaced folders
+        self.trash = Trash()
+        self.set_answers(answers)
+
+    def _answered_existing_folder(self, name, path):
+        """Returns the choice made in the answers for an existing folder.
+
+        Args:
+            name (str): The name of the folder (e.g. 'mri_conv').
+            path (str): The path of the folder.
+
+        Returns:
+            str: "overwrite", "keep", "abort" or "update".
+        """
+        choice = self.answers["existing_folders"][name]
+        self.log(f"\nThe {path} folder already exists ({choice})...")
+        return choice
+
+    @traced
+    def build_matlab_api_wheel(self, force=False):
+        """
+        Builds the wheel of the MATLAB Engine API for Python.
+
+        The MATLAB Engine API found in the MATLAB `extern/engines/python`
+        directory is built as a wheel, which is stored in a wheel cache
+        (see `mia_install_matlab.matlab_engine_wheel_dir`). The wheel is
+        built only once for each MATLAB release and Python ABI: installing
+        in another Python environment of the same kind reuses the cached
+        wheel, without any build.
+
+        Note:
+            `self.matlab_path` must be set to the MATLAB installation path.
+
+        Args:
+            force (bool): If True, the wheel is returned even if the MATLAB
+                          Engine API is already installed.
+
+        Returns:
+            str: The path to the wheel, or None if the same version of the
+                 MATLAB Engine API is already installed in the current
+                 Python environment (see `matlab_api_installed`).
+
+        Raises:
+            - FileNotFoundError: If the MATLAB installation path is invalid.
+            - subprocess.CalledProcessError: If the wheel build fails.
+        """
+
+        if not os.path.isdir(self.matlab_path):
+            raise FileNotFoundError(
+                f"The specified MATLAB path "
+                f"'{self.matlab_path}' is invalid."
+            )
+
+        matlab_engine_path = os.path.join(
+            self.matlab_path, "extern", "engines", "python"
+        )
+
+        if not os.path.isdir(matlab_engine_path):
+            raise FileNotFoundError(
+                f"MATLAB Engine API directory not found "
+                f"at '{matlab_engine_path}'."
+            )
+
+        fingerprint = matlab_engine_fingerprint(self.matlab_path)
+
+        if fingerprint is None:
+            raise FileNotFoundError(
+                f"MATLAB Engine API setup.py not found "
+                f"in '{matlab_engine_path}'."
+            )
+
+        if not force and self.matlab_api_installed():
+            self.log(
+                "MATLAB Engine API {} ({}) is already installed, "
+                "skipped.".format(
+                    installed_matlab_engine_version(fingerprint["name"]),
+                    fingerprint["release"],
+                )
+            )
+            self.skipped.append(fingerprint["name"])
+            return None
+
+        wheel_dir = matlab_engine_wheel_dir(self.matlab_path, fingerprint)
+        wheels = glob.glob(os.path.join(wheel_dir, "*.whl"))
+
+        if wheels:
+            self.log(f"Using the cached wheel {wheels[0]}...")
+
+        else:
+            # Build the wheel once, for this release and this Python
+            self.log("Building the MATLAB Engine API wheel...")
+            run_command(
+                self.pip_command(
+                    "wheel",
+                    "--no-deps",
+                    "--wheel-dir",
+                    wheel_dir,
+                    matlab_engine_path,
+                ),
+                check=True,
+            )
+            wheels = glob.glob(os.path.join(wheel_dir, "*.whl"))
+
+        return wheels[0]
+
+    @traced
+    def build_soma_wheels(self):
+        """
+        Builds soma-base, soma-workflow and capsul from their GitHub
+        sources, for a Host installation.
+
+        This method performs the following steps:
+            1. Finds the packages already up to date: those installed from
+               the current commit of their repository (read with
+               `git ls-remote` and compared with the record of
+               `load_install_state`), or, from a wheelhouse, those installed
+               at the latest version it contains. They are skipped (and
+               added to the `skipped` list).
+            2. Uses the wheels already built from the current commit of
+               the other repositories, found in the build cache (see
+               `source_wheel_dir`).
+            3. Clones the remaining repositories (see SOMA_REPOS)
+               concurrently in a temporary directory, with `git_clone`.
+            4. Builds a wheel for each of them, in parallel `pip wheel`
+               processes, as soon as its clone is done, and stores it in
+               the build cache, so that a commit is only built once.
+
+        The built wheels are added to the requirements installed by
+        `install_requirements`. If a wheelhouse is given (see the
+        wheelhouse parameter in DEFAULT_ANSWERS), nothing is built: the
+        packages are required by name, to be installed from the wheelhouse.
+
+        A failure for one package does not prevent the other ones from
+        being upgraded: the errors are stored in `package_errors`, and
+        logged by `install_requirements`. The current working directory is
+        never changed.
+        """
+
+        if self.answers["install_target"] != "host":
+            return
+
+        state = load_install_state()
+        outdated = []
+
+        for package, url in SOMA_REPOS.items():
+            installed = self.backend.query(package)
+            commit = None
+
+            if self.answers["wheelhouse"]:
+                up_to_date = _is_up_to_date(
+                    installed, self.latest_version(package)
+                )
+
+            else:
+                commit = remote_head(self._git_bundle(url) or url)
+                up_to_date = commit is not None and state.get(package) == {
+                    "commit": commit,
+                    "version": installed,
+                }
+
+            if up_to_date:
+                self.log(f"{package} {installed} is up to date, skipped.")
+                self.skipped.append(package)
+                continue
+
+            wheels = (
+                glob.glob(
+                    os.path.join(self.source_wheel_dir(url, commit), "*.whl")
+                )
+                if commit
+                else []
+            )
+
+            if wheels:
+                self.log(f"Using the cached wheel {wheels[0]}...")
+                self.requirements[package] = [wheels[0]]
+                self.source_commits[package] = commit
+
+            else:
+                outdated.append(package)
+
+        if not outdated:
+            return
+
+        if self.answers["wheelhouse"]:
+            # The sources cannot be cloned offline: the packages are
+            # installed from the wheelhouse
+            for package in outdated:
+                self.requirements[package] = [package]
+
+            return
+
+        temp_dir = os.path.join(self.build_dir, "src")
+
+        def build_wheel(package):
+            """Clones a repository, builds its wheel and caches it."""
+            clone_dir = os.path.join(temp_dir, package)
+            wheel_dir = os.path.join(temp_dir, "wheels", package)
+            self.git_clone(SOMA_REPOS[package], clone_dir)
+            commit = remote_head(clone_dir)
+            self.source_commits[package] = commit
+            self.log(f"Building {package} ({commit[:12]})...")
+            run_command(
+                self.pip_command(
+                    "wheel", "--no-deps", "--wheel-dir", wheel_dir, clone_dir
+                ),
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            wheel = glob.glob(os.path.join(wheel_dir, "*.whl"))[0]
+            cache = self.source_wheel_dir(SOMA_REPOS[package], commit)
+            cached = os.path.join(cache, os.path.basename(wheel))
+
+            # Copied under a temporary name, then renamed, so that a shared
+            # cache never contains a partial wheel
+            try:
+                shutil.copyfile(wheel, f"{cached}.{os.getpid()}.partial")
+                os.replace(f"{cached}.{os.getpid()}.partial", cached)
+
+            except OSError as e:
+                self.log(f"The {package} wheel could not be cached: {e}")
+                return wheel
+
+            return cached
+
+        with ThreadPoolExecutor(len(outdated)) as executor:
+            futures = {
+                package: executor.submit(build_wheel, package)
+                for package in outdated
+            }
+
+        for package, future in futures.items():
+
+            try:
+                self.requirements[package] = [future.result()]
+
+            except Exception as e:
+                self.package_errors[package] = _describe_error(e)
+
+    def can_update_folder(self, name, path):
+        """
+        Checks whether an existing folder can be updated in place.
+
+        Args:
+            name (str): The name of the folder ('mri_conv' or
+                        'miaresources').
+            path (str): The path of the folder.
+
+        Returns:
+            bool: True if the folder is a git working tree of the expected
+                  repository (see REPOSITORIES), False otherwise.
+        """
+        url = checkout_url(path)
+        return (
+            name in REPOSITORIES
+            and url is not None
+            and same_repository(url, REPOSITORIES[name])
+        )
+
+    def check_existing_folders(self):
+        """Decides what to do with the folders that already exist.
+
+        The decision for each existing folder is obtained from the
+        `resolve_existing_folder` callback and stored in `folder_choices`.
+        Since everything is decided here, the installation itself can then
+        run without any user interaction. The folders created by the steps
+        completed by an interrupted installation, which is resumed (see
+        `completed_steps`), are not concerned.
+
+        Returns:
+            bool: False if the installation must be aborted, True otherwise.
+        """
+        self.folder_choices = dict()
+        completed = self.completed_steps(self.install_steps())
+        folders = (
+            ("projects_mia", self.projects_save_path, "projects"),
+            ("mri_conv", self.mri_conv_path, "mri_conv"),
+            ("miaresources", self.mia_resources_path, "miaresources"),
+        )
+
+        for name, path, step in folders:
+            path = self.live_path(path)
+
+            if not os.path.isdir(path) or step in completed:
+                continue
+
+            if name == "projects_mia" and len(os.listdir(path)) == 0:
+                continue
+
+            choice = self.resolve_existing_folder(name, path)
+            self.folder_choices[name] = choice
+
+            if choice == "abort":
+                self.log("\nThe installation has been aborted.")
+                return False
+
+        return True
+
+    @traced
+    def clone_miaResources(self, miaresources_dir):
+        """
+        Clones the MiaResources repository from GitLab to the
+        specified directory.
+
+        This method uses `git_clone` to download the MiaResources repository
+        from the specified GitLab URL to the given local directory.
+
+        Args:
+            miaresources_dir (str): The directory where the MiaResources
+                                    repository will be cloned.
+
+        Returns:
+        bool: True if cloning succeeds, False otherwise.
+        """
+        try:
+            self.git_clone(REPOSITORIES["miaresources"], miaresources_dir)
+            return True
+
+        except subprocess.CalledProcessError as e:
+            # Handle errors related to the git clone process
+            self.log(
+                f"Git clone failed with error code {e.returncode}."
+                f"\nError message: {e.stderr or e}"
+            )
+            return False
+
+        except FileNotFoundError as e:
+            # Handle cases where 'git' is not installed or not found in PATH
+            self.log(
+                f"Error: 'git' command not found. Please ensure Git is "
+                f"installed and available in your PATH ({e})."
+            )
+            return False
+
+        except Exception as e:
+            # Catch any other unforeseen errors
+            self.log(f"An unexpected error occurred: {e}")
+            return False
+
+    @traced
+    def commit_staging(self):
+        """
+        Switches in the configuration folder built by a staged installation.
+
+        The folders kept from the current configuration folder (see
+        `install_mri_conv`) are first moved to the new one. The current
+        folder is then renamed to usr.previous (replacing the previous
+        one), the new one is renamed to usr, and the configuration path is
+        written (see `write_configuration_path`). The switch only consists
+        of renames, so that it is almost instantaneous, and it can be undone
+        with `rollback`.
+
+        Raises:
+            OSError: If a folder cannot be renamed.
+        """
+        start = time.perf_counter()
+        live = self.live_properties_path
+        previous = f"{live}.previous"
+
+        for path in (self.mri_conv_path, self.mia_resources_path):
+
+            if not os.path.exists(path) and os.path.isdir(
+                self.live_path(path)
+            ):
+                os.rename(self.live_path(path), path)
+
+        self.discard(previous)
+        replaced = os.path.isdir(live)
+
+        if replaced:
+            os.rename(live, previous)
+
+        os.rename(self.properties_path, live)
+        self.discard(self.staging_path)
+        self.write_configuration_path()
+        message = (
+            f"\nThe new configuration folder has been switched in, in "
+            f"{time.perf_counter() - start:.2f} s"
+        )
+
+        if replaced:
+            message += f" (the previous one is kept in {previous})"
+
+        self.log(f"{message}.")
+
+    def completed_steps(self, steps):
+        """
+        Finds the steps completed by an interrupted installation.
+
+        Each completed step is recorded in a journal, with its inputs and
+        outputs (see `install_steps`), which is deleted once the whole
+        installation is completed. A recorded step is still completed if:
+            - its inputs have not changed,
+            - its outputs still exist,
+            - the steps it depends on are still completed.
+        A step whose result is only used by the steps depending on it
+        (e.g. the collected requirements) must however be run again if one
+        of these is run again.
+
+        Args:
+            steps (dict): The steps (see `install_steps`).
+
+        Returns:
+            dict: For each completed step, its record in the journal.
+        """
+
+        try:
+
+            with open(self.journal_file, encoding="utf8") as stream:
+                journal = json.load(stream)["steps"]
+
+        except (OSError, ValueError, KeyError, TypeError):
+            return dict()
+
+        completed = dict()
+
+        for name, step in steps.items():
+            entry = journal.get(name)
+            outputs = list(step["outputs"] or ())
+
+            if (
+                isinstance(entry, dict)
+                and entry.get("inputs") == self._step_inputs(step)
+                and entry.get("outputs") == outputs
+                and all(os.path.exists(path) for path in outputs)
+                and all(after in completed for after in step["after"])
+            ):
+                completed[name] = entry
+
+        for name in reversed(list(steps)):
+
+            if steps[name]["outputs"] is None and any(
+                name in step["after"] and other not in completed
+                for other, step in steps.items()
+            ):
+                completed.pop(name, None)
+
+        return completed
+
+    def discard(self, paths):
+        """
+        Deletes a file or folder, or the entries of a folder, in the
+        background.
+
+        The path is renamed into a trash folder, which is instantaneous,
+        then deleted by background threads (see `mia_install_trash.Trash`)
+        while the installation goes on. The trash folder is in the
+        configuration folder for the paths it contains, and next to the
+        projects folder otherwise. `run_steps` waits for the end of the
+        deletions, and reports their duration and the space freed.
+
+        Args:
+            paths (str or list): The path to delete, or the entries of a
+                                 folder to empty, reported as one replaced
+                                 folder (nothing is done for the paths
+                                 which do not exist).
+
+        Raises:
+            OSError: If the trash folder cannot be created.
+        """
+
+        if isinstance(paths, str):
+            paths = [paths]
+
+        if not paths:
+            return
+
+        root = os.path.abspath(self.answers["mia_config_path"])
+
+        if os.path.commonpath([os.path.abspath(paths[0]), root]) != root:
+            root = os.path.dirname(self.projects_save_path)
+
+        self.trash.discard(paths, os.path.join(root, ".mia_trash"))
+
+    @traced
+    def find_matlab_path(self):
+        """
+        Attempts to find the installation path of MATLAB on the system.
+
+        MATLAB is not started: the installations are found on the filesystem
+        (see `mia_install_matlab.find_matlab_installations`), and the
+        result is cached so that later calls are instantaneous. When
+        several releases are installed, the one found in the PATH is
+        preferred, then the most recent one.
+
+        Returns:
+            str: The path to the MATLAB executable if found, otherwise an
+                 empty string.
+
+        Behavior:
+            - Sets `self.matlab_path` to the MATLAB installation folder of
+            the selected installation.
+            - Returns the full path to the executable if found, or an empty
+            string if not.
+        """
+        installations = find_matlab_installations(log=self.log)
+
+        if not installations:
+            self.log(
+                "No MATLAB installation has been found.\nThe matlab path "
+                "could not be determined automatically ...\n"
+            )
+            return ""
+
+        matlab = installations[0]
+        self.matlab_path = matlab["root"]
+        self.log(
+            "MATLAB {} found in {} ({} installation(s) found).".format(
+                matlab["release"] or "(unknown release)",
+                matlab["root"],
+                len(installations),
+            )
+        )
+        return matlab["executable"]
+
+    def _git_bundle(self, url):
+        """Returns the git bundle of a repository, if one is available.
+
+        Args:
+            url (str): The URL of the repository.
+
+        Returns:
+            str: The path to the bundle of the repository in the git_bundles
+                 folder (see DEFAULT_ANSWERS), or None.
+        """
+
+        if self.answers["git_bundles"]:
+            path = os.path.join(self.answers["git_bundles"], bundle_name(url))
+
+            if os.path.isfile(path):
+                return path
+
+        return None
+
+    @traced
+    def git_clone(self, url, directory):
+        """
+        Clones a git repository, through the git mirror cache if enabled.
+
+        If a git bundle of the repository is available (see the git_bundles
+        parameter in DEFAULT_ANSWERS), the repository is cloned from it,
+        without any network access.
+
+        Otherwise, if the git cache is enabled (see the git_cache_size
+        parameter in DEFAULT_ANSWERS), the mirror of the repository in the
+        cache is created or updated (see `mia_install_git.update_mirror`),
+        and the repository is cloned locally from it, with its objects
+        hardlinked when possible. The origin remote of the clone is then set
+        back to the URL of the repository. If the cache cannot be used
+        (e.g. if the clone fails or if the mirror cannot be written), the
+        repository is cloned from its URL.
+
+        Without the cache, the configured fetch strategy is used. With the
+        "auto" strategy, a shallow clone is tried first, then a partial
+        clone, then a full clone, so that the cheapest strategy supported
+        by the server is used.
+
+        The time taken and the size of the downloaded git data are logged.
+
+        Args:
+            url (str): The URL of the repository.
+            directory (str): The directory to clone the repository into. It
+                             must not exist, or be empty.
+
+        Returns:
+            str: The fetch strategy used ("bundle" or "cache" if the
+                 repository has been cloned from a git bundle or from the
+                 git cache).
+
+        Raises:
+            subprocess.CalledProcessError: If the clone fails with every
+                                           strategy tried.
+            FileNotFoundError: If git is not installed.
+        """
+
+        bundle = self._git_bundle(url)
+
+        if bundle is not None:
+            start = time.perf_counter()
+
+            for command in (
+                ["clone", bundle, directory],
+                ["-C", directory, "remote", "set-url", "origin", url],
+            ):
+                run_command(
+                    ["git", *command],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+
+            self.log(
+                f"{url} cloned (bundle) in "
+                f"{time.perf_counter() - start:.1f} s."
+            )
+            return "bundle"
+
+        if self.answers["git_cache_size"]:
+            start = time.perf_counter()
+            size = folder_size(mirror_path(url))
+
+            try:
+                mirror = update_mirror(url)
+                run_command(
+                    ["git", "clone", "--local", mirror, directory],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                run_command(
+                    ["git", "-C", directory, "remote", "set-url", "origin"]
+                    + [url],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+
+            except (subprocess.CalledProcessError, OSError) as e:
+                error = getattr(e, "stderr", None) or str(e)
+                self.log(
+                    f"The git cache could not be used for {url} "
+                    f"({error.strip()}), cloning directly..."
+                )
+                shutil.rmtree(directory, ignore_errors=True)
+
+            else:
+                size = folder_size(mirror) - size
+                self.log(
+                    f"{url} cloned (cache) in "
+                    f"{time.perf_counter() - start:.1f} s, "
+                    f"{max(size, 0) / 1024 ** 2:.1f} MB downloaded."
+                )
+                return "cache"
+
+        strategy = self.answers["git_fetch"]
+        strategies = (
+            list(GIT_FETCH_OPTIONS) if strategy == "auto" else [strategy]
+        )
+
+        for strategy in strategies:
+            start = time.perf_counter()
+
+            try:
+                run_command(
+                    ["git", "clone", *GIT_FETCH_OPTIONS[strategy], url]
+                    + [directory],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+
+            except subprocess.CalledProcessError as e:
+
+                if strategy == strategies[-1]:
+                    raise
+
+                self.log(
+                    f"{strategy.capitalize()} clone of {url} failed "
+                    f"({e.stderr.strip()}), retrying..."
+                )
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+
+            size = folder_size(os.path.join(directory, ".git"))
+            self.log(
+                f"{url} cloned ({strategy}) in "
+                f"{time.perf_counter() - start:.1f} s, "
+                f"{size / 1024 ** 2:.1f} MB downloaded."
+            )
+            return strategy
+
+    def init_projects_folder(self):
+        """
+        Creates the projects folder, or empties it if it already exists and
+        the "overwrite" choice has been made for it.
+        """
+        projects_path = self.projects_save_path
+
+        if not os.path.isdir(projects_path):
+            os.makedirs(projects_path, exist_ok=True)
+            self.log(f"\nThe {projects_path} directory is created...")
+
+        # If the choice is "keep" we do nothing. If it is "overwrite", we
+        # delete the entire contents of the folder (in the background, see
+        # `discard`)
+        if self.folder_choices.get("projects_mia") != "overwrite":
+            return
+
+        try:
+            self.discard(
+                [
+                    os.path.join(projects_path, elmt)
+                    for elmt in os.listdir(projects_path)
+                ]
+            )
+
+        except Exception as e:
+            self.log("Failed to empty {}. Reason: {}".format(projects_path, e))
+
+    def init_properties_folder(self):
+        """
+        Creates the properties and processes folders, with their default
+        files, if they do not exist yet.
+        """
+        properties_dir = self.properties_dir
+
+        if not os.path.exists(properties_dir):
+            os.makedirs(properties_dir, exist_ok=True)
+            self.log(f"\nThe {properties_dir} directory is created...")
+
+        if not os.path.exists(
+            os.path.join(properties_dir, "saved_projects.yml")
+        ):
+            with open(
+                os.path.join(properties_dir, "saved_projects.yml"),
+                "w",
+                encoding="utf8",
+            ) as configfile:
+                yaml.dump(
+                    {"paths": []},
+                    configfile,
+                    default_flow_style=False,
+                    allow_unicode=True,
+                )
+
+            self.log(
+                "\nThe {} file is created...".format(
+                    os.path.join(properties_dir, "saved_projects.yml")
+                )
+            )
+
+        if not os.path.exists(os.path.join(properties_dir, "config.yml")):
+
+            with open(
+                os.path.join(properties_dir, "config.yml"),
+                "w",
+                encoding="utf8",
+            ) as configfile:
+                yaml.dump(
+                    "gAAAAABd79UO5tVZSRNqnM5zzbl0KDd7Y98KCSKCNizp9aDq"
+                    "ADs9dAQHJFbmOEX2QL_jJUHOTBfFFqa3OdfwpNLbvWNU_rR0"
+                    "VuT1ZdlmTYv4wwRjhlyPiir7afubLrLK4Jfk84OoOeVtR0a5"
+                    "a0k0WqPlZl-y8_Wu4osHeQCfeWFKW5EWYF776rWgJZsjn3fx"
+                    "Z-V2g5aHo-Q5aqYi2V1Kc-kQ9ZwjFBFbXNa1g9nHKZeyd3ve"
+                    "6p3RUSELfUmEhS0eOWn8i-7GW1UGa4zEKCsoY6T19vrimiuR"
+                    "Vy-DTmmgzbbjGkgmNxB5MvEzs0BF2bAcina_lKR-yeICuIqp"
+                    "TSOBfgkTDcB0LVPBoQmogUVVTeCrjYH9_llFTJQ3ZtKZLdeS"
+                    "tFR5Y2I2ZkQETi6m-0wmUDKf-KRzmk6sLRK_oz6GmuTAN8A5"
+                    "1au2v1M=",
+                    configfile,
+                    default_flow_style=False,
+                    allow_unicode=True,
+                )
+
+            self.log(
+                "\nThe {} file is created...".format(
+                    os.path.join(properties_dir, "config.yml")
+                )
+            )
+
+            # processes/User_processes folder management / initialisation:
+            user_processes_dir = os.path.join(
+                self.properties_path, "processes", "User_processes"
+            )
+
+            if not os.path.exists(user_processes_dir):
+                os.makedirs(user_processes_dir, exist_ok=True)
+                self.log(
+                    "\nThe {} directory is created...".format(
+                        user_processes_dir
+                    )
+                )
+
+            if not os.path.exists(
+                os.path.join(user_processes_dir, "__init__.py")
+            ):
+                Path(
+                    os.path.join(
+                        user_processes_dir,
+                        "__init__.py",
+                    )
+                ).touch()
+                self.log(
+                    "\nThe {} file is created...".format(
+                        os.path.join(user_processes_dir, "__init__.py")
+                    )
+                )
+
+    def install(self):
+        """
+        Manages the installation and configuration of Mia and associated
+        software components.
+
+        This method performs the following steps:
+        1. Decides what to do with the already existing folders (see
+           `check_existing_folders`).
+        2. Installs populse_mia and mia_processes from PyPi.
+        3. Manages the creation and initialization of necessary directories
+           and configuration files (properties, processes and projects).
+        4. Clones required repositories (MRI conversion tools and
+           miaresources).
+        5. Updates the configuration file with new paths and settings,
+           including the operating mode and the MATLAB and SPM settings.
+        6. Upgrades packages (soma-base, soma-workflow, capsul) if the Host
+           installation target is selected, or uninstalls them otherwise.
+
+        The `progress` callback is called each time one of the steps in
+        STEPS is completed.
+
+        Returns:
+            bool: True if the installation has been completed, False if it
+                  has been aborted or if some steps are incomplete (see
+                  `run_steps`).
+
+        Raises:
+            - Exception: If any unexpected issues arise during the directory
+                         creation or software installation steps.
+        """
+
+        if not self.check_existing_folders():
+            return False
+
+        return self.run_steps()
+
+    def install_miaresources(self):
+        """
+        Clones MiaResources, unless the existing folder has to be kept or
+        can be updated in place.
+
+        If a resources store is given (see the resources_store parameter in
+        DEFAULT_ANSWERS), the folder is replaced by a view of the store
+        instead (see `link_miaResources`). For a staged installation, the
+        folder is handled as in `install_mri_conv`.
+        """
+        choice = self.folder_choices.get("miaresources")
+
+        if choice == "keep":
+            return
+
+        if self.answers["resources_store"]:
+            self.discard(self.mia_resources_path)
+            self.link_miaResources(self.mia_resources_path)
+            return
+
+        if (
+            choice == "update"
+            and not self.answers["staged"]
+            and self.update_checkout("miaresources", self.mia_resources_path)
+        ):
+            return
+
+        self.discard(self.mia_resources_path)
+        self.clone_miaResources(self.mia_resources_path)
+
+    def install_mri_conv(self):
+        """
+        Clones the MRI conversion repository, unless the existing folder has
+        to be kept or can be updated in place.
+
+        For a staged installation, a kept folder is moved to the new
+        configuration folder by `commit_staging`, and a folder to update is
+        cloned again (from the git mirror cache, if it is enabled), the
+        previous one being kept for a rollback.
+        """
+        choice = self.folder_choices.get("mri_conv")
+
+        if choice == "keep" or (
+            choice == "update"
+            and not self.answers["staged"]
+            and self.update_checkout("mri_conv", self.mri_conv_path)
+        ):
+            return
+
+        self.discard(self.mri_conv_path)
+        self.make_mrifilemanager_folder(self.mri_conv_path)
+
+    @traced
+    def install_requirements(self):
+        """
+        Installs all the required packages in a single pip transaction.
+
+        The requirements collected by `require_populse_mia`,
+        `build_soma_wheels` and `require_matlab_api` (PyPi names, pinned
+        requirements of a lockfile and local wheels) are installed with one
+        pip call, so that pip is started, reads site-packages and resolves
+        the dependencies only once. The combined resolution and
+        installation time is logged.
+
+        With a lockfile, the transaction is done without dependency
+        resolution (`--no-deps --require-hashes`): the hashes of the local
+        wheels are computed, the packages required by name (e.g. from a
+        wheelhouse) are pinned to their latest version, with the hashes of
+        its files (see `release_hashes`), and both replace the locked
+        packages of the same name. A package which cannot be pinned is
+        not installed, and its error is logged.
+
+        The packages rebuilt from git are uninstalled beforehand, as their
+        version may not have changed. For a Casa_Distro installation,
+        populse-db, capsul, soma-base and soma-workflow, which are provided
+        by the distribution, are uninstalled afterwards. Then, if a
+        lockfile is given but does not exist yet, it is recorded from this
+        reference installation (see `write_lockfile`).
+
+        Returns:
+            bool: False if some packages could not be built or installed
+                  (see `package_errors`): the step is then not recorded as
+                  completed, and the next installation runs it again.
+
+        Raises:
+            subprocess.CalledProcessError: If the pip transaction fails
+                                           while populse_mia is part of it
+                                           (otherwise, the error is only
+                                           logged for each package).
+        """
+        lockfile = self.answers["lockfile"]
+        locked = self.requirements.get("populse_mia", [])
+        local = {
+            name: requirements[0]
+            for name, requirements in self.requirements.items()
+            if name != "populse_mia" and os.path.isfile(requirements[0])
+        }
+
+        if lockfile and os.path.isfile(lockfile):
+            pinned = dict()
+
+            for name in self.requirements:
+
+                if name == "populse_mia" or name in local:
+                    continue
+
+                version = self.latest_version(name)
+                hashes = self.release_hashes(name, version) if version else []
+
+                if not hashes:
+                    self.package_errors[name] = (
+                        "its version and hashes cannot be found to pin it "
+                        "in the lockfile installation"
+                    )
+                    continue
+
+                pinned[name] = " ".join(
+                    [f"{name}=={version}"]
+                    + [f"--hash=sha256:{value}" for value in hashes]
+                )
+
+            # The locked packages replaced by local wheels or by pinned
+            # packages are removed
+            replaced = {_canonical_name(name) for name in [*local, *pinned]}
+            lines = (
+                [
+                    line
+                    for line in locked
+                    if _canonical_name(line.split("==")[0]) not in replaced
+                ]
+                + [
+                    f"{wheel} --hash=sha256:{file_sha256(wheel)}"
+                    for wheel in local.values()
+                ]
+                + list(pinned.values())
+            )
+            requirements_file = os.path.join(
+                self.build_dir, "requirements.txt"
+            )
+
+            with open(requirements_file, "w", encoding="utf8") as stream:
+                stream.write("\n".join(lines) + "\n")
+
+            command = self.pip_command(
+                "install",
+                "--no-deps",
+                "--require-hashes",
+                "-r",
+                requirements_file,
+            )
+
+        else:
+            lines = [
+                requirement
+                for requirements in self.requirements.values()
+                for requirement in requirements
+            ]
+            command = self.pip_command("install", "--upgrade", *lines)
+
+        if lines:
+            rebuilt = [name for name in local if name in SOMA_REPOS]
+
+            if rebuilt:
+                run_command(
+                    self.pip_command("uninstall", *rebuilt), check=True
+                )
+
+            start = time.perf_counter()
+
+            try:
+                run_command(command, check=True)
+
+            except subprocess.CalledProcessError as e:
+
+                if "populse_mia" in self.requirements:
+                    raise
+
+                for name in self.requirements:
+                    self.package_errors[name] = _describe_error(e)
+
+            else:
+                self.log(
+                    f"{len(lines)} requirement(s) resolved and installed in "
+                    f"{time.perf_counter() - start:.1f} s (single pip "
+                    f"transaction)."
+                )
+                # Recording the commits the packages have been built from
+                state = load_install_state()
+
+                for name in rebuilt:
+                    state[name] = {
+                        "commit": self.source_commits.get(name),
+                        "version": self.backend.query(name),
+                    }
+
+                if rebuilt:
+                    save_install_state(state)
+
+        else:
+            self.log("All the Python packages are up to date.")
+
+        if self.answers["install_target"] != "host":
+            run_command(
+                self.pip_command(
+                    "uninstall",
+                    "populse-db",
+                    "capsul",
+                    "soma-base",
+                    "soma-workflow",
+                ),
+                check=True,
+            )
+
+        if lockfile and not os.path.isfile(lockfile):
+
+            try:
+                count = self.write_lockfile(lockfile)
+
+            except (subprocess.CalledProcessError, OSError, ValueError) as e:
+                self.log(f"The lockfile could not be written: {e}")
+
+            else:
+                self.log(f"{count} package(s) locked in {lockfile}.")
+
+        for name in self.requirements:
+
+            if name in self.package_errors:
+                continue
+
+            self.log(f"{name} has been installed.")
+
+        for name, error in self.package_errors.items():
+            self.log(f"Error while installing {name}: {error}")
+
+        return not self.package_errors
+
+    def install_steps(self):
+        """
+        Describes the installation as a graph of steps.
+
+        All the Python packages are installed by a single pip transaction
+        (see `install_requirements`), once their requirements have been
+        collected and the wheels built from sources, concurrently. The
+        Config writes need populse_mia, so they follow this transaction.
+        All the other steps are independent from each other.
+
+        Returns:
+            dict: For each step name, in a valid execution order, a
+                  dictionary with the keys:
+                      - run: the callable doing the step, which may
+                        return False if the step is incomplete (it is then
+                        not recorded as completed, see `run_steps`)
+                      - after: the names of the steps it depends on
+                      - site_packages: True if the step installs packages
+                        in, or imports packages from, site-packages (these
+                        steps are never run concurrently)
+                      - groups: the steps of STEPS the step belongs to (a
+                        step of STEPS is completed once all the steps of
+                        its group are done)
+                      - inputs: the installation parameters the step
+                        depends on
+                      - outputs: the paths the step creates, or None if
+                        its result is only used by the steps depending on
+                        it (see `completed_steps`)
+        """
+        config_file = os.path.join(self.properties_dir, "config.yml")
+
+        def folder_outputs(name, path):
+            """Returns the outputs of the step creating a folder."""
+            return () if self.folder_choices.get(name) == "keep" else (path,)
+
+        matlab = ("use_matlab", "matlab_path")
+        packages = ("wheelhouse", "lockfile", "backend")
+
+        return {
+            "populse_mia": {
+                "run": self.require_populse_mia,
+                "after": (),
+                "site_packages": False,
+                "groups": ("mia",),
+                "inputs": packages,
+                "outputs": None,
+            },
+            "properties": {
+                "run": self.init_properties_folder,
+                "after": (),
+                "site_packages": False,
+                "groups": ("mia",),
+                "inputs": ("mia_config_path", "staged"),
+                "outputs": (config_file,),
+            },
+            "projects": {
+                "run": self.init_projects_folder,
+                "after": (),
+                "site_packages": False,
+                "groups": ("mia",),
+                "inputs": ("projects_path",),
+                "outputs": (self.projects_save_path,),
+            },
+            "mri_conv": {
+                "run": self.install_mri_conv,
+                "after": (),
+                "site_packages": False,
+                "groups": ("mri_conv",),
+                "inputs": ("mia_config_path", "staged"),
+                "outputs": folder_outputs("mri_conv", self.mri_conv_path),
+            },
+            "miaresources": {
+                "run": self.install_miaresources,
+                "after": (),
+                "site_packages": False,
+                "groups": ("mri_conv",),
+                "inputs": ("mia_config_path", "staged", "resources_store"),
+                "outputs": folder_outputs(
+                    "miaresources", self.mia_resources_path
+                ),
+            },
+            "soma_wheels": {
+                "run": self.build_soma_wheels,
+                "after": (),
+                "site_packages": False,
+                "groups": ("pkgs",),
+                "inputs": ("install_target", "wheelhouse", "build_cache"),
+                "outputs": None,
+            },
+            "matlab_api": {
+                "run": self.require_matlab_api,
+                "after": (),
+                "site_packages": False,
+                "groups": ("pkgs",),
+                "inputs": matlab,
+                "outputs": None,
+            },
+            "pip_install": {
+                "run": self.install_requirements,
+                "after": ("populse_mia", "soma_wheels", "matlab_api"),
+                "site_packages": True,
+                "groups": ("mia", "pkgs"),
+                "inputs": ("install_target", *packages, *matlab),
+                "outputs": (),
+            },
+            "config": {
+                "run": self.write_config,
+                "after": ("pip_install", "properties"),
+                "site_packages": True,
+                "groups": ("config",),
+                "inputs": (
+                    "mia_config_path",
+                    "staged",
+                    "projects_path",
+                    "operating_mode",
+                    *matlab,
+                    "matlab_standalone_path",
+                    "use_spm",
+                    "spm_path",
+                    "use_spm_standalone",
+                    "spm_standalone_path",
+                ),
+                "outputs": (config_file,),
+            },
+        }
+
+    def latest_version(self, package):
+        """
+        Returns the latest available version of a package.
+
+        The version is looked up in the wheelhouse if one is given (see the
+        wheelhouse parameter in DEFAULT_ANSWERS), otherwise with a single
+        request to the PyPi JSON API, which is much faster than running pip.
+
+        Args:
+            package (str): The PyPi name of the package.
+
+        Returns:
+            str: The latest version, or None if it cannot be found (e.g.
+                 without network access).
+        """
+        name = _canonical_name(package)
+
+        if self.answers["wheelhouse"]:
+            versions = []
+
+            for file_name in os.listdir(self.answers["wheelhouse"]):
+                match = DISTRIBUTION_FILE_PATTERN.match(file_name)
+
+                if match and _canonical_name(match.group(1)) == name:
+                    versions.append(match.group(2))
+
+            return max(versions, key=_version_key, default=None)
+
+        try:
+
+            with urlopen(
+                f"https://pypi.org/pypi/{name}/json", timeout=10
+            ) as response:
+                return json.load(response)["info"]["version"]
+
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @traced
+    def link_miaResources(self, miaresources_dir):
+        """
+        Creates the MiaResources folder as a view of the resources store.
+
+        The current commit of the MiaResources repository is read with
+        `git ls-remote`. If it has not been imported in the store yet, the
+        repository is cloned in a temporary folder (see `git_clone`) and its
+        files are added to the store. The folder is then filled with links
+        to the files of the store (see `mia_install_store.link_view`).
+
+        Args:
+            miaresources_dir (str): The directory of the view, which must
+                                    not exist.
+
+        Returns:
+            bool: True if the view is created, False otherwise.
+        """
+        store = self.answers["resources_store"]
+        url = REPOSITORIES["miaresources"]
+        start = time.perf_counter()
+        commit = remote_head(self._git_bundle(url) or url)
+
+        try:
+
+            if commit is None or not has_tree(store, commit):
+                clone_dir = tempfile.mkdtemp()
+
+                try:
+                    self.git_clone(url, clone_dir)
+                    commit = remote_head(clone_dir)
+                    added = import_tree(store, clone_dir, commit)
+
+                finally:
+                    shutil.rmtree(clone_dir, ignore_errors=True)
+
+                self.log(
+                    f"MiaResources {commit[:12]} imported in {store} "
+                    f"({added / 1024 ** 2:.1f} MB added)."
+                )
+
+            counts = link_view(store, commit, miaresources_dir)
+
+        except (subprocess.CalledProcessError, OSError) as e:
+            self.log(
+                f"The MiaResources view could not be created in "
+                f"{miaresources_dir}: {e}"
+            )
+            return False
+
+        self.log(
+            f"{miaresources_dir} linked to {store} in "
+            f"{time.perf_counter() - start:.1f} s ({counts['hardlinks']} "
+            f"hardlink(s), {counts['symlinks']} symbolic link(s))."
+        )
+        return True
+
+    def live_path(self, path):
+        """
+        Returns the path used by Mia of a path written by the installation.
+
+        Args:
+            path (str): A path in the configuration folder written by the
+                        installation (the staging folder for a staged
+                        installation).
+
+        Returns:
+            str: The corresponding path in the configuration folder used by
+                 Mia (the path itself, if the installation is not staged).
+        """
+
+        if os.path.commonpath([path, self.properties_path]) != (
+            self.properties_path
+        ):
+            return path
+
+        return os.path.join(
+            self.live_properties_path,
+            os.path.relpath(path, self.properties_path),
+        )
+
+    @traced
+    def make_mrifilemanager_folder(self, mri_conv_dir):
+        """
+        Clones the MRI conversion repository into the specified directory.
+
+        Args:
+            mri_conv_dir (str): The directory where the repository will
+                                 be cloned.
+
+        Returns:
+            bool: True if cloning succeeds, False otherwise.
+        """
+        try:
+            self.git_clone(REPOSITORIES["mri_conv"], mri_conv_dir)
+            return True
+
+        except subprocess.CalledProcessError as e:
+            # Handle errors related to the git clone process
+            self.log(
+                f"Git clone failed with error code {e.returncode}."
+                f"\nError message: {e.stderr or e}"
+            )
+            return False
+
+        except FileNotFoundError as e:
+            # Handle cases where 'git' is not installed or not found in PATH
+            self.log(
+                f"Error: 'git' command not found. Please ensure Git is "
+                f"installed and available in your PATH ({e})."
+            )
+            return False
+
+        except Exception as e:
+            # Catch any other unforeseen errors
+            self.log(f"An unexpected error occurred: {e}")
+            return False
+
+    def matlab_api_installed(self):
+        """
+        Checks whether the MATLAB Engine API of `self.matlab_path` is
+        already installed in the current Python environment.
+
+        The fingerprint of the MATLAB installation (release, engine package
+        name and version, see
+        `mia_install_matlab.matlab_engine_fingerprint`) is compared with
+        the version of the engine package installed. If the setup.py of the
+        engine gives no literal version, the version of the wheel built for
+        this installation is used instead (see
+        `mia_install_matlab.matlab_engine_wheel_version`): an engine which
+        has never been built is not considered as installed. Neither MATLAB
+        nor pip are run, so this check is instantaneous.
+
+        Returns:
+            bool: True if the installed engine package matches the MATLAB
+                  installation, False otherwise.
+        """
+        fingerprint = matlab_engine_fingerprint(self.matlab_path)
+
+        if fingerprint is None:
+            return False
+
+        installed = installed_matlab_engine_version(fingerprint["name"])
+        expected = fingerprint["version"] or matlab_engine_wheel_version(
+            matlab_engine_wheel_dir(self.matlab_path, fingerprint)
+        )
+        return installed is not None and installed == expected
+
+    def pip_command(self, command, *args):
+        """
+        Returns a package command line, with the options of the installation.
+
+        The command line is built by the installer backend (see the backend
+        parameter in DEFAULT_ANSWERS and `mia_install_backends`), which
+        handles the `--user` flag. If a wheelhouse is given (see the
+        wheelhouse parameter in DEFAULT_ANSWERS), the install, wheel and
+        download commands look for the packages in it only, without any
+        index lookup.
+
+        Args:
+            command (str): The pip command (e.g. 'install').
+            *args (str): The arguments of the pip command.
+
+        Returns:
+            list: The command line, for the current Python interpreter.
+
+        Example:
+            run_command(self.pip_command("install", "populse_mia"), check=True)
+        """
+        wheelhouse = self.answers["wheelhouse"]
+
+        if wheelhouse and command in ("install", "wheel", "download"):
+            args = ("--no-index", "--find-links", wheelhouse, *args)
+
+        return self.backend.command(command, *args)
+
+    def prepare_staging(self, resume=False):
+        """
+        Creates the staging folder of a staged installation.
+
+        The staging folder starts as a copy of the current configuration
+        folder (e.g. the properties and the user processes), without the
+        mri_conv and miaresources folders: these are cloned in it, or moved
+        to it by `commit_staging` if they are kept.
+
+        Args:
+            resume (bool): If True, the staging folder of an interrupted
+                           installation is kept as it is.
+        """
+
+        if resume and os.path.isdir(self.properties_path):
+            return
+
+        self.discard(self.staging_path)
+
+        if not os.path.isdir(self.live_properties_path):
+            os.makedirs(self.properties_path)
+            return
+
+        shutil.copytree(
+            self.live_properties_path,
+            self.properties_path,
+            symlinks=True,
+            ignore=lambda folder, names: (
+                {"mri_conv", "miaresources"}
+                if folder == self.live_properties_path
+                else set()
+            ),
+        )
+
+    def release_hashes(self, package, version):
+        """
+        Returns the sha256 hashes of all the files of a release.
+
+        The files are looked up in the wheelhouse if one is given (see the
+        wheelhouse parameter in DEFAULT_ANSWERS), otherwise with a single
+        request to the PyPi JSON API. All the files of the release (the
+        wheels of every platform and Python version, and the source
+        archive) are included, so that a lockfile recorded on one platform
+        can be installed on another one.
+
+        Args:
+            package (str): The PyPi name of the package.
+            version (str): The version of the release.
+
+        Returns:
+            list: The sorted hashes, empty if the release is not found.
+        """
+        name = _canonical_name(package)
+
+        if self.answers["wheelhouse"]:
+            hashes = []
+
+            for file_name in os.listdir(self.answers["wheelhouse"]):
+                match = DISTRIBUTION_FILE_PATTERN.match(file_name)
+
+                if (
+                    match
+                    and _canonical_name(match.group(1)) == name
+                    and _version_key(match.group(2)) == _version_key(version)
+                ):
+                    hashes.append(
+                        file_sha256(
+                            os.path.join(self.answers["wheelhouse"], file_name)
+                        )
+                    )
+
+            return sorted(hashes)
+
+        try:
+
+            with urlopen(
+                f"https://pypi.org/pypi/{name}/{version}/json", timeout=10
+            ) as response:
+                return sorted(
+                    url["digests"]["sha256"]
+                    for url in json.load(response)["urls"]
+                )
+
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _report_trace(self):
+        """
+        Logs the summary of the installation trace, and exports the trace
+        to the trace_file (see DEFAULT_ANSWERS) if one is given.
+        """
+        summary = tracer.summary()
+
+        if summary:
+            self.log(f"\nInstallation time by step and command:\n{summary}")
+
+        if not self.answers["trace_file"]:
+            return
+
+        try:
+            tracer.export(self.answers["trace_file"])
+            self.log(
+                f"The installation trace has been written to "
+                f"{self.answers['trace_file']}."
+            )
+
+        except OSError as e:
+            self.log(f"The installation trace could not be written: {e}")
+
+    def require_matlab_api(self):
+        """
+        Adds the MATLAB Engine API to the requirements, if MATLAB is used.
+
+        The MATLAB installation is taken from the answers, or found
+        automatically (see `find_matlab_path`). The wheel of its MATLAB
+        Engine API is built beforehand (see `build_matlab_api_wheel`), so
+        that it is installed by the pip transaction of
+        `install_requirements`. A MATLAB Engine API that cannot be built is
+        skipped.
+        """
+
+        if not self.answers["use_matlab"]:
+            return
+
+        matlab = self.answers["matlab_path"] or self.find_matlab_path()
+
+        if not matlab:
+            return
+
+        self.matlab_path = os.path.dirname(
+            os.path.dirname(os.path.realpath(matlab))
+        )
+
+        try:
+            wheel = self.build_matlab_api_wheel()
+
+        except (FileNotFoundError, subprocess.CalledProcessError) as e:
+            self.log(f"{e}\nThe MATLAB Engine API is skipped.")
+            return
+
+        if wheel is not None:
+            name = matlab_engine_fingerprint(self.matlab_path)["name"]
+            self.requirements[name] = [wheel]
+
+    @traced
+    def require_populse_mia(self):
+        """
+        Adds populse_mia and its dependencies to the requirements.
+
+        If a lockfile is given (see the lockfile parameter in
+        DEFAULT_ANSWERS) and exists, the locked packages which are not
+        installed at their locked version are required, with their hashes,
+        so that `install_requirements` installs them without running pip's
+        dependency resolver. Otherwise, populse_mia is required, unless its
+        installed version is already the latest one (see
+        `latest_version`).
+
+        The packages already up to date are added to the `skipped` list.
+        """
+        lockfile = self.answers["lockfile"]
+
+        if lockfile and os.path.isfile(lockfile):
+            outdated = []
+
+            with open(lockfile, encoding="utf8") as stream:
+
+                for line in stream:
+
+                    if not line.strip() or line.startswith("#"):
+                        continue
+
+                    name, _, version = line.split()[0].partition("==")
+
+                    if self.backend.query(name) == version:
+                        self.skipped.append(name)
+
+                    else:
+                        outdated.append(line.strip())
+
+            if outdated:
+                self.requirements["populse_mia"] = outdated
+
+            else:
+                self.log(f"The packages of {lockfile} are up to date.")
+
+            return
+
+        installed = self.backend.query("populse_mia")
+
+        if _is_up_to_date(installed, self.latest_version("populse_mia")):
+            self.log(f"populse_mia {installed} is up to date, skipped.")
+            self.skipped.append("populse_mia")
+
+        else:
+            self.requirements["populse_mia"] = ["populse_mia"]
+
+    def rollback(self):
+        """
+        Restores the configuration folder replaced by a staged installation.
+
+        The current and the previous (usr.previous) configuration folders
+        are swapped, so that a rollback can itself be undone. The mri_conv
+        and miaresources folders moved by `commit_staging` are moved back.
+
+        Returns:
+            bool: True if the previous configuration folder is restored,
+                  False if there is none.
+
+        Raises:
+            OSError: If a folder cannot be renamed.
+        """
+        live = self.live_properties_path
+        previous = f"{live}.previous"
+
+        if not os.path.isdir(previous):
+            self.log(f"There is no previous configuration folder {previous}.")
+            return False
+
+        if os.path.isdir(live):
+
+            for name in ("mri_conv", "miaresources"):
+
+                if not os.path.exists(
+                    os.path.join(previous, name)
+                ) and os.path.isdir(os.path.join(live, name)):
+                    os.rename(
+                        os.path.join(live, name), os.path.join(previous, name)
+                    )
+
+            os.rename(live, f"{live}.rollback")
+
+        os.rename(previous, live)
+
+        if os.path.isdir(f"{live}.rollback"):
+            os.rename(f"{live}.rollback", previous)
+
+        self.write_configuration_path()
+        self.log(f"\nThe previous configuration folder {live} is restored.")
+        return True
+
+    def run_steps(self):
+        """
+        Runs the installation steps, without any user interaction.
+
+        `check_existing_folders` must have been called beforehand, so that
+        the choices for the already existing folders are known.
+
+        The steps (see `install_steps`) are run by `run_step_graph`: the
+        independent network and disk steps (e.g. the git clones and the
+        wheel builds) run concurrently, while the steps using site-packages
+        run one at a time. The `progress` callback is called for a step of
+        STEPS once all the steps of its group are done, so these may be
+        reported in any order. The wheels built during the installation are
+        stored in a temporary folder, deleted at the end.
+
+        Each step, and each command it runs, is timed in the installation
+        trace (see `mia_install_trace`), which is cleared at the start (so
+        that it only covers this run), summarized at the end, and exported
+        to the trace_file (see DEFAULT_ANSWERS) if one is given.
+
+        Each completed step is recorded in a journal: if the installation
+        is interrupted (e.g. by a network failure), the next one resumes it,
+        only running the steps which are not completed (see
+        `completed_steps`). A step whose outputs are missing, or which
+        returns False (e.g. `install_requirements` when some packages
+        could not be installed), is not recorded. The journal is deleted
+        once all the steps are completed.
+
+        For a staged installation (see the staged parameter in
+        DEFAULT_ANSWERS), the steps write a staging folder (see
+        `prepare_staging`), which is switched in once all the steps are
+        completed (see `commit_staging`): the configuration folder used by
+        Mia is never left half-updated.
+
+        Returns:
+            bool: True if all the steps are completed, False if some steps
+                  are incomplete (e.g. if a clone has failed): the next
+                  installation resumes them.
+
+        Raises:
+            - Exception: If any unexpected issues arise during the directory
+                         creation or software installation steps.
+        """
+        tracer.clear()
+        steps = self.install_steps()
+        journal = self.completed_steps(steps)
+        remaining = {
+            group: {name for name in steps if group in steps[name]["groups"]}
+            for group in self.STEPS
+        }
+
+        if journal:
+            self.log(
+                f"Resuming the interrupted installation, already completed: "
+                f"{', '.join(journal)}."
+            )
+
+        # The steps which have returned False
+        incomplete_runs = set()
+
+        def run(name):
+            """Runs a step, and notes if it is incomplete."""
+
+            if steps[name]["run"]() is False:
+                incomplete_runs.add(name)
+
+        def step_done(name):
+            """Records a step, and reports its groups once they are done."""
+            step = steps[name]
+            outputs = list(step["outputs"] or ())
+
+            if (
+                name not in journal
+                and name not in incomplete_runs
+                and all(map(os.path.exists, outputs))
+            ):
+                journal[name] = {
+                    "inputs": self._step_inputs(step),
+                    "outputs": outputs,
+                    "completed": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                self._save_journal(journal)
+
+            for group in steps[name]["groups"]:
+                remaining[group].discard(name)
+
+                if not remaining[group]:
+                    self.progress(group)
+
+        self.skipped = []
+        self.requirements = dict()
+        self.package_errors = dict()
+        self.source_commits = dict()
+        self.build_dir = tempfile.mkdtemp()
+
+        if self.answers["staged"]:
+            self.prepare_staging(resume=bool(journal))
+
+        graph = {
+            name: {
+                **step,
+                "run": lambda name=name: run(name),
+                "after": tuple(
+                    after for after in step["after"] if after not in journal
+                ),
+            }
+            for name, step in steps.items()
+            if name not in journal
+        }
+
+        for name in list(journal):
+            step_done(name)
+
+        try:
+            run_step_graph(graph, step_done)
+
+        except BaseException:
+            self._report_trace()
+            raise
+
+        finally:
+            shutil.rmtree(self.build_dir, ignore_errors=True)
+
+        if self.skipped:
+            self.log(
+                f"Already up to date, skipped: "
+                f"{', '.join(sorted(self.skipped, key=str.lower))}."
+            )
+
+        # The least recently used git mirrors are evicted once no clone is
+        # running anymore
+        if self.answers["git_cache_size"]:
+            max_size = self.answers["git_cache_size"] * 1024**3
+
+            for path in evict_mirrors(max_size):
+                self.log(f"{path} evicted from the git cache.")
+
+        incomplete = [name for name in steps if name not in journal]
+
+        if not incomplete:
+
+            if self.answers["staged"]:
+                self.commit_staging()
+
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+
+        stats = self.trash.wait()
+
+        if stats["trees"]:
+            self.log(
+                f"{stats['trees']} replaced folder(s) deleted in the "
+                f"background in {stats['seconds']:.1f} s "
+                f"({stats['freed'] / 1024 ** 2:.1f} MB freed)."
+            )
+
+        self._report_trace()
+
+        if incomplete:
+            self.log(
+                f"\nIncomplete step(s): {', '.join(incomplete)}. Run the "
+                f"installation again to resume it."
+            )
+
+            if self.answers["staged"]:
+                self.log(
+                    f"The new configuration folder has not been switched "
+                    f"in {self.live_properties_path}: the staging folder "
+                    f"{self.staging_path} is kept for the resumed "
+                    f"installation."
+                )
+
+            return False
+
+        self.log("\nMia has been correctly installed.")
+        return True
+
+    def _save_journal(self, journal):
+        """
+        Writes the journal of the completed steps.
+
+        Args:
+            journal (dict): For each completed step, its record (see
+                            `completed_steps`).
+        """
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+        partial = f"{self.journal_file}.{os.getpid()}.partial"
+
+        with open(partial, "w", encoding="utf8") as stream:
+            json.dump({"steps": journal}, stream, indent=2)
+
+        os.replace(partial, self.journal_file)
+
+    def set_answers(self, answers=None):
+        """Sets the installation parameters and the derived paths.
+
+        Args:
+            answers (dict): The installation parameters to change. The
+                            parameters not given keep their default value.
+
+        Raises:
+            ValueError: If an unknown parameter, a value of the wrong type
+                        (see DEFAULT_ANSWERS) or an invalid value is given.
+        """
+        answers = dict(answers or {})
+        unknown = set(answers) - set(DEFAULT_ANSWERS)
+
+        if unknown:
+            raise ValueError(
+                f"Unknown installation parameter(s): "
+                f"{', '.join(sorted(unknown))}."
+            )
+
+        for key, value in answers.items():
+            default = DEFAULT_ANSWERS[key]
+
+            if isinstance(default, (bool, str, dict)):
+                valid = isinstance(value, type(default))
+
+            else:
+                # The sizes may be decimal, but not negative
+                valid = (
+                    isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                    and value >= 0
+                )
+
+            if not valid:
+                raise ValueError(
+                    f"Invalid value {value!r} for '{key}' (expected "
+                    f"{ANSWER_TYPES[type(default)]})."
+                )
+
+        unknown = set(answers.get("existing_folders", {})) - set(
+            DEFAULT_ANSWERS["existing_folders"]
+        )
+
+        if unknown:
+            raise ValueError(
+                f"Unknown existing folder(s): {', '.join(sorted(unknown))} "
+                f"(expected: "
+                f"{', '.join(DEFAULT_ANSWERS['existing_folders'])})."
+            )
+
+        existing_folders = {
+            **DEFAULT_ANSWERS["existing_folders"],
+            **answers.get("existing_folders", {}),
+        }
+        self.answers = {
+            **DEFAULT_ANSWERS,
+            **answers,
+            "existing_folders": existing_folders,
+        }
+
+        for key, choices in ANSWER_CHOICES.items():
+            values = self.answers[key]
+
+            if isinstance(values, dict):
+                values = values.values()
+
+            else:
+                values = [values]
+
+            for value in values:
+
+                if value not in choices:
+                    raise ValueError(
+                        f"Invalid value '{value}' for '{key}' (expected "
+                        f"one of: {', '.join(choices)})."
+                    )
+
+        mia_config_path = os.path.expanduser(self.answers["mia_config_path"])
+
+        if mia_config_path.endswith(os.sep):
+            mia_config_path = mia_config_path[:-1]
+
+        self.answers["mia_config_path"] = mia_config_path
+        self.backend = select_backend(self.answers["backend"])
+
+        for key in (
+            "wheelhouse",
+            "git_bundles",
+            "lockfile",
+            "build_cache",
+            "resources_store",
+            "trace_file",
+        ):
+
+            if self.answers[key]:
+                self.answers[key] = os.path.abspath(
+                    os.path.expanduser(self.answers[key])
+                )
+
+        self.operating_mode = self.answers["operating_mode"]
+        # The directory in which the configuration is located must be
+        # declared in ~/.populse_mia/configuration_path.yml
+        self.dot_mia_config = os.path.join(
+            os.path.expanduser("~"), ".populse_mia", "configuration_path.yml"
+        )
+        # The journal of the steps completed by an interrupted installation
+        self.journal_file = os.path.join(
+            mia_config_path, "install_journal.json"
+        )
+        # The configuration folder used by Mia, and the one written by the
+        # installation, which is a staging folder for a staged installation
+        self.live_properties_path = os.path.join(mia_config_path, "usr")
+        self.staging_path = os.path.join(mia_config_path, "staging")
+        self.properties_path = (
+            os.path.join(self.staging_path, "usr")
+            if self.answers["staged"]
+            else self.live_properties_path
+        )
+        self.properties_dir = os.path.abspath(
+            os.path.join(self.properties_path, "properties")
+        )
+        self.projects_save_path = os.path.abspath(
+            os.path.join(
+                os.path.expanduser(self.answers["projects_path"]),
+                "projects_mia",
+            )
+        )
+        self.mri_conv_path = os.path.abspath(
+            os.path.join(self.properties_path, "mri_conv")
+        )
+        self.mia_resources_path = os.path.abspath(
+            os.path.join(self.properties_path, "miaresources")
+        )
+
+    def source_wheel_dir(self, url, commit):
+        """Returns the build cache folder of a commit of a repository.
+
+        The wheels built from git sources are stored in the build_cache
+        folder (see DEFAULT_ANSWERS), or in the installer's cache (see
+        `mia_install_utils.cache_dir`), with one folder for each repository
+        and commit. As soma-base, soma-workflow and capsul are pure Python
+        packages, their wheels can be installed on any workstation.
+
+        Args:
+            url (str): The URL of the repository.
+            commit (str): The commit the wheel is built from.
+
+        Returns:
+            str: The path to the folder, which is created if needed.
+        """
+
+        if not self.answers["build_cache"]:
+            return cache_dir("wheels", "git", repository_id(url), commit)
+
+        path = os.path.join(
+            self.answers["build_cache"], repository_id(url), commit
+        )
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _step_inputs(self, step):
+        """
+        Returns the inputs of a step.
+
+        Args:
+            step (dict): The step (see `install_steps`).
+
+        Returns:
+            dict: The values of the installation parameters the step
+                  depends on.
+        """
+        return {key: self.answers[key] for key in step["inputs"]}
+
+    @traced
+    def update_checkout(self, name, path):
+        """
+        Updates an existing working tree in place.
+
+        The new commits are fetched (from the git bundle of the repository
+        if one is available, otherwise through the git mirror cache if it
+        is enabled), then the working tree is fast-forwarded, which only
+        updates the changed files. The local changes are reported and kept;
+        if they conflict with the new commits, the folder is left as it is.
+
+        Args:
+            name (str): The name of the folder ('mri_conv' or
+                        'miaresources').
+            path (str): The path of the folder.
+
+        Returns:
+            bool: False if the folder is not a working tree of the expected
+                  repository (it must then be cloned again), True otherwise.
+        """
+
+        if not self.can_update_folder(name, path):
+            self.log(
+                f"{path} is not a clone of {REPOSITORIES[name]}, it will be "
+                f"replaced."
+            )
+            return False
+
+        start = time.perf_counter()
+
+        try:
+            changes = local_changes(path)
+
+            if changes:
+                self.log(
+                    f"Local changes found in {path} (they are kept):\n"
+                    + "\n".join(changes)
+                )
+
+            source = self._git_bundle(REPOSITORIES[name])
+
+            if source is None and self.answers["git_cache_size"]:
+
+                try:
+                    source = update_mirror(REPOSITORIES[name])
+
+                except (subprocess.CalledProcessError, OSError):
+                    pass
+
+            changed = fast_forward(path, source)
+
+        except subprocess.CalledProcessError as e:
+            self.log(
+                f"{path} could not be updated, it is kept as it is."
+                f"\nError message: {e.stderr or e}"
+            )
+            return True
+
+        self.log(
+            f"{path} updated in {time.perf_counter() - start:.1f} s "
+            f"({len(changed)} file(s) changed)."
+        )
+        return True
+
+    @traced
+    def write_config(self):
+        """
+        Writes the configuration path in ~/.populse_mia/configuration_path.yml
+        (see `write_configuration_path`) and the installation parameters in
+        Mia's config.yml.
+
+        For a staged installation, config.yml is written in the staging
+        folder, with the paths of the configuration folder it replaces, and
+        the configuration path is only written by `commit_staging`.
+        """
+        from populse_mia.software_properties import Config
+
+        if not self.answers["staged"]:
+            self.write_configuration_path()
+
+        answers = self.answers
+        use_matlab = answers["use_matlab"]
+        use_spm = answers["use_spm"]
+        use_spm_standalone = answers["use_spm_standalone"]
+
+        if answers["staged"]:
+            config = Config(properties_path=self.properties_path)
+
+        else:
+            config = Config()
+
+        config.set_projects_save_path(self.projects_save_path)
+        config.set_resources_path(self.live_path(self.mia_resources_path))
+        config.set_mri_conv_path(
+            os.path.join(
+                self.live_path(self.mri_conv_path),
+                "MRIFileManager",
+                "MRIManager.jar",
+            )
+        )
+        config.set_clinical_mode(self.operating_mode == "clinical")
+        config.set_use_matlab(use_matlab)
+        config.set_matlab_path(answers["matlab_path"] if use_matlab else "")
+        config.set_matlab_standalone_path(
+            answers["matlab_standalone_path"] if use_matlab else ""
+        )
+        config.set_use_spm(use_spm)
+        config.set_spm_path(answers["spm_path"] if use_spm else "")
+        config.set_use_spm_standalone(use_spm_standalone)
+        config.set_spm_standalone_path(
+            answers["spm_standalone_path"] if use_spm_standalone else ""
+        )
+
+    @traced
+    def write_configuration_path(self):
+        """
+        Writes the configuration path in
+        ~/.populse_mia/configuration_path.yml.
+        """
+        from populse_mia.utils import verCmp
+
+        dot_mia_config = self.dot_mia_config
+
+        # ~/.populse_mia/configuration_path.yml management/initialisation
+        if not os.path.exists(os.path.dirname(dot_mia_config)):
+            os.mkdir(os.path.dirname(dot_mia_config))
+            self.log(
+                "\nThe {} directory is created "
+                "...".format(os.path.dirname(dot_mia_config))
+            )
+            Path(os.path.join(dot_mia_config)).touch()
+
+        if not os.path.exists(dot_mia_config):
+            Path(os.path.join(dot_mia_config)).touch()
+
+        # We try to keep the old values in dot_mia_config file
+        with open(dot_mia_config) as stream:
+
+            try:
+
+                if verCmp(yaml.__version__, "5.1", "sup"):
+                    mia_home_properties_path = yaml.load(
+                        stream, Loader=yaml.FullLoader
+                    )
+
+                else:
+                    mia_home_properties_path = yaml.load(stream)
+
+                if mia_home_properties_path is None or not isinstance(
+                    mia_home_properties_path, dict
+                ):
+                    mia_home_properties_path = dict()
+
+            except yaml.YAMLError:
+                mia_home_properties_path = dict()
+
+        # Adding properties_user_path to dot_mia_config file
+        mia_home_properties_path["properties_user_path"] = os.path.dirname(
+            self.live_properties_path
+        )
+
+        with open(dot_mia_config, "w", encoding="utf8") as configfile:
+            yaml.dump(
+                mia_home_properties_path,
+                configfile,
+                default_flow_style=False,
+                allow_unicode=True,
+            )
+
+    @traced
+    def write_lockfile(self, path, packages=("populse_mia",)):
+        """
+        Records the exact versions and hashes of a set of packages.
+
+        The lockfile records the reference installation as it is: the
+        installed distributions the given packages need (see
+        `_installed_dependencies`), at their installed version. The
+        packages installed from a local file or a URL (e.g. the wheels
+        built from git, or the MATLAB Engine API) are not on the index:
+        they are not locked, since the installation provides them itself.
+
+        The lockfile is written in the requirements file format, with one
+        pinned requirement per package, and the hashes of all the files of
+        its release (see `release_hashes`), so that it can be installed by
+        `pip install --no-deps --require-hashes -r lockfile` on any
+        platform and Python version.
+
+        Args:
+            path (str): The path of the lockfile to write.
+            packages (tuple): The PyPi names of the packages to lock.
+
+        Returns:
+            int: The number of locked packages.
+
+        Raises:
+            ValueError: If a package is not installed (e.g. in a user
+                        site-packages which is not in `sys.path`), if there
+                        is no package to lock, or if the files of a release
+                        are not found. The lockfile is then not written.
+        """
+        distributions = _installed_dependencies(packages)
+        missing = [
+            package
+            for package in packages
+            if _canonical_name(package) not in distributions
+        ]
+
+        if missing:
+            raise ValueError(
+                f"{', '.join(missing)} cannot be locked: not found in the "
+                f"current Python environment."
+            )
+
+        lines = []
+
+        for distribution in distributions.values():
+
+            if distribution.read_text("direct_url.json") is not None:
+                continue
+
+            name = distribution.metadata["Name"]
+            hashes = self.release_hashes(name, distribution.version)
+
+            if not hashes:
+                raise ValueError(
+                    f"The files of {name} {distribution.version} are not "
+                    f"found."
+                )
+
+            lines.append(
+                " ".join(
+                    [f"{name}=={distribution.version}"]
+                    + [f"--hash=sha256:{value}" for value in hashes]
+                )
+            )
+
+        if not lines:
+            raise ValueError(
+                f"No package to lock for {', '.join(packages)}: they are "
+                f"all installed from local files or URLs."
+            )
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with open(path, "w", encoding="utf8") as stream:
+            stream.write(
+                f"# Locked by mia_install for {', '.join(packages)}\n"
+                f"# Install with: pip install --no-deps --require-hashes -r "
+                f"{os.path.basename(path)}\n"
+            )
+            stream.write("\n".join(sorted(lines, key=str.lower)) + "\n")
+
+        return len(lines)
@@ -0,0 +1,351 @@
+"""The local cache of git mirrors used during mia's installation.
+
+The repositories cloned by the installer (mri_conv, miaresources, and the
+soma-base, soma-workflow and capsul sources) are kept as bare mirrors in
+the installer's cache (see `mia_install_utils.cache_dir`). A mirror is
+cloned once, then only updated with an incremental fetch, and the working
+trees are cloned from it locally, with their objects hardlinked. The cache
+size is capped by evicting the least recently used mirrors.
+
+It also contains the helpers used to update an existing working tree in
+place, instead of cloning it again, and to write git bundles of the
+repositories for the offline installations.
+
+This module only uses the Python standard library.
+
+:Contains:
+    :Function:
+        - bundle_name
+        - checkout_url
+        - create_bundle
+        - evict_mirrors
+        - fast_forward
+        - local_changes
+        - mirror_path
+        - remote_head
+        - repository_id
+        - same_repository
+        - update_mirror
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import hashlib
+import os
+import shutil
+import subprocess
+
+from mia_install_trace import run_command
+from mia_install_utils import cache_dir, folder_size
+
+# The references fetched in the mirrors: the branches and the tags
+MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+
+
+def _git(*args):
+    """Runs a git command and returns its output.
+
+    Args:
+        *args (str): The arguments of the git command.
+
+    Returns:
+        str: The standard output of the command.
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails.
+        FileNotFoundError: If git is not installed.
+    """
+    return run_command(
+        ["git", *args], check=True, capture_output=True, text=True
+    ).stdout
+
+
+def bundle_name(url):
+    """Returns the file name of the git bundle of a repository.
+
+    Args:
+        url (str): The URL of the repository.
+
+    Returns:
+        str: The file name of the bundle (see `create_bundle`).
+    """
+    return f"{repository_id(url)}.bundle"
+
+
+def create_bundle(url, path):
+    """Writes a git bundle of all the branches and tags of a repository.
+
+    The bundle is created from the mirror of the repository in the cache,
+    which is updated first (see `update_mirror`). A working tree can then
+    be cloned from the bundle, without any network access.
+
+    Args:
+        url (str): The URL of the repository.
+        path (str): The path of the bundle to write.
+
+    Returns:
+        str: The commit of the HEAD of the repository.
+
+    Raises:
+        subprocess.CalledProcessError: If the mirror cannot be updated or
+                                       the bundle cannot be written.
+        FileNotFoundError: If git is not installed.
+    """
+    mirror = update_mirror(url)
+    _git("--git-dir", mirror, "bundle", "create", path, "HEAD", "--all")
+    return _git("--git-dir", mirror, "rev-parse", "HEAD").strip()
+
+
+def checkout_url(path):
+    """Returns the origin URL of a working tree.
+
+    Args:
+        path (str): The path to the folder.
+
+    Returns:
+        str: The URL of the origin remote, or None if the folder is not the
+             top-level folder of a git working tree with an origin remote.
+    """
+
+    try:
+        top_level = _git("-C", path, "rev-parse", "--show-toplevel").strip()
+
+        if os.path.realpath(top_level) != os.path.realpath(path):
+            return None
+
+        return _git("-C", path, "config", "--get", "remote.origin.url").strip()
+
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def remote_head(source):
+    """Returns the commit of the HEAD of a repository, without cloning it.
+
+    Args:
+        source (str): The URL of the repository, or the path to a local
+                      repository or git bundle.
+
+    Returns:
+        str: The commit of HEAD, or None if it cannot be read (e.g. without
+             network access).
+    """
+
+    try:
+        output = _git("ls-remote", source, "HEAD").split()
+
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+    return output[0] if output else None
+
+
+def repository_id(url):
+    """Returns a file name identifying a repository.
+
+    It is used to name the files and folders of a repository in the caches
+    (its mirror, its git bundle and the wheels built from its commits).
+
+    Args:
+        url (str): The URL of the repository.
+
+    Returns:
+        str: The name of the repository, followed by a hash of its URL
+             (e.g. 'mri_conv-0123456789ab').
+    """
+    name = os.path.basename(url.rstrip("/"))
+
+    if name.endswith(".git"):
+        name = name[:-4]
+
+    digest = hashlib.sha256(url.encode("utf8")).hexdigest()[:12]
+    return f"{name}-{digest}"
+
+
+def same_repository(url1, url2):
+    """Checks whether two URLs designate the same repository.
+
+    Args:
+        url1 (str): The first URL.
+        url2 (str): The second URL.
+
+    Returns:
+        bool: True if the URLs only differ by a trailing slash or ".git".
+    """
+
+    def normalize(url):
+        """Removes the optional trailing slash and ".git" of a URL."""
+        url = url.rstrip("/")
+        return url[:-4] if url.endswith(".git") else url
+
+    return normalize(url1) == normalize(url2)
+
+
+def local_changes(path):
+    """Returns the local changes of a working tree.
+
+    Args:
+        path (str): The path to the working tree.
+
+    Returns:
+        list: The lines of `git status --porcelain` (e.g. " M file" for a
+              modified file, "?? file" for an untracked one).
+
+    Raises:
+        subprocess.CalledProcessError: If git status fails.
+    """
+    return _git("-C", path, "status", "--porcelain").splitlines()
+
+
+def fast_forward(path, source=None):
+    """Fetches the new commits of a working tree and fast-forwards it.
+
+    Only the files changed by the new commits are updated, and the local
+    changes are kept (the merge fails if they conflict with the new
+    commits, leaving the working tree untouched).
+
+    Args:
+        path (str): The path to the working tree.
+        source (str): A repository to fetch the branches of origin from
+                      (e.g. the mirror of origin, see `update_mirror`). By
+                      default, they are fetched from origin.
+
+    Returns:
+        list: The paths of the files changed by the update.
+
+    Raises:
+        subprocess.CalledProcessError: If the fetch fails, or if the branch
+                                       cannot be fast-forwarded.
+    """
+    old_head = _git("-C", path, "rev-parse", "HEAD").strip()
+
+    if source is None:
+        _git("-C", path, "fetch", "origin")
+
+    else:
+        _git(
+            "-C",
+            path,
+            "fetch",
+            source,
+            "+refs/heads/*:refs/remotes/origin/*",
+        )
+
+    _git("-C", path, "merge", "--ff-only", "@{upstream}")
+    return _git(
+        "-C", path, "diff", "--name-only", old_head, "HEAD"
+    ).splitlines()
+
+
+def mirror_path(url):
+    """Returns the path of the mirror of a repository in the cache.
+
+    Args:
+        url (str): The URL of the repository.
+
+    Returns:
+        str: The path to the bare mirror (which may not exist yet).
+    """
+    return os.path.join(cache_dir("git"), f"{repository_id(url)}.git")
+
+
+def update_mirror(url):
+    """Creates or updates the mirror of a repository in the cache.
+
+    Only the branches and the tags are mirrored (see MIRROR_REFSPECS), not
+    the other references of the server (e.g. the pull requests of GitHub).
+    An existing mirror is updated with an incremental fetch, which only
+    downloads the new commits. Otherwise, the repository is cloned with
+    `git clone --bare` in a temporary folder, which is then renamed, so
+    that an interrupted clone never leaves a broken mirror in the cache.
+    If another installation sharing the cache has created the mirror in
+    the meantime, its mirror is used. The modification time of the mirror
+    is updated, as it is used for the least recently used eviction.
+
+    Args:
+        url (str): The URL of the repository.
+
+    Returns:
+        str: The path to the bare mirror.
+
+    Raises:
+        subprocess.CalledProcessError: If the clone or the fetch fails.
+        OSError: If the mirror cannot be written (e.g. if git is not
+                 installed).
+    """
+    path = mirror_path(url)
+
+    if os.path.isdir(os.path.join(path, "objects")):
+        run_command(
+            ["git", "--git-dir", path, "fetch", "--prune", "origin"]
+            + MIRROR_REFSPECS,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+        partial = f"{path}.{os.getpid()}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+
+        try:
+            run_command(
+                ["git", "clone", "--bare", url, partial],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+
+            try:
+                os.replace(partial, path)
+
+            except OSError:
+
+                if not os.path.isdir(os.path.join(path, "objects")):
+                    raise
+
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+
+    os.utime(path)
+    return path
+
+
+def evict_mirrors(max_size):
+    """Deletes the least recently used mirrors to cap the cache size.
+
+    Args:
+        max_size (int): The maximum total size of the mirrors, in bytes.
+
+    Returns:
+        list: The paths of the evicted mirrors.
+    """
+    root = cache_dir("git")
+    mirrors = []
+
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+
+        if name.endswith(".git") and os.path.isdir(path):
+            mirrors.append((os.path.getmtime(path), folder_size(path), path))
+
+    total = sum(size for _, size, _ in mirrors)
+    evicted = []
+
+    for _, size, path in sorted(mirrors):
+
+        if total <= max_size:
+            break
+
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        evicted.append(path)
+
+    return evicted
@@ -0,0 +1,526 @@
+"""The module used to find the MATLAB installations of the system.
+
+MATLAB is never started: the installations are found on the filesystem,
+by following the `matlab` executables found in the PATH (which are often
+symbolic links) and by scanning the standard installation folders for
+versioned release folders (e.g. /usr/local/MATLAB/R2023a). The release of
+each installation is read from its VersionInfo.xml file.
+
+The result is cached on disk (see `mia_install_utils.cache_dir`), keyed by
+the PATH and by the modification times of the scanned folders, so that
+later launches get an instant answer as long as nothing has been
+installed or removed.
+
+SPM (run with MATLAB or standalone) and the MATLAB Runtime are also looked
+for in their usual installation folders.
+
+The MATLAB Engine API for Python shipped with an installation is identified
+by a fingerprint (MATLAB release, engine package name and version), read
+from the disk, which is compared with the engine package installed in the
+current Python environment to avoid reinstalling it needlessly. Its
+wheels are cached for each MATLAB release and Python ABI.
+
+:Contains:
+    :Function:
+        - find_matlab
+        - find_matlab_installations
+        - find_matlab_runtime
+        - find_spm
+        - find_spm_standalone
+        - installed_matlab_engine_version
+        - matlab_engine_fingerprint
+        - matlab_engine_wheel_dir
+        - matlab_engine_wheel_version
+        - matlab_executable
+        - read_matlab_release
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import sysconfig
+import xml.etree.ElementTree as ET
+
+from mia_install_trace import traced
+from mia_install_utils import cache_dir, installed_version
+
+# Increased each time the format of the cache file changes
+CACHE_VERSION = 1
+
+# Matches the MATLAB release names (e.g. R2023a)
+RELEASE_PATTERN = re.compile(r"R(\d{4})([ab])")
+
+# Matches the name and version arguments in the setup.py of the MATLAB
+# Engine API for Python
+SETUP_NAME_PATTERN = re.compile(r"""\bname\s*=\s*["']([^"']+)["']""")
+SETUP_VERSION_PATTERN = re.compile(r"""\bversion\s*=\s*["']([^"']+)["']""")
+
+
+def _find_folder(patterns, markers):
+    """Returns the first folder matching a pattern and containing a marker.
+
+    Args:
+        patterns (list): Glob patterns of the candidate folders, by order
+                         of preference. For each pattern, the matching
+                         folders are tried in reverse alphabetical order,
+                         so that the most recent versions come first.
+        markers (list): Glob patterns, relative to a candidate folder, of
+                        which at least one must match for the folder to be
+                        selected.
+
+    Returns:
+        str: The path to the folder found, or an empty string.
+    """
+
+    for pattern in patterns:
+
+        for folder in sorted(glob.glob(pattern), reverse=True):
+
+            if any(
+                glob.glob(os.path.join(glob.escape(folder), marker))
+                for marker in markers
+            ):
+                return folder
+
+    return ""
+
+
+def _install_roots():
+    """Returns the standard folders containing MATLAB releases.
+
+    Returns:
+        list: Glob patterns matching the candidate MATLAB installation
+              folders, for the current platform.
+    """
+
+    if sys.platform == "win32":
+        roots = [
+            os.environ.get("ProgramFiles", r"C:\Program Files"),
+            os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)"),
+        ]
+        return [os.path.join(root, "MATLAB", "R*") for root in roots]
+
+    if sys.platform == "darwin":
+        return [
+            "/Applications/MATLAB_R*.app",
+            os.path.join(
+                os.path.expanduser("~"), "Applications", "MATLAB_R*.app"
+            ),
+        ]
+
+    return [
+        "/usr/local/MATLAB/R*",
+        "/opt/MATLAB/R*",
+        "/opt/matlab/R*",
+        os.path.join(os.path.expanduser("~"), "MATLAB", "R*"),
+    ]
+
+
+def _cache_key():
+    """Computes the key identifying the state of the scanned folders.
+
+    The key changes when the PATH changes, or when an entry is added to or
+    removed from one of the PATH folders or of the standard installation
+    folders (which changes the modification time of the folder).
+
+    Returns:
+        str: The key, as an hexadecimal digest.
+    """
+    path = os.environ.get("PATH", "")
+    folders = path.split(os.pathsep) + [
+        os.path.dirname(pattern) for pattern in _install_roots()
+    ]
+    mtimes = []
+
+    for folder in folders:
+
+        try:
+            mtimes.append(os.stat(folder).st_mtime_ns)
+
+        except OSError:
+            mtimes.append(None)
+
+    state = json.dumps([CACHE_VERSION, path, folders, mtimes])
+    return hashlib.sha256(state.encode("utf-8")).hexdigest()
+
+
+def _release_key(installation):
+    """Returns the key used to rank the MATLAB installations.
+
+    Args:
+        installation (dict): A MATLAB installation, as returned by
+                             `find_matlab_installations`.
+
+    Returns:
+        tuple: The installation found in the PATH comes first, then the
+               most recent releases.
+    """
+    match = RELEASE_PATTERN.fullmatch(installation["release"] or "")
+    release = (int(match.group(1)), match.group(2)) if match else (0, "")
+    return (installation["on_path"], release, installation["version"] or "")
+
+
+def matlab_executable(matlab_root):
+    """Returns the MATLAB executable of a MATLAB installation folder.
+
+    Args:
+        matlab_root (str): The MATLAB installation folder.
+
+    Returns:
+        str: The path to the MATLAB executable (`bin/matlab` or
+             `bin/matlab.exe`), or an empty string if there is none.
+    """
+
+    for name in ("matlab", "matlab.exe"):
+        executable = os.path.join(matlab_root, "bin", name)
+
+        if os.path.isfile(executable):
+            return executable
+
+    return ""
+
+
+def read_matlab_release(matlab_root):
+    """Reads the release of a MATLAB installation from the disk.
+
+    The release is read from the VersionInfo.xml file of the installation
+    folder. If there is no such file, it is deduced from the name of the
+    folder (e.g. R2023a or MATLAB_R2023a.app).
+
+    Args:
+        matlab_root (str): The MATLAB installation folder.
+
+    Returns:
+        tuple: The release (e.g. 'R2023a') and the version (e.g.
+               '9.14.0.2206163'), each being None if unknown.
+    """
+    release = version = None
+
+    try:
+        tree = ET.parse(os.path.join(matlab_root, "VersionInfo.xml"))
+        release = (tree.findtext("release") or "").strip() or None
+        version = (tree.findtext("version") or "").strip() or None
+
+    except (OSError, ET.ParseError):
+        pass
+
+    if release is None:
+        match = RELEASE_PATTERN.search(os.path.basename(matlab_root))
+
+        if match:
+            release = match.group(0)
+
+    return release, version
+
+
+def _scan_installations():
+    """Scans the filesystem for the MATLAB installations.
+
+    Returns:
+        list: The MATLAB installations, not ranked.
+    """
+    installations = []
+    # The installation folders, with symbolic links resolved
+    on_path = set()
+
+    for folder in os.environ.get("PATH", "").split(os.pathsep):
+
+        for name in ("matlab", "matlab.exe"):
+            executable = os.path.join(folder, name)
+
+            if not os.path.isfile(executable):
+                continue
+
+            bin_dir = os.path.dirname(os.path.realpath(executable))
+
+            if os.path.basename(bin_dir) == "bin":
+                on_path.add(os.path.dirname(bin_dir))
+
+    candidates = set(on_path)
+
+    for pattern in _install_roots():
+        candidates.update(map(os.path.realpath, glob.glob(pattern)))
+
+    for matlab_root in sorted(candidates):
+        executable = matlab_executable(matlab_root)
+
+        if not executable:
+            continue
+
+        release, version = read_matlab_release(matlab_root)
+        installations.append(
+            {
+                "root": matlab_root,
+                "executable": executable,
+                "release": release,
+                "version": version,
+                "on_path": matlab_root in on_path,
+            }
+        )
+
+    return installations
+
+
+@traced
+def find_matlab_installations(use_cache=True, log=None):
+    """Finds the MATLAB installations of the system, without running MATLAB.
+
+    Args:
+        use_cache (bool): If False, the filesystem is scanned again even if
+                          the cached result is still valid.
+        log (callable): Called with the message of a non-fatal error (e.g.
+                        if the result cannot be cached), ignored if None.
+
+    Returns:
+        list: The MATLAB installations, best first: the one whose
+              executable is in the PATH, then the most recent releases.
+              Each installation is a dictionary with the keys:
+                  - root: the MATLAB installation folder
+                  - executable: the path to the MATLAB executable
+                  - release: the release (e.g. 'R2023a') or None
+                  - version: the version (e.g. '9.14.0.2206163') or None
+                  - on_path: True if MATLAB is found through the PATH
+    """
+    cache_file = os.path.join(cache_dir("matlab"), "installations.json")
+    key = _cache_key()
+
+    if use_cache:
+
+        try:
+
+            with open(cache_file, encoding="utf8") as stream:
+                cached = json.load(stream)
+
+            if cached["key"] == key and all(
+                os.path.isfile(installation["executable"])
+                for installation in cached["installations"]
+            ):
+                return cached["installations"]
+
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    installations = sorted(
+        _scan_installations(), key=_release_key, reverse=True
+    )
+
+    try:
+
+        with open(cache_file, "w", encoding="utf8") as stream:
+            json.dump({"key": key, "installations": installations}, stream)
+
+    except OSError as e:
+
+        if log is not None:
+            log(f"The MATLAB installations could not be cached ({e}).")
+
+    return installations
+
+
+def find_matlab(use_cache=True, log=None):
+    """Finds the best MATLAB installation of the system.
+
+    Args:
+        use_cache (bool): See `find_matlab_installations`.
+        log (callable): See `find_matlab_installations`.
+
+    Returns:
+        dict: The best ranked MATLAB installation (see
+              `find_matlab_installations`), or None if there is none.
+    """
+    installations = find_matlab_installations(use_cache, log)
+    return installations[0] if installations else None
+
+
+def find_matlab_runtime():
+    """Finds the MATLAB Runtime (MCR), used to run the standalone SPM.
+
+    Returns:
+        str: The path to the MATLAB Runtime folder (e.g.
+             /usr/local/MATLAB/MATLAB_Runtime/R2023a), or an empty string.
+    """
+
+    if sys.platform == "win32":
+        roots = [
+            os.path.join(
+                os.environ.get("ProgramFiles", r"C:\Program Files"),
+                "MATLAB",
+                "MATLAB Runtime",
+            )
+        ]
+
+    elif sys.platform == "darwin":
+        roots = ["/Applications/MATLAB/MATLAB_Runtime"]
+
+    else:
+        roots = [
+            "/usr/local/MATLAB/MATLAB_Runtime",
+            "/opt/MATLAB/MATLAB_Runtime",
+            "/opt/mcr",
+            os.path.join(os.path.expanduser("~"), "MATLAB_Runtime"),
+        ]
+
+    return _find_folder(
+        [os.path.join(root, "*") for root in roots], ["runtime"]
+    )
+
+
+def find_spm(matlab_root=None):
+    """Finds an SPM installation, to be run with MATLAB.
+
+    Args:
+        matlab_root (str): The MATLAB installation folder, whose toolbox
+                           folder is searched first.
+
+    Returns:
+        str: The path to the SPM folder (the one containing spm.m), or an
+             empty string.
+    """
+    home = os.path.expanduser("~")
+    patterns = [
+        os.path.join(home, "spm*"),
+        os.path.join(home, "Documents", "MATLAB", "spm*"),
+        os.path.join(home, "MATLAB", "spm*"),
+        "/usr/local/spm*",
+        "/opt/spm*",
+        "/usr/local/MATLAB/spm*",
+    ]
+
+    if matlab_root:
+        patterns.insert(0, os.path.join(matlab_root, "toolbox", "spm*"))
+
+    return _find_folder(patterns, ["spm.m"])
+
+
+def find_spm_standalone():
+    """Finds a standalone SPM installation, to be run with the MATLAB
+    Runtime.
+
+    Returns:
+        str: The path to the standalone SPM folder (the one containing
+             run_spm12.sh, or spm12.exe on Windows), or an empty string.
+    """
+    home = os.path.expanduser("~")
+    patterns = [
+        os.path.join(home, "spm*"),
+        os.path.join(home, "spm*", "spm*"),
+        "/usr/local/spm*",
+        "/usr/local/spm*/spm*",
+        "/opt/spm*",
+        "/opt/spm*/spm*",
+    ]
+    return _find_folder(patterns, ["run_spm*.sh", "spm*.exe"])
+
+
+def installed_matlab_engine_version(name="matlabengine"):
+    """Returns the version of the MATLAB Engine API installed in the current
+    Python environment.
+
+    Args:
+        name (str): The name of the engine package ("matlabengine" since
+                    R2022a, "matlabengineforpython" before).
+
+    Returns:
+        str: The installed version, or None if the package is not
+             installed.
+    """
+
+    return installed_version(name)
+
+
+def matlab_engine_fingerprint(matlab_root):
+    """Computes the fingerprint of the MATLAB Engine API of an installation.
+
+    The fingerprint is read from the disk: the release comes from
+    VersionInfo.xml, the engine package name and version from the setup.py
+    of the extern/engines/python folder. Releases whose setup.py does not
+    give a literal version have no version: it is only known once their
+    wheel is built (see `matlab_engine_wheel_version`).
+
+    Args:
+        matlab_root (str): The MATLAB installation folder.
+
+    Returns:
+        dict: The fingerprint, with the keys "release", "name" and
+              "version" (None if setup.py gives no literal version), or
+              None if the installation has no MATLAB Engine API for Python.
+    """
+    engine_path = os.path.join(matlab_root, "extern", "engines", "python")
+
+    try:
+
+        with open(os.path.join(engine_path, "setup.py"), encoding="utf8") as f:
+            setup = f.read()
+
+    except OSError:
+        return None
+
+    release, _ = read_matlab_release(matlab_root)
+    name = SETUP_NAME_PATTERN.search(setup)
+    version = SETUP_VERSION_PATTERN.search(setup)
+    return {
+        "release": release,
+        "name": name.group(1) if name else "matlabengine",
+        "version": version.group(1) if version else None,
+    }
+
+
+def matlab_engine_wheel_dir(matlab_root, fingerprint):
+    """Returns the wheel cache folder of a MATLAB Engine API.
+
+    There is one folder for each MATLAB Engine API (identified by its
+    fingerprint and by its MATLAB installation folder, since the engine
+    is bound to it) and each Python ABI (interpreter version and
+    platform), so that a wheel built once can be installed in any other
+    Python environment of the same kind.
+
+    Args:
+        matlab_root (str): The MATLAB installation folder.
+        fingerprint (dict): The fingerprint of the MATLAB Engine API (see
+                            `matlab_engine_fingerprint`).
+
+    Returns:
+        str: The path to the wheel cache folder.
+    """
+    root_digest = hashlib.sha256(
+        os.path.realpath(matlab_root).encode("utf-8")
+    ).hexdigest()[:12]
+    engine = "{}-{}-{}".format(
+        fingerprint["release"],
+        fingerprint["version"] or fingerprint["release"],
+        root_digest,
+    )
+    abi = "{}-{}".format(
+        sys.implementation.cache_tag, sysconfig.get_platform()
+    )
+    return cache_dir("wheels", "matlab_engine", engine, abi)
+
+
+def matlab_engine_wheel_version(wheel_dir):
+    """Returns the version of the MATLAB Engine API wheel of a cache folder.
+
+    Args:
+        wheel_dir (str): The wheel cache folder (see
+                         `matlab_engine_wheel_dir`).
+
+    Returns:
+        str: The version of the cached wheel, read from its file name
+             (name-version-tags.whl), or None if no wheel is cached.
+    """
+    wheels = sorted(glob.glob(os.path.join(wheel_dir, "*.whl")))
+
+    if not wheels:
+        return None
+
+    return os.path.basename(wheels[0]).split("-")[1]
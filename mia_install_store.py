@@ -0,0 +1,198 @@
+"""The site-wide, content-addressed store of the Mia resources.
+
+On a shared server, the miaresources repository can be stored once for
+all the users, instead of being cloned in each user's configuration
+folder. The store contains:
+    - objects/: the read-only files, named by their sha256 checksum, so
+      that a file shared by several commits is only stored once.
+    - trees/: for each commit imported in the store, the list of its
+      folders, files (with their checksum) and symbolic links.
+
+A user's miaresources folder is then a view of a commit, whose files are
+hardlinks to the objects of the store (or symbolic links, when hardlinks
+cannot be created, e.g. across file systems): provisioning a user takes a
+few seconds and almost no disk space.
+
+This module only uses the Python standard library.
+
+:Contains:
+    :Function:
+        - has_tree
+        - import_tree
+        - link_view
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import json
+import os
+import shutil
+import stat
+
+from mia_install_utils import file_sha256
+
+
+def _object_path(store, checksum):
+    """Returns the path of an object of the store.
+
+    Args:
+        store (str): The path to the store.
+        checksum (str): The sha256 checksum of the object.
+
+    Returns:
+        str: The path to the object.
+    """
+    return os.path.join(store, "objects", checksum[:2], checksum)
+
+
+def _tree_path(store, commit):
+    """Returns the path of the tree of a commit in the store.
+
+    Args:
+        store (str): The path to the store.
+        commit (str): The commit.
+
+    Returns:
+        str: The path to the JSON tree file.
+    """
+    return os.path.join(store, "trees", f"{commit}.json")
+
+
+def has_tree(store, commit):
+    """Checks whether a commit has been imported in the store.
+
+    Args:
+        store (str): The path to the store.
+        commit (str): The commit.
+
+    Returns:
+        bool: True if the tree of the commit is in the store.
+    """
+    return os.path.isfile(_tree_path(store, commit))
+
+
+def import_tree(store, source, commit):
+    """Imports a working tree in the store.
+
+    The files which are not already in the store are copied under a
+    temporary name, made read-only, then renamed, so that the store never
+    contains a partial object. The tree of the commit is written last.
+
+    Args:
+        store (str): The path to the store (created if needed).
+        source (str): The path to the working tree (its .git folder is not
+                      imported).
+        commit (str): The commit checked out in the working tree.
+
+    Returns:
+        int: The number of bytes added to the store.
+    """
+    tree = {"folders": [], "files": {}, "links": {}}
+    added = 0
+
+    for root, folders, files in os.walk(source):
+        folders[:] = sorted(name for name in folders if name != ".git")
+        relative_root = os.path.relpath(root, source)
+
+        if relative_root != os.curdir:
+            tree["folders"].append(relative_root.replace(os.sep, "/"))
+
+        for name in folders + sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, source).replace(os.sep, "/")
+
+            if os.path.islink(path):
+                tree["links"][relative] = os.readlink(path)
+                folders[:] = [folder for folder in folders if folder != name]
+                continue
+
+            if name in folders:
+                continue
+
+            checksum = file_sha256(path)
+            executable = bool(os.stat(path).st_mode & stat.S_IXUSR)
+            tree["files"][relative] = [checksum, executable]
+            destination = _object_path(store, checksum)
+
+            if os.path.exists(destination):
+                continue
+
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            partial = f"{destination}.{os.getpid()}.partial"
+            shutil.copyfile(path, partial)
+            os.chmod(partial, 0o555 if executable else 0o444)
+            os.replace(partial, destination)
+            added += os.path.getsize(destination)
+
+    path = _tree_path(store, commit)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(f"{path}.{os.getpid()}.partial", "w", encoding="utf8") as f:
+        json.dump(tree, f)
+
+    os.replace(f"{path}.{os.getpid()}.partial", path)
+    return added
+
+
+def link_view(store, commit, destination):
+    """Creates a view of a commit of the store.
+
+    The view is built in a temporary folder next to the destination, then
+    renamed, so that an interrupted provisioning never leaves a partial
+    view. Its files are hardlinks to the objects of the store, or symbolic
+    links when a hardlink cannot be created (e.g. if the view and the store
+    are on different file systems, or if the objects belong to another user
+    and the system protects hardlinks).
+
+    Args:
+        store (str): The path to the store.
+        commit (str): The commit (see `has_tree`).
+        destination (str): The path of the view, which must not exist.
+
+    Returns:
+        dict: The number of "hardlinks" and "symlinks" created.
+
+    Raises:
+        OSError: If the view cannot be created.
+    """
+
+    with open(_tree_path(store, commit), encoding="utf8") as f:
+        tree = json.load(f)
+
+    partial = f"{destination}.{os.getpid()}.partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    counts = {"hardlinks": 0, "symlinks": 0}
+
+    try:
+
+        for folder in tree["folders"]:
+            os.makedirs(os.path.join(partial, *folder.split("/")))
+
+        for relative, (checksum, _) in tree["files"].items():
+            path = os.path.join(partial, *relative.split("/"))
+            target = os.path.abspath(_object_path(store, checksum))
+
+            try:
+                os.link(target, path)
+                counts["hardlinks"] += 1
+
+            except OSError:
+                os.symlink(target, path)
+                counts["symlinks"] += 1
+
+        for relative, target in tree["links"].items():
+            os.symlink(target, os.path.join(partial, *relative.split("/")))
+
+        os.replace(partial, destination)
+
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+
+    return counts
@@ -0,0 +1,261 @@
+"""The tracing of mia's installation.
+
+The installation steps, the main installer methods and all the commands
+run by the installer (pip, git, ...) are timed as spans of a trace:
+
+    with tracer.span("mri_conv", "step"):
+        ...
+    run_command(["git", "clone", url, path], check=True)
+
+The trace is cleared at the start of each installation (see
+`Tracer.clear`). At the end of the installation, it is summarized as a
+table of the total time of each span name, and can be exported as a
+Chrome trace file (see `Tracer.export`), which can be opened by a standard
+trace viewer (e.g. https://ui.perfetto.dev or chrome://tracing).
+
+This module only uses the Python standard library.
+
+:Contains:
+    :Class:
+        - Tracer
+    :Function:
+        - describe_command
+        - run_command
+        - traced
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import contextlib
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+class Tracer:
+    """Records timed spans, from any thread.
+
+    :Contains:
+        :Method:
+            - __init__
+            - clear
+            - export
+            - span
+            - summary
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self._lock = threading.Lock()
+        # The completed spans, as Chrome trace complete ("X") events
+        self.events = []
+        # The names of the threads which recorded spans
+        self.threads = dict()
+
+    def clear(self):
+        """Forgets the recorded spans, e.g. at the start of a new run."""
+
+        with self._lock:
+            self.events = []
+            self.threads = dict()
+
+    @contextlib.contextmanager
+    def span(self, name, category="step", **args):
+        """Times a block of code as a span.
+
+        Args:
+            name (str): The name of the span.
+            category (str): The category of the span (e.g. "step",
+                            "method" or "command").
+            **args: Details stored with the span; more can be added to the
+                    yielded dictionary.
+
+        Yields:
+            dict: The details of the span.
+        """
+        start = time.perf_counter()
+
+        try:
+            yield args
+
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+
+            with self._lock:
+                self.threads[thread.ident] = thread.name
+                self.events.append(
+                    {
+                        "name": name,
+                        "cat": category,
+                        "ph": "X",
+                        "ts": round(start * 1e6),
+                        "dur": round((end - start) * 1e6),
+                        "pid": os.getpid(),
+                        "tid": thread.ident,
+                        "args": args,
+                    }
+                )
+
+    def export(self, path):
+        """Writes the spans to a Chrome trace file.
+
+        Args:
+            path (str): The path of the JSON file to write.
+        """
+
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": ident,
+                "args": {"name": name},
+            }
+            for ident, name in threads.items()
+        ]
+
+        with open(path, "w", encoding="utf8") as stream:
+            json.dump(
+                {"traceEvents": metadata + events, "displayTimeUnit": "ms"},
+                stream,
+            )
+
+    def summary(self, limit=15):
+        """Returns a table of the total time of each span name.
+
+        Args:
+            limit (int): The maximum number of rows, the longest spans
+                         being shown first.
+
+        Returns:
+            str: The table, or an empty string if there is no span.
+        """
+        totals = dict()
+
+        with self._lock:
+
+            for event in self.events:
+                key = (event["cat"], event["name"])
+                count, total, longest = totals.get(key, (0, 0, 0))
+                totals[key] = (
+                    count + 1,
+                    total + event["dur"],
+                    max(longest, event["dur"]),
+                )
+
+        if not totals:
+            return ""
+
+        rows = sorted(totals.items(), key=lambda item: -item[1][1])[:limit]
+        width = max(len(name) for (_, name), _ in rows)
+        lines = [
+            f"{'Category':<9} {'Name':<{width}} {'Count':>5} "
+            f"{'Total (s)':>9} {'Max (s)':>8}"
+        ]
+
+        for (category, name), (count, total, longest) in rows:
+            lines.append(
+                f"{category:<9} {name:<{width}} {count:>5} "
+                f"{total / 1e6:>9.2f} {longest / 1e6:>8.2f}"
+            )
+
+        return "\n".join(lines)
+
+
+# The tracer of the installation
+tracer = Tracer()
+
+
+def describe_command(command):
+    """Returns a short name of a command.
+
+    Args:
+        command (list): The command line.
+
+    Returns:
+        str: The program and its sub-command (e.g. 'git clone'), or the
+             module and its sub-command for a Python module run with the
+             current interpreter (e.g. 'pip install').
+    """
+
+    if command[0] == sys.executable and command[1:2] == ["-m"]:
+        return " ".join(command[2:4])
+
+    args = iter(command[1:])
+
+    for arg in args:
+
+        if arg in ("-C", "--git-dir"):
+            next(args, None)
+
+        elif not arg.startswith("-"):
+            return f"{os.path.basename(command[0])} {arg}"
+
+    return os.path.basename(command[0])
+
+
+def run_command(command, **kwargs):
+    """Runs a command, timed as a span of the trace.
+
+    Args:
+        command (list): The command line.
+        **kwargs: The arguments of `subprocess.run`.
+
+    Returns:
+        subprocess.CompletedProcess: The completed process.
+
+    Raises:
+        subprocess.CalledProcessError: If `check` is True and the command
+                                       fails.
+        FileNotFoundError: If the program is not found.
+    """
+
+    with tracer.span(
+        describe_command(command), "command", command=" ".join(command)
+    ) as args:
+
+        try:
+            result = subprocess.run(command, **kwargs)
+
+        except subprocess.CalledProcessError as e:
+            args["returncode"] = e.returncode
+            raise
+
+        args["returncode"] = result.returncode
+
+    return result
+
+
+def traced(function):
+    """Decorates a function so that each of its calls is a span.
+
+    Args:
+        function (callable): The function (or method) to trace.
+
+    Returns:
+        callable: The traced function.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        """Calls the function in a span named after it."""
+
+        with tracer.span(function.__qualname__, "method"):
+            return function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,288 @@
+"""The background deletion of the folders replaced during mia's installation.
+
+Deleting a large folder (e.g. miaresources, or the subjects of a projects
+folder) can take minutes. Instead, the folder is renamed into a trash
+folder on the same file system, which is instantaneous, and deleted by a
+pool of background threads while the installation goes on: the sub-folders
+of a large folder are deleted in parallel.
+
+    trash = Trash()
+    trash.discard("/home/user/.populse_mia/usr/miaresources",
+                  "/home/user/.populse_mia/.mia_trash")
+    ...
+    stats = trash.wait()
+
+This module only uses the Python standard library.
+
+:Contains:
+    :Class:
+        - Trash
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import os
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def _remove(path):
+    """Deletes a file or a folder tree, ignoring the errors.
+
+    Args:
+        path (str): The path to delete.
+
+    Returns:
+        int: The number of bytes freed (the files which have other
+             hardlinks do not free any space).
+    """
+    freed = 0
+
+    def unlink(file_path):
+        """Deletes a file and returns the number of bytes freed."""
+
+        try:
+            info = os.lstat(file_path)
+            os.unlink(file_path)
+
+        except OSError:
+
+            try:
+                # Read-only files cannot be deleted on Windows
+                os.chmod(file_path, stat.S_IWRITE)
+                info = os.lstat(file_path)
+                os.unlink(file_path)
+
+            except OSError:
+                return 0
+
+        return info.st_size if info.st_nlink == 1 else 0
+
+    if os.path.islink(path) or not os.path.isdir(path):
+        return unlink(path)
+
+    for root, folders, files in os.walk(path, topdown=False):
+
+        for name in files:
+            freed += unlink(os.path.join(root, name))
+
+        for name in folders:
+            folder = os.path.join(root, name)
+
+            if os.path.islink(folder):
+                freed += unlink(folder)
+
+            else:
+
+                try:
+                    os.rmdir(folder)
+
+                except OSError:
+                    pass
+
+    try:
+        os.rmdir(path)
+
+    except OSError:
+        pass
+
+    return freed
+
+
+class Trash:
+    """Deletes folders in the background, after renaming them aside.
+
+    :Contains:
+        :Method:
+            - __init__
+            - discard
+            - wait
+    """
+
+    # The number of threads deleting files
+    WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+    def __init__(self):
+        """Constructor"""
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _expand(self, path, depth=2):
+        """Deletes a path, the entries of its folders in parallel.
+
+        The entries of a folder are submitted to the background threads,
+        down to `depth` levels of sub-folders; the folders themselves are
+        deleted by `wait`, once they are empty.
+
+        Args:
+            path (str): The path to delete.
+            depth (int): The number of levels of sub-folders whose entries
+                         are deleted in parallel.
+        """
+
+        if depth and os.path.isdir(path) and not os.path.islink(path):
+
+            try:
+                entries = [entry.path for entry in os.scandir(path)]
+
+            except OSError:
+                entries = None
+
+            if entries is not None:
+
+                with self._lock:
+                    self._containers.append(path)
+
+                    for entry in entries:
+                        self._submit(self._expand, entry, depth - 1)
+
+                return
+
+        freed = _remove(path)
+
+        with self._lock:
+            self._freed += freed
+            self._end = time.perf_counter()
+
+    def _reset(self):
+        """Resets the background threads and the statistics."""
+        self._executor = None
+        self._futures = []
+        # The folders whose contents are deleted in parallel, deleted last
+        self._containers = []
+        # The trash folders already cleaned from previous installations
+        self._trash_dirs = set()
+        self._freed = 0
+        self._trees = 0
+        # The start of the first deletion and the end of the last one
+        self._start = None
+        self._end = None
+
+    def _submit(self, function, *args):
+        """Runs a function in a background thread.
+
+        Args:
+            function (callable): The function.
+            *args: The arguments of the function.
+        """
+
+        with self._lock:
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.WORKERS)
+
+            self._futures.append(self._executor.submit(function, *args))
+
+    def discard(self, paths, trash_dir):
+        """Renames paths into the trash and deletes them in the background.
+
+        The entries left in the trash folder by a previous installation are
+        deleted as well. If a path cannot be renamed (e.g. if the trash
+        folder is on another file system), it is deleted immediately.
+
+        Args:
+            paths (str or list): The file or folder to delete, or the
+                                 entries of a folder to empty, which count
+                                 as one deleted tree (nothing is done for
+                                 the paths which do not exist).
+            trash_dir (str): The trash folder, on the same file system as
+                             the paths (created if needed).
+        """
+
+        if isinstance(paths, str):
+            paths = [paths]
+
+        paths = [path for path in paths if os.path.lexists(path)]
+
+        if not paths:
+            return
+
+        with self._lock:
+
+            if self._start is None:
+                self._start = time.perf_counter()
+
+            if trash_dir not in self._trash_dirs:
+                os.makedirs(trash_dir, exist_ok=True)
+                self._trash_dirs.add(trash_dir)
+
+                for name in os.listdir(trash_dir):
+                    self._submit(self._expand, os.path.join(trash_dir, name))
+
+            self._trees += 1
+
+        for path in paths:
+            target = os.path.join(
+                trash_dir, f"{os.path.basename(path)}.{uuid.uuid4().hex[:8]}"
+            )
+
+            try:
+                os.rename(path, target)
+
+            except OSError:
+                self._expand(path, depth=0)
+                continue
+
+            self._submit(self._expand, target)
+
+    def wait(self):
+        """Waits for the end of the background deletions.
+
+        Returns:
+            dict: The number of "trees" deleted (see `discard`), the
+                  number of bytes "freed", and the "seconds" elapsed from
+                  the start of the first deletion to the end of the last
+                  one. The statistics are then reset.
+        """
+
+        while True:
+
+            with self._lock:
+                pending = self._futures
+                self._futures = []
+
+            if not pending:
+                break
+
+            # The deletions submit the deletion of their entries before
+            # they are done
+            wait(pending)
+
+        for path in sorted(self._containers, key=len, reverse=True):
+
+            try:
+                os.rmdir(path)
+
+            except OSError:
+                pass
+
+        for trash_dir in self._trash_dirs:
+
+            try:
+                os.rmdir(trash_dir)
+
+            except OSError:
+                pass
+
+        stats = {
+            "trees": self._trees,
+            "freed": self._freed,
+            "seconds": (
+                self._end - self._start if self._start and self._end else 0.0
+            ),
+        }
+
+        if self._executor is not None:
+            self._executor.shutdown()
+
+        self._reset()
+        return stats
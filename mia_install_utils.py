@@ -0,0 +1,135 @@
+"""Utilities shared by the modules of the Mia installer.
+
+This module only uses the Python standard library, so that it can be
+imported before the installer's dependencies are bootstrapped.
+
+:Contains:
+    :Function:
+        - cache_dir
+        - file_sha256
+        - folder_size
+        - installed_version
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import hashlib
+import importlib
+import importlib.metadata
+import os
+import sys
+
+
+def cache_dir(*names):
+    """Returns a folder of the installer's cache, creating it if needed.
+
+    The cache is located in the folder given by the MIA_INSTALL_CACHE
+    environment variable if it is defined (this allows a cache to be shared
+    between users or machines), otherwise in the user's cache folder of the
+    platform.
+
+    Args:
+        *names (str): The names of the sub-folders in the cache.
+
+    Returns:
+        str: The path to the cache folder.
+
+    Example:
+        cache_dir("wheels")  # e.g. ~/.cache/populse_mia_install/wheels
+    """
+    root = os.environ.get("MIA_INSTALL_CACHE")
+
+    if not root:
+
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.join(
+                os.path.expanduser("~"), "AppData", "Local"
+            )
+
+        elif sys.platform == "darwin":
+            base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+
+        root = os.path.join(base, "populse_mia_install")
+
+    path = os.path.join(root, *names)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_sha256(path):
+    """Returns the sha256 checksum of a file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hexadecimal checksum.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as stream:
+
+        for chunk in iter(lambda: stream.read(1024**2), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def folder_size(path):
+    """Returns the total size of the files in a folder.
+
+    Symbolic links are not followed, and files that disappear during the
+    walk are ignored.
+
+    Args:
+        path (str): The path to the folder.
+
+    Returns:
+        int: The size, in bytes, of all the files in the folder and its
+             sub-folders.
+    """
+    size = 0
+
+    for root, _, files in os.walk(path):
+
+        for name in files:
+
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+
+            except OSError:
+                pass
+
+    return size
+
+
+def installed_version(package):
+    """Returns the installed version of a distribution, without importing it.
+
+    Args:
+        package (str): The PyPi name of the package.
+
+    Returns:
+        str: The installed version, or None if the package is not
+             installed.
+    """
+    # The packages may have been installed since the import system has
+    # cached the directory listings
+    importlib.invalidate_caches()
+
+    try:
+        return importlib.metadata.version(package)
+
+    except importlib.metadata.PackageNotFoundError:
+        return None
@@ -4,6 +4,8 @@ Basically, this module is dedicated to the GUI used at the installation time
 
 :Contains:
     :Class:
+        - EnvironmentProbe
+        - InstallWorker
         - MIAInstallWidget
 
 
@@ -19,15 +21,122 @@ Basically, this module is dedicated to the GUI used at the installation time
 
 
 import os
-import shutil
-import subprocess
-import sys
-import tempfile
-from pathlib import Path
+import traceback
 
-import yaml
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from mia_install_engine import MIAInstaller
+from mia_install_matlab import (
+    find_matlab_runtime,
+    find_spm,
+    find_spm_standalone,
+)
+
+
+class EnvironmentProbe(QtCore.QThread):
+    """Probes the environment in the background.
+
+    The probes (MATLAB lookup, SPM and standalone discovery, MATLAB Engine
+    API installation check) may take some time, so they are run in this
+    thread to let the installation window be displayed immediately. The
+    `probe_done` signal is emitted, with the name and the result of the
+    probe, as each probe finishes; the "done" probe is emitted last.
+
+    :Contains:
+        :Method:
+            - __init__
+            - run
+    """
+
+    probe_done = QtCore.pyqtSignal(str, object)
+
+    def __init__(self, installer, parent=None):
+        """Constructor
+
+        Args:
+            installer (MIAInstaller): The installation engine.
+            parent (QtCore.QObject): The parent of the thread.
+        """
+        super().__init__(parent)
+        self.installer = installer
+
+    def run(self):
+        """Runs the probes, from the fastest to the slowest."""
+        matlab = self.installer.find_matlab_path()
+        self.probe_done.emit("matlab", matlab)
+        self.probe_done.emit("spm", find_spm(self.installer.matlab_path))
+        self.probe_done.emit("spm_standalone", find_spm_standalone())
+        self.probe_done.emit("matlab_standalone", find_matlab_runtime())
+
+        if matlab:
+            # The MATLAB Engine API is only installed, if needed, once the
+            # user has confirmed the use of Matlab
+            self.probe_done.emit(
+                "matlab_api", self.installer.matlab_api_installed()
+            )
+
+        self.probe_done.emit("done", None)
+
+
+class InstallWorker(QtCore.QThread):
+    """Runs the installation steps in the background.
+
+    The installation engine's callbacks are bound to the signals of this
+    thread, so that the widget is kept responsive and updated live during
+    the whole installation:
+        - `step_done` is emitted with the name of each completed step
+          (see `mia_install_engine.MIAInstaller.STEPS`).
+        - `log_message` is emitted with each message of the engine.
+        - `install_finished` is emitted at the end, with True and an empty
+          string on success, or False and the error message on failure
+          (including when some steps are incomplete).
+
+    :Contains:
+        :Method:
+            - __init__
+            - run
+    """
+
+    step_done = QtCore.pyqtSignal(str)
+    log_message = QtCore.pyqtSignal(str)
+    install_finished = QtCore.pyqtSignal(bool, str)
+
+    def __init__(self, installer, parent=None):
+        """Constructor
+
+        Args:
+            installer (MIAInstaller): The installation engine, whose
+                                      existing folders have already been
+                                      checked.
+            parent (QtCore.QObject): The parent of the thread.
+        """
+        super().__init__(parent)
+        self.installer = installer
+        installer.progress = self.step_done.emit
+        installer.log = self.log_message.emit
+
+    def run(self):
+        """Runs the installation steps."""
+
+        try:
+            completed = self.installer.run_steps()
+
+        except Exception as e:
+            self.log_message.emit(traceback.format_exc())
+            self.install_finished.emit(False, f"{type(e).__name__}: {e}")
+
+        else:
+
+            if completed:
+                self.install_finished.emit(True, "")
+
+            else:
+                self.install_finished.emit(
+                    False,
+                    "Some installation steps are incomplete. Run the "
+                    "installation again to resume it.",
+                )
+
 
 ###############################################################################
 # Currently in host installation, we make installation from sources for capsul,
@@ -47,29 +156,39 @@ class MIAInstallWidget(QtWidgets.QWidget):
             - browse_projects_path
             - browse_spm
             - browse_spm_standalone
+            - ask_existing_folder
             - btnstate
-            - clone_miaResources
-            - find_matlab_path
+            - closeEvent
+            - get_answers
             - install
-            - install_matlab_api
-            - install_package
+            - install_finished
             - last_layout
-            - make_mrifilemanager_folder
             - ok_or_abort
+            - probe_finished
             - set_new_layout
-            - uninstall_package
-            - upgrade_soma_capsul
+            - show_log_message
+            - step_done
             - use_matlab_changed
             - use_spm_changed
             - use_spm_standalone_changed
     """
 
-    def __init__(self):
-        """Constructor"""
+    def __init__(self, answers=None):
+        """Constructor
+
+        Args:
+            answers (dict): The installation parameters not set in the
+                            widget (e.g. the wheelhouse, see
+                            `mia_install_engine.DEFAULT_ANSWERS`).
+        """
         super().__init__()
-        # Check if running in a virtual environment
-        self.is_venv = sys.prefix != sys.base_prefix
-        self.matlab_path = ""
+        # The installation parameters not set in the widget
+        self.base_answers = dict(answers or {})
+        # The Qt-free engine doing the installation
+        self.installer = MIAInstaller(
+            self.base_answers, resolve_existing_folder=self.ask_existing_folder
+        )
+        self.install_worker = None
         self.top_label_font = QtGui.QFont()
         self.top_label_font.setBold(True)
 
@@ -92,7 +211,7 @@ class MIAInstallWidget(QtWidgets.QWidget):
             "Mia configuration path:"
         )
         self.mia_config_path_choice = QtWidgets.QLineEdit(
-            os.path.join(os.path.expanduser("~"), ".populse_mia")
+            self.installer.answers["mia_config_path"]
         )
         self.mia_config_path_browse = QtWidgets.QPushButton("Browse")
         self.mia_config_path_browse.clicked.connect(
@@ -131,9 +250,7 @@ class MIAInstallWidget(QtWidgets.QWidget):
         v_box_mia_config.addWidget(self.mia_config_path_label)
         v_box_mia_config.addLayout(h_box_mia_config)
 
-        projects_path_default = os.path.join(
-            os.path.expanduser("~"), "Documents", "user_mia_projects"
-        )
+        projects_path_default = self.installer.answers["projects_path"]
 
         self.projects_path_label = QtWidgets.QLabel("Mia projects path:")
         self.projects_path_choice = QtWidgets.QLineEdit(projects_path_default)
@@ -231,9 +348,8 @@ class MIAInstallWidget(QtWidgets.QWidget):
         self.use_matlab_label = QtWidgets.QLabel("Use Matlab")
         self.use_matlab_checkbox = QtWidgets.QCheckBox("", self)
 
-        matlab_path = self.find_matlab_path()
         self.matlab_label = QtWidgets.QLabel("Matlab path:")
-        self.matlab_choice = QtWidgets.QLineEdit(matlab_path)
+        self.matlab_choice = QtWidgets.QLineEdit()
         self.matlab_browse = QtWidgets.QPushButton("Browse")
         self.matlab_browse.clicked.connect(self.browse_matlab)
 
@@ -352,17 +468,13 @@ class MIAInstallWidget(QtWidgets.QWidget):
         self.setLayout(self.global_layout)
         self.setWindowTitle("MIA installation")
 
-        # Setting the checkbox values
-        if matlab_path == "":
-            self.matlab_choice.setDisabled(True)
-            self.matlab_standalone_choice.setDisabled(True)
-            self.matlab_label.setDisabled(True)
-            self.matlab_standalone_label.setDisabled(True)
-            self.matlab_browse.setDisabled(True)
-            self.matlab_standalone_browse.setDisabled(True)
-        else:
-            self.install_matlab_api()
-            self.use_matlab_checkbox.setChecked(True)
+        # Setting the checkbox values (updated when the probes are finished)
+        self.matlab_choice.setDisabled(True)
+        self.matlab_standalone_choice.setDisabled(True)
+        self.matlab_label.setDisabled(True)
+        self.matlab_standalone_label.setDisabled(True)
+        self.matlab_browse.setDisabled(True)
+        self.matlab_standalone_browse.setDisabled(True)
         self.spm_choice.setDisabled(True)
         self.spm_standalone_choice.setDisabled(True)
         self.spm_label.setDisabled(True)
@@ -379,6 +491,94 @@ class MIAInstallWidget(QtWidgets.QWidget):
             self.use_spm_standalone_changed
         )
 
+        # Probing the environment in the background: the Matlab and SPM
+        # groupboxes are enabled as the probes are finished, and the
+        # installation can start once all the probes are finished
+        self.groupbox_matlab.setDisabled(True)
+        self.groupbox_spm.setDisabled(True)
+        self.push_button_install.setDisabled(True)
+        self.probe = EnvironmentProbe(self.installer, self)
+        self.probe.probe_done.connect(self.probe_finished)
+        self.probe.start()
+
+    def ask_existing_folder(self, name, path):
+        """
+        Asks the user what to do with a folder that already exists.
+
+        This method is used by the installation engine as its
+        `resolve_existing_folder` callback. A warning message box is
+        displayed, and the user's answer is obtained through `ok_or_abort`.
+
+        Args:
+            name (str): The name of the folder ('projects_mia', 'mri_conv'
+                        or 'miaresources').
+            path (str): The path of the existing folder.
+
+        Returns:
+            str: "overwrite" if the user has clicked on "OK", "update" if the
+                 user has clicked on "Update" (only proposed, and selected
+                 by default, when the folder is a clone of the expected
+                 repository). Otherwise, "keep" for the projects folder and
+                 "abort" for the other folders.
+        """
+        self.msg = QtWidgets.QMessageBox()
+        self.msg.setIcon(QtWidgets.QMessageBox.Warning)
+        update_button = None
+
+        if name == "projects_mia":
+            cancel_choice = "keep"
+            self.msg.setText(f"The {path} folder already contains data!")
+            self.msg.setInformativeText(
+                "Hit 'OK' to overwrite this "
+                "folder and its contents.\nPress "
+                "'Cancel' to continue with the "
+                "installation, retaining the "
+                "contents of the folder."
+            )
+
+        else:
+            cancel_choice = "abort"
+            self.msg.setText(
+                "A '{}' folder already exists in the {} "
+                "folder!".format(name, os.path.dirname(path))
+            )
+            self.msg.setInformativeText(
+                "Hit 'OK' to overwrite this folder "
+                "and its contents.\nPressing 'Cancel' "
+                "will abort the installation."
+            )
+
+        self.msg.setWindowTitle("Warning")
+        self.msg.setStandardButtons(
+            QtWidgets.QMessageBox.Ok | QtWidgets.QMessageBox.Cancel
+        )
+
+        if self.installer.can_update_folder(name, path):
+            self.msg.setInformativeText(
+                "Hit 'Update' to download only the changes of this folder "
+                "(local edits are kept).\n" + self.msg.informativeText()
+            )
+            update_button = self.msg.addButton(
+                "Update", QtWidgets.QMessageBox.ApplyRole
+            )
+            self.msg.setDefaultButton(update_button)
+
+        self.msg.buttonClicked.connect(self.ok_or_abort)
+        self.folder_exists_flag = True
+        self.msg.exec()
+
+        if (
+            update_button is not None
+            and self.msg.clickedButton() is update_button
+        ):
+            return "update"
+
+        # If the user has clicked on "Cancel" we retain the folder or abort
+        if self.folder_exists_flag:
+            return cancel_choice
+
+        return "overwrite"
+
     def browse_matlab(self):
         """
         Opens a file dialog for the user to select a MATLAB executable file.
@@ -568,585 +768,124 @@ class MIAInstallWidget(QtWidgets.QWidget):
             else:
                 self.casa_target_push_button.setChecked(True)
 
-    def find_matlab_path(self):
+    def closeEvent(self, event):
         """
-        Attempts to find the installation path of MATLAB on the system.
-
-        This method tries to locate the MATLAB installation by running the
-        `matlab` command with specific options to retrieve the root directory
-        of MATLAB. It checks if the path is valid and whether the MATLAB
-        executable (`matlab` or `matlab.exe`) exists in the 'bin' directory
-        under the root directory. If the executable is found, it returns the
-        full path to the MATLAB executable.
-
-        If MATLAB cannot be found or an error occurs during the process, an
-        empty string is returned.
-
-        Returns:
-            str: The path to the MATLAB executable if found, otherwise an
-                 empty string.
+        Waits for the environment probes to finish before closing, and
+        prevents the window from being closed during the installation.
 
-        Behavior:
-            - Runs the MATLAB command
-            `matlab -nodisplay -nosplash -nodesktop -r 'disp(matlabroot);exit'`
-            to obtain the root installation directory.
-            - Checks for the existence of the MATLAB executable (`matlab` or
-            `matlab.exe`) under the `bin` folder.
-            - Returns the full path to the executable if found, or an empty
-            string if not.
-            - In case of an exception (e.g., MATLAB is not installed), prints
-            a message and returns an empty string.
+        Args:
+            event (QtGui.QCloseEvent): The close event.
         """
-        return_value = ""
 
-        try:
-            out = subprocess.check_output(
-                [
-                    "matlab",
-                    "-nodisplay",
-                    "-nosplash",
-                    "-nodesktop",
-                    "-r",
-                    "disp(matlabroot);exit",
-                ]
+        if self.install_worker is not None and self.install_worker.isRunning():
+            QtWidgets.QMessageBox.warning(
+                self,
+                "Warning",
+                "The installation is in progress, please wait until it is "
+                "finished.",
             )
-            out_split = out.split()
-            valid_lines = [line for line in out_split if os.path.isdir(line)]
-
-            if len(valid_lines) == 1:
-                matlab_p = valid_lines[0].decode("utf-8")
-                return_v_linux = os.path.join(matlab_p, "bin", "matlab")
-                return_v_windows = os.path.join(matlab_p, "bin", "matlab.exe")
-
-                if os.path.isfile(return_v_linux):
-                    self.matlab_path = matlab_p
-                    return_value = return_v_linux
+            event.ignore()
+            return
 
-                elif os.path.isfile(return_v_windows):
-                    self.matlab_path = matlab_p
-                    return_value = return_v_windows
+        self.probe.wait()
+        super().closeEvent(event)
 
-        except Exception as e:
-            print(
-                f"{e}\nThe matlab path could not be determined "
-                f"automatically ...\n"
-            )
+    def get_answers(self):
+        """
+        Collects the installation parameters from the widgets.
 
-        return return_value
+        Returns:
+            dict: The installation parameters, in the format used by the
+                  installation engine (see
+                  `mia_install_engine.DEFAULT_ANSWERS`).
+        """
+        use_matlab = self.use_matlab_checkbox.isChecked()
+        use_spm = self.use_spm_checkbox.isChecked()
+        use_spm_standalone = self.use_spm_standalone_checkbox.isChecked()
+        return {
+            "mia_config_path": self.mia_config_path_choice.text(),
+            "projects_path": self.projects_path_choice.text(),
+            "install_target": (
+                "host"
+                if self.host_target_push_button.isChecked()
+                else "casa_distro"
+            ),
+            "operating_mode": (
+                "clinical"
+                if self.clinical_mode_push_button.isChecked()
+                else "research"
+            ),
+            "use_matlab": use_matlab,
+            "matlab_path": self.matlab_choice.text() if use_matlab else "",
+            "matlab_standalone_path": (
+                self.matlab_standalone_choice.text() if use_matlab else ""
+            ),
+            "use_spm": use_spm,
+            "spm_path": self.spm_choice.text() if use_spm else "",
+            "use_spm_standalone": use_spm_standalone,
+            "spm_standalone_path": (
+                self.spm_standalone_choice.text() if use_spm_standalone else ""
+            ),
+        }
 
     def install(self):
         """
         Manages the installation and configuration of Mia and associated
         software components.
 
-        This method performs the following steps:
-        1. Installs populse_mia and mia_processes from PyPi.
-        2. Checks the selected installation target (Host or Casa_Distro).
-        3. Configures the operating mode (clinical or research).
-        4. Optionally integrates with MATLAB and SPM based on user selections.
-        5. Manages the creation and initialization of necessary directories and
-           configuration files:
-            - Creates the directory ~/.populse_mia if it does not exist and
-              ensures the presence of configuration files.
-            - Initializes user-specific directories for properties, processes,
-              and projects.
-            - Manages MRI conversion directories and resources.
-        6. Prompts the user with warnings and asks for confirmation before
-           overwriting existing directories if necessary.
-        7. Clones required repositories (MRI conversion tools and
-           miaresources).
-        8. Updates the configuration file with new paths and settings.
-        9. Optionally upgrades packages (soma-base, soma-workflow, capsul) if
-           the Host installation target is selected.
-        10. Finalizes the installation and updates the GUI with the
-            installation status.
-
-        The method requires user input via checkboxes and buttons to configure
-        various aspects of the installation.
-
-        Attributes:
-            - `host_target_push_button`: Defines whether the host target
-              installation is selected.
-            - `clinical_mode_push_button`: Defines whether the clinical mode
-              is selected.
-            - `use_matlab_checkbox`: Defines whether MATLAB integration is
-              enabled.
-            - `use_spm_checkbox`: Defines whether SPM integration is enabled.
-            - `use_spm_standalone_checkbox`: Defines whether standalone SPM
-              integration is enabled.
-            - `mia_config_path_choice`: Path for the configuration directory.
-            - `projects_path_choice`: Path for the projects directory.
-            - `check_box_mia`, `check_box_mri_conv`, `check_box_config`,
-              `check_box_pkgs`: GUI elements for status display.
-
-        Raises:
-            - Exception: If any unexpected issues arise during the directory
-                         creation or software installation steps.
+        The installation itself is done by the Qt-free installation engine
+        (`mia_install_engine.MIAInstaller`). This method:
+        1. Passes the parameters selected in the widgets to the engine.
+        2. Asks the user what to do with the already existing folders
+           (projects, MRI conversion tools and miaresources), and aborts
+           the installation if required.
+        3. Displays the installation status layout, whose checkboxes,
+           progress bar and log are updated as the engine completes each
+           step (see `step_done` and `show_log_message`).
+        4. Runs the installation steps in a worker thread (see
+           `InstallWorker`), so that the window stays responsive.
+
+        The result of the installation is displayed by `install_finished`.
         """
-        # Installing Populse_mia and mia_processes from pypi
-        self.install_package("populse_mia")
-
-        from populse_mia.software_properties import Config
-        from populse_mia.utils import verCmp
-
-        # Flag used later
-        self.folder_exists_flag = False
-
-        # Checking which installation target has been selected
-        if self.host_target_push_button.isChecked():
-            host_target_install = True
-
-        else:
-            host_target_install = False
-
-        # Checking which operating mode has been selected
-        if self.clinical_mode_push_button.isChecked():
-            use_clinical_mode = True
-            self.operating_mode = "clinical"
-
-        else:
-            use_clinical_mode = False
-            self.operating_mode = "research"
-
-        if self.use_matlab_checkbox.isChecked():
-            use_matlab = True
-            matlab = self.matlab_choice.text()
-            matlab_standalone = self.matlab_standalone_choice.text()
-
-        else:
-            use_matlab = False
-            matlab = ""
-            matlab_standalone = ""
-
-        if self.use_spm_checkbox.isChecked():
-            use_spm = True
-            spm = self.spm_choice.text()
-
-        else:
-            use_spm = False
-            spm = ""
-
-        if self.use_spm_standalone_checkbox.isChecked():
-            use_spm_standalone = True
-            spm_standalone = self.spm_standalone_choice.text()
-
-        else:
-            use_spm_standalone = False
-            spm_standalone = ""
-
-        # The directory in which the configuration is located must be
-        # declared in ~/.populse_mia/configuration_path.yml
-        dot_mia_config = os.path.join(
-            os.path.expanduser("~"), ".populse_mia", "configuration_path.yml"
+        self.installer.set_answers({**self.base_answers, **self.get_answers()})
+        self.mia_config_path_choice.setText(
+            self.installer.answers["mia_config_path"]
         )
-        # ~/.populse_mia/configuration_path.yml management/initialisation
-        if not os.path.exists(os.path.dirname(dot_mia_config)):
-            os.mkdir(os.path.dirname(dot_mia_config))
-            print(
-                "\nThe {} directory is created "
-                "...".format(os.path.dirname(dot_mia_config))
-            )
-            Path(os.path.join(dot_mia_config)).touch()
-
-        if not os.path.exists(dot_mia_config):
-            Path(os.path.join(dot_mia_config)).touch()
-
-        # We try to keep the old values in dot_mia_config file
-        with open(dot_mia_config) as stream:
-
-            try:
-
-                if verCmp(yaml.__version__, "5.1", "sup"):
-                    mia_home_properties_path = yaml.load(
-                        stream, Loader=yaml.FullLoader
-                    )
-
-                else:
-                    mia_home_properties_path = yaml.load(stream)
-
-                if mia_home_properties_path is None or not isinstance(
-                    mia_home_properties_path, dict
-                ):
-                    mia_home_properties_path = dict()
-
-            except yaml.YAMLError:
-                mia_home_properties_path = dict()
-
-        mia_home_properties_path_new = dict()
-
-        properties_path = self.mia_config_path_choice.text()
-
-        if properties_path.endswith(os.sep):
-            properties_path = properties_path[:-1]
-            self.mia_config_path_choice.setText(properties_path)
-
-        properties_path = os.path.join(properties_path, "usr")
-
-        # properties folder management / initialisation:
-        properties_dir = os.path.join(properties_path, "properties")
-
-        if not os.path.exists(properties_dir):
-            os.makedirs(properties_dir, exist_ok=True)
-            print(f"\nThe {properties_dir} directory is created...")
-
-        if not os.path.exists(
-            os.path.join(properties_dir, "saved_projects.yml")
-        ):
-            with open(
-                os.path.join(properties_dir, "saved_projects.yml"),
-                "w",
-                encoding="utf8",
-            ) as configfile:
-                yaml.dump(
-                    {"paths": []},
-                    configfile,
-                    default_flow_style=False,
-                    allow_unicode=True,
-                )
-
-            print(
-                "\nThe {} file is created...".format(
-                    os.path.join(properties_dir, "saved_projects.yml")
-                )
-            )
-
-        if not os.path.exists(os.path.join(properties_dir, "config.yml")):
-
-            with open(
-                os.path.join(properties_dir, "config.yml"),
-                "w",
-                encoding="utf8",
-            ) as configfile:
-                yaml.dump(
-                    "gAAAAABd79UO5tVZSRNqnM5zzbl0KDd7Y98KCSKCNizp9aDq"
-                    "ADs9dAQHJFbmOEX2QL_jJUHOTBfFFqa3OdfwpNLbvWNU_rR0"
-                    "VuT1ZdlmTYv4wwRjhlyPiir7afubLrLK4Jfk84OoOeVtR0a5"
-                    "a0k0WqPlZl-y8_Wu4osHeQCfeWFKW5EWYF776rWgJZsjn3fx"
-                    "Z-V2g5aHo-Q5aqYi2V1Kc-kQ9ZwjFBFbXNa1g9nHKZeyd3ve"
-                    "6p3RUSELfUmEhS0eOWn8i-7GW1UGa4zEKCsoY6T19vrimiuR"
-                    "Vy-DTmmgzbbjGkgmNxB5MvEzs0BF2bAcina_lKR-yeICuIqp"
-                    "TSOBfgkTDcB0LVPBoQmogUVVTeCrjYH9_llFTJQ3ZtKZLdeS"
-                    "tFR5Y2I2ZkQETi6m-0wmUDKf-KRzmk6sLRK_oz6GmuTAN8A5"
-                    "1au2v1M=",
-                    configfile,
-                    default_flow_style=False,
-                    allow_unicode=True,
-                )
-
-            print(
-                "\nThe {} file is created...".format(
-                    os.path.join(properties_dir, "config.yml")
-                )
-            )
-
-            # processes/User_processes folder management / initialisation:
-            user_processes_dir = os.path.join(
-                properties_path, "processes", "User_processes"
-            )
-
-            if not os.path.exists(user_processes_dir):
-                os.makedirs(user_processes_dir, exist_ok=True)
-                print(
-                    "\nThe {} directory is created...".format(
-                        user_processes_dir
-                    )
-                )
-
-            if not os.path.exists(
-                os.path.join(user_processes_dir, "__init__.py")
-            ):
-                Path(
-                    os.path.join(
-                        user_processes_dir,
-                        "__init__.py",
-                    )
-                ).touch()
-                print(
-                    "\nThe {} file is created...".format(
-                        os.path.join(properties_dir, "config.yml")
-                    )
-                )
-
-        # project folder management / initialisation:
-        projects_path = os.path.join(
-            self.projects_path_choice.text(), "projects_mia"
-        )
-
-        if not os.path.isdir(projects_path):
-            os.makedirs(projects_path, exist_ok=True)
-            print(f"\nThe {projects_path} directory is created...")
-
-            if len(os.listdir(projects_path)) != 0:
-                message = "The {} folder already contains data!".format(
-                    projects_path
-                )
-                self.msg = QtWidgets.QMessageBox()
-                self.msg.setIcon(QtWidgets.QMessageBox.Warning)
-                self.msg.setText(message)
-                self.msg.setInformativeText(
-                    "Hit 'OK' to overwrite this "
-                    "folder and its contents.\nPress "
-                    "'Cancel' to continue with the "
-                    "installation, retaining the "
-                    "contents of the folder."
-                )
-                self.msg.setWindowTitle("Warning")
-                self.msg.setStandardButtons(
-                    QtWidgets.QMessageBox.Ok | QtWidgets.QMessageBox.Cancel
-                )
-                self.msg.buttonClicked.connect(self.ok_or_abort)
-                self.msg.exec()
-
-            # If the user has clicked on "Cancel" we do nothing. If he clicks
-            # OK, we delete the entire contents of the folder
-            if not self.folder_exists_flag:
-
-                for elmt in os.listdir(projects_path):
-                    elmt_path = os.path.join(projects_path, elmt)
-
-                    try:
-
-                        if os.path.isfile(elmt_path) or os.path.islink(
-                            elmt_path
-                        ):
-                            os.remove(elmt_path)
-
-                        elif os.path.isdir(elmt_path):
-                            shutil.rmtree(elmt_path)
-
-                    except Exception as e:
-                        print(
-                            "Failed to delete {}. Reason: {}".format(
-                                elmt_path, e
-                            )
-                        )
-
-        # MRIFileManager folder management / initialisation:
-        mri_conv_dir = os.path.join(properties_path, "mri_conv")
-
-        if os.path.isdir(mri_conv_dir):
-            message = (
-                "A 'mri_conv' folder already exists in the {} "
-                "folder!".format(properties_path)
-            )
-            self.msg = QtWidgets.QMessageBox()
-            self.msg.setIcon(QtWidgets.QMessageBox.Warning)
-            self.msg.setText(message)
-            self.msg.setInformativeText(
-                "Hit 'OK' to overwrite this folder "
-                "and its contents.\nPressing 'Cancel' "
-                "will abort the installation."
-            )
-            self.msg.setWindowTitle("Warning")
-            self.msg.setStandardButtons(
-                QtWidgets.QMessageBox.Ok | QtWidgets.QMessageBox.Cancel
-            )
-            self.msg.buttonClicked.connect(self.ok_or_abort)
-            self.msg.exec()
 
         # If the user has clicked on "Cancel" the installation is aborted
-        if self.folder_exists_flag:
+        if not self.installer.check_existing_folders():
             return
 
-        else:
-            shutil.rmtree(mri_conv_dir, ignore_errors=True)
-
-        self.properties_dir = os.path.abspath(properties_dir)
-        self.projects_save_path = os.path.abspath(projects_path)
-        self.mri_conv_path = os.path.abspath(mri_conv_dir)
-
         self.set_new_layout()
+        self.install_worker = InstallWorker(self.installer, self)
+        self.install_worker.step_done.connect(self.step_done)
+        self.install_worker.log_message.connect(self.show_log_message)
+        self.install_worker.install_finished.connect(self.install_finished)
+        self.install_worker.start()
 
-        # Updating the checkbox
-        self.check_box_mia.setChecked(True)
-        QtWidgets.QApplication.processEvents()
-
-        # Clones the MRI conversion repository into the specified directory
-        self.make_mrifilemanager_folder(mri_conv_dir)
-
-        # Clone MiaResources
-        miaresources_dir = os.path.join(properties_path, "miaresources")
-        self.mia_resources_path = os.path.abspath(miaresources_dir)
-
-        if os.path.isdir(miaresources_dir):
-            message = (
-                "A 'miaresources' folder already exists in the {} "
-                "folder!".format(properties_path)
-            )
-            self.msg = QtWidgets.QMessageBox()
-            self.msg.setIcon(QtWidgets.QMessageBox.Warning)
-            self.msg.setText(message)
-            self.msg.setInformativeText(
-                "Hit 'OK' to overwrite this folder "
-                "and its contents.\nPressing 'Cancel' "
-                "will abort the installation."
-            )
-            self.msg.setWindowTitle("Warning")
-            self.msg.setStandardButtons(
-                QtWidgets.QMessageBox.Ok | QtWidgets.QMessageBox.Cancel
-            )
-            self.msg.buttonClicked.connect(self.ok_or_abort)
-            self.msg.exec()
-
-        # If the user has clicked on "Cancel" the installation is aborted
-        if self.folder_exists_flag:
-            return
-
-        else:
-            shutil.rmtree(miaresources_dir, ignore_errors=True)
-
-        self.clone_miaResources(miaresources_dir)
-
-        # Updating the checkbox
-        self.check_box_mri_conv.setChecked(True)
-        QtWidgets.QApplication.processEvents()
-
-        # Adding properties_user_path to dot_mia_config file
-        mia_home_properties_path_new["properties_user_path"] = os.path.dirname(
-            properties_path
-        )
-        mia_home_properties_path = {
-            **mia_home_properties_path,
-            **mia_home_properties_path_new,
-        }
-        with open(dot_mia_config, "w", encoding="utf8") as configfile:
-            yaml.dump(
-                mia_home_properties_path,
-                configfile,
-                default_flow_style=False,
-                allow_unicode=True,
-            )
-
-        config = Config()
-        config.set_projects_save_path(projects_path)
-        config.set_resources_path(miaresources_dir)
-        config.set_mri_conv_path(
-            os.path.join(mri_conv_dir, "MRIFileManager", "MRIManager.jar")
-        )
-        config.set_clinical_mode(use_clinical_mode)
-        config.set_use_matlab(use_matlab)
-        config.set_matlab_path(matlab)
-        config.set_matlab_standalone_path(matlab_standalone)
-        config.set_use_spm(use_spm)
-        config.set_spm_path(spm)
-        config.set_use_spm_standalone(use_spm_standalone)
-        config.set_spm_standalone_path(spm_standalone)
-
-        # Updating the checkbox
-        self.check_box_config.setChecked(True)
-        QtWidgets.QApplication.processEvents()
-
-        # Upgrading soma-base, soma_worflow and capsul: we don't know if these
-        # packages are up to date in pypi
-        if host_target_install:
-            self.upgrade_soma_capsul()
-
-        if not host_target_install:
-            self.uninstall_package("populse-db")
-            self.uninstall_package("capsul")
-            self.uninstall_package("soma-base")
-            self.uninstall_package("soma-workflow")
-
-        # Updating the checkbox
-        self.check_box_pkgs.setChecked(True)
-        QtWidgets.QApplication.processEvents()
-
-        # Displaying the result of the installation
-        self.last_layout()
-
-    def install_matlab_api(self):
-        """
-        Installs the MATLAB Engine API for Python.
-
-        This method attempts to install the MATLAB Engine API by calling
-        `pip install .` in the MATLAB `extern/engines/python` directory.
-        It temporarily changes the working directory to execute the
-        installation command and then restores the directory.
-
-        Notes:
-            - `self.matlab_path` must be set to the MATLAB installation path.
-            - This method uses `subprocess.check_call()` to run `pip install .`
-              for compatibility with virtual environments.
-
-        Returns:
-            bool: True if the installation succeeds, False otherwise.
-
-        Raises:
-            - FileNotFoundError: If the MATLAB installation path is invalid.
-            - subprocess.CalledProcessError: If the installation command fails.
-        """
-
-        if not os.path.isdir(self.matlab_path):
-            raise FileNotFoundError(
-                f"The specified MATLAB path "
-                f"'{self.matlab_path}' is invalid."
-            )
-
-        matlab_engine_path = os.path.join(
-            self.matlab_path, "extern", "engines", "python"
-        )
-
-        if not os.path.isdir(matlab_engine_path):
-            raise FileNotFoundError(
-                f"MATLAB Engine API directory not found "
-                f"at '{matlab_engine_path}'."
-            )
-
-        original_dir = os.getcwd()
-        pip_install_command = [sys.executable, "-m", "pip", "install", "."]
-
-        if not self.is_venv:
-            pip_install_command.append("--user")
-
-        try:
-            print("Starting MATLAB Engine API installation...")
-            os.chdir(matlab_engine_path)
-            # Install the package with pip
-            subprocess.check_call(pip_install_command)
-            print("MATLAB Engine API installation completed successfully.")
-            return True
-
-        except subprocess.CalledProcessError as e:
-            print(f"Installation failed: {e}")
-            return False
-
-        finally:
-            os.chdir(original_dir)
-
-    def install_package(self, package):
+    def install_finished(self, success, error):
         """
-        Installs or upgrades a Python package using pip.
-
-        This method constructs a pip command to install or upgrade a
-        specified package.
-        It checks if the current environment is a virtual environment
-        and, if not, adds the `--user` flag to the command to install
-        the package for the current user.
+        Displays the result of the installation.
 
-        The method executes the command using `subprocess.check_call()`
-        to ensure that the package is installed or upgraded successfully.
+        This method is connected to the `install_finished` signal of the
+        installation worker.
 
         Args:
-            package (str): The name of the package to be installed or upgraded.
-
-        Raises:
-            subprocess.CalledProcessError: If the pip installation
-                                           command fails.
+            success (bool): True if the installation has been completed.
+            error (str): The error message if the installation has failed.
         """
-        pip_install_command = [
-            sys.executable,
-            "-m",
-            "pip",
-            "install",
-            "--upgrade",
-            package,
-        ]
 
-        # Add '--user' flag only if not in a virtual environment
-        if not self.is_venv:
-            pip_install_command.insert(4, "--user")
+        if success:
+            self.last_layout()
+            return
 
-        subprocess.check_call(pip_install_command)
+        self.mia_installing_label.setText("Mia installation has failed!")
+        QtWidgets.QMessageBox.critical(
+            self,
+            "Error",
+            f"The installation has failed:\n{error}\n\nSee the "
+            f"installation log for details.",
+        )
 
     def last_layout(self):
         """
@@ -1186,20 +925,20 @@ class MIAInstallWidget(QtWidgets.QWidget):
         h_box_top_label.addStretch(1)
 
         mia_label_text = "- Mia configuration path: {}".format(
-            self.properties_dir
+            self.installer.live_path(self.installer.properties_dir)
         )
         projects_label_text = "- projects path: {}".format(
-            self.projects_save_path
+            self.installer.projects_save_path
         )
         mri_conv_label_text = "- MRIFileManager path: {}".format(
-            self.mri_conv_path
+            self.installer.live_path(self.installer.mri_conv_path)
         )
         mia_resources_label_text = "- MiaResources path: {}".format(
-            self.mia_resources_path
+            self.installer.live_path(self.installer.mia_resources_path)
         )
         operating_mode_label_text = (
             "Populse_MIA has been installed with {} " "mode."
-        ).format(self.operating_mode)
+        ).format(self.installer.operating_mode)
 
         mia_label = QtWidgets.QLabel(mia_label_text)
         projects_label = QtWidgets.QLabel(projects_label_text)
@@ -1240,99 +979,6 @@ class MIAInstallWidget(QtWidgets.QWidget):
 
         self.setLayout(v_box_last_layout)
 
-        QtWidgets.QApplication.processEvents()
-
-    def make_mrifilemanager_folder(self, mri_conv_dir):
-        """
-        Clones the MRI conversion repository into the specified directory.
-
-        Args:
-            mri_conv_dir (str): The directory where the repository will
-                                 be cloned.
-
-        Returns:
-            bool: True if cloning succeeds, False otherwise.
-        """
-        try:
-            subprocess.check_call(
-                [
-                    "git",
-                    "clone",
-                    "https://github.com/populse/mri_conv.git",
-                    mri_conv_dir,
-                ]
-            )
-            return True
-
-        except subprocess.CalledProcessError as e:
-            # Handle errors related to the git clone process
-            print(
-                f"Git clone failed with error code {e.returncode}."
-                f"\nError message: {e}"
-            )
-            return False
-
-        except FileNotFoundError as e:
-            # Handle cases where 'git' is not installed or not found in PATH
-            print(
-                f"Error: 'git' command not found. Please ensure Git is "
-                f"installed and available in your PATH ({e})."
-            )
-            return False
-
-        except Exception as e:
-            # Catch any other unforeseen errors
-            print(f"An unexpected error occurred: {e}")
-            return False
-
-    def clone_miaResources(self, miaresources_dir):
-        """
-        Clones the MiaResources repository from GitLab to the
-        specified directory.
-
-        This method uses `git clone` to download the MiaResources repository
-        from the specified GitLab URL to the given local directory.
-
-        Args:
-            miaresources_dir (str): The directory where the MiaResources
-                                    repository will be cloned.
-
-        Returns:
-        bool: True if cloning succeeds, False otherwise.
-        """
-        try:
-            subprocess.check_call(
-                [
-                    "git",
-                    "clone",
-                    "https://gricad-gitlab.univ-grenoble-alpes.fr/"
-                    "condamie/miaresources.git",
-                    miaresources_dir,
-                ]
-            )
-            return True
-
-        except subprocess.CalledProcessError as e:
-            # Handle errors related to the git clone process
-            print(
-                f"Git clone failed with error code {e.returncode}."
-                f"\nError message: {e}"
-            )
-            return False
-
-        except FileNotFoundError as e:
-            # Handle cases where 'git' is not installed or not found in PATH
-            print(
-                f"Error: 'git' command not found. Please ensure Git is "
-                f"installed and available in your PATH ({e})."
-            )
-            return False
-
-        except Exception as e:
-            # Catch any other unforeseen errors
-            print(f"An unexpected error occurred: {e}")
-            return False
-
     def ok_or_abort(self, button):
         """
         Handles the action when the user clicks a button in a message box.
@@ -1359,20 +1005,66 @@ class MIAInstallWidget(QtWidgets.QWidget):
         else:
             self.folder_exists_flag = True
 
+    def probe_finished(self, name, result):
+        """
+        Updates the widgets when an environment probe is finished.
+
+        The paths found are only filled in the fields that the user has not
+        already filled.
+
+        Args:
+            name (str): The name of the probe ("matlab", "spm",
+                        "spm_standalone", "matlab_standalone",
+                        "matlab_api" or "done").
+            result: The result of the probe (the path found, or an empty
+                    string, for the path probes; whether the MATLAB Engine
+                    API is already installed for the "matlab_api" probe).
+        """
+        fields = {
+            "matlab": self.matlab_choice,
+            "spm": self.spm_choice,
+            "spm_standalone": self.spm_standalone_choice,
+            "matlab_standalone": self.matlab_standalone_choice,
+        }
+
+        if name in fields and result and not fields[name].text():
+            fields[name].setText(result)
+
+        if name == "matlab":
+
+            if result:
+                self.use_matlab_checkbox.setChecked(True)
+
+            self.groupbox_matlab.setDisabled(False)
+
+        elif name == "spm_standalone":
+            self.groupbox_spm.setDisabled(False)
+
+        elif name == "matlab_api":
+            self.use_matlab_label.setToolTip(
+                "The MATLAB Engine API for Python is already installed."
+                if result
+                else "The MATLAB Engine API for Python will be installed."
+            )
+
+        elif name == "done":
+            self.push_button_install.setDisabled(False)
+
     def set_new_layout(self):
         """
         Changes the layout to show the installation progress.
 
         This method sets up a temporary layout to display the progress of the
         installation. It includes a label indicating the installation is
-        ongoing, and checkboxes for tracking the status of various installation
+        ongoing, checkboxes for tracking the status of various installation
         steps, such as installing Mia, MRIFileManager, writing the config file,
-        and installing Python packages. The layout is then set as the current
-        layout for the widget.
+        and installing Python packages, a progress bar and a view of the
+        installation log. The layout is then set as the current layout for
+        the widget.
 
         Modifies:
             The layout of the widget to reflect the installation status, with
-            labels and checkboxes to indicate progress.
+            labels, checkboxes and a progress bar to indicate progress.
         """
         QtWidgets.QWidget().setLayout(self.global_layout)
 
@@ -1408,99 +1100,55 @@ class MIAInstallWidget(QtWidgets.QWidget):
         self.v_box_install_status.addWidget(self.check_box_mri_conv)
         self.v_box_install_status.addWidget(self.check_box_config)
         self.v_box_install_status.addWidget(self.check_box_pkgs)
-        self.v_box_install_status.addStretch(1)
-
-        self.setLayout(self.v_box_install_status)
 
-        QtWidgets.QApplication.processEvents()
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, len(MIAInstaller.STEPS))
+        self.progress_bar.setValue(0)
 
-    @staticmethod
-    def uninstall_package(package):
-        """
-        Uninstalls a Python package using pip.
+        self.log_view = QtWidgets.QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMinimumHeight(150)
 
-        This method attempts to uninstall a specified package using pip.
-        It first tries to use the current Python interpreter
-        (`sys.executable`) to uninstall the package. If an exception occurs
-        (e.g., if pip is not available for the current interpreter), it falls
-        back to using the `pip3` command to uninstall the package.
+        self.v_box_install_status.addWidget(self.progress_bar)
+        self.v_box_install_status.addWidget(self.log_view, 1)
 
-        Args:
-            package (str): The name of the Python package to uninstall.
+        self.setLayout(self.v_box_install_status)
 
-        Raises:
-            subprocess.CalledProcessError: If the package uninstall
-            command fails.
+    def show_log_message(self, message):
         """
-        try:
-            subprocess.check_call(
-                [sys.executable, "-m", "pip", "uninstall", "--yes", package]
-            )
-
-        except Exception:
-            subprocess.check_call(["pip3", "uninstall", "--yes", package])
+        Displays a message of the installation engine.
 
-        except subprocess.CalledProcessError:
-            print(f"Failed to uninstall {package}.")
+        This method is connected to the `log_message` signal of the
+        installation worker. The message is printed and appended to the
+        installation log view.
 
-    def upgrade_soma_capsul(self):
-        """
-        Upgrades the soma-base, soma-workflow, and capsul packages by cloning
-        their latest versions from GitHub and reinstalling them.
-
-        This method performs the following steps:
-            1. Creates a temporary directory to store the cloned repositories.
-            2. Uninstalls the current versions of soma-base,
-               soma-workflow, and capsul.
-            3. Clones each package's repository (soma-base,
-               soma-workflow, and capsul) from GitHub.
-            4. Installs the cloned package using the current Python
-               interpreter with `setup.py install`.
-
-        If any step fails, an error message is printed, and the process
-        continues to the next package. After the upgrades, the method
-        returns to the original working directory and deletes the
-        temporary directory.
-
-        Raises:
-            subprocess.CalledProcessError: If any command execution fails.
+        Args:
+            message (str): The message to display.
         """
-        temp_dir = tempfile.mkdtemp()
-        cwd = os.getcwd()
-        repos = [
-            ("https://github.com/populse/soma-base.git", "soma-base"),
-            ("https://github.com/populse/soma-workflow.git", "soma-workflow"),
-            ("https://github.com/populse/capsul.git", "capsul"),
-        ]
-        pip_install_command = [sys.executable, "-m", "pip", "install", "."]
-
-        if not self.is_venv:
-            pip_install_command.append("--user")
+        print(message)
+        self.log_view.appendPlainText(message.strip("\n"))
 
-        try:
-
-            for repo_url, package_name in repos:
-                clone_dir = os.path.join(temp_dir, package_name)
-                self.uninstall_package(package_name)
-                subprocess.check_call(["git", "clone", repo_url, clone_dir])
-                os.chdir(clone_dir)
-                subprocess.check_call(pip_install_command)
-
-        except Exception as e:
-            print(f"Error while upgrading {package_name}: {e}")
-
-            """if not os.name == 'nt':  # if not on windows
-                   self.uninstall_package('capsul')
-                   os.chmod('upgrade_capsul.sh', 0o777)
-                   subprocess.call('./upgrade_capsul.sh', shell=True)
+    def step_done(self, step):
+        """
+        Updates the installation status when an installation step is
+        completed.
 
-                    self.uninstall_package('soma-base')
-                    os.chmod('upgrade_soma.sh', 0o777)
-                    subprocess.call('./upgrade_soma.sh', shell=True)
-            """
+        This method is connected to the `step_done` signal of the
+        installation worker.
 
-        os.chdir(cwd)
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        Args:
+            step (str): The name of the completed step (see
+                        `mia_install_engine.MIAInstaller.STEPS`).
+        """
+        check_boxes = {
+            "mia": self.check_box_mia,
+            "mri_conv": self.check_box_mri_conv,
+            "config": self.check_box_config,
+            "pkgs": self.check_box_pkgs,
+        }
+        # Updating the checkbox and the progress bar
+        check_boxes[step].setChecked(True)
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
 
     def use_matlab_changed(self):
         """
@@ -0,0 +1,230 @@
+"""The module used to build the self-contained Mia installer.
+
+The installer modules and their pure-Python dependencies (pyyaml, without
+its C extension, and packaging) are packed into a single runnable zip
+archive, with their bytecode precompiled so that nothing is compiled when
+the installer is launched. At the first launch, only the platform-specific
+packages (PyQt5 and cryptography) are installed if they are missing, from
+a local wheel cache (see `mia_install_utils.cache_dir`) that is itself
+filled only with the wheels it does not already contain:
+
+    python3 mia_install_zipapp.py --output mia_install.pyz --measure 3
+    python3 mia_install.pyz
+
+:Contains:
+    :Function:
+        - build_zipapp
+        - main
+        - measure_launch_time
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import argparse
+import compileall
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipapp
+
+# The pure-Python dependencies embedded in the archive
+PURE_PACKAGES = ["pyyaml", "packaging"]
+
+# The entry point of the archive
+MAIN_SOURCE = '''"""Entry point of the self-contained Mia installer."""
+
+import sys
+
+import install_mia
+from mia_install_utils import cache_dir
+
+sys.exit(install_mia.main(wheel_cache=cache_dir("wheels")))
+'''
+
+
+def build_zipapp(output="mia_install.pyz"):
+    """Builds the self-contained installer archive.
+
+    The build is done in a temporary staging folder:
+        1. The installer modules are copied.
+        2. The pure-Python dependencies are installed with pip, and their
+           compiled extensions (e.g. the optional libyaml bindings) are
+           removed, so that the archive does not depend on the platform.
+        3. All the modules are compiled to unchecked hash-based .pyc files
+           stored next to their sources, which is where zipimport looks
+           for them. An interpreter of another version falls back to the
+           sources.
+        4. The archive is created without compression, so that the
+           modules can be read directly at launch.
+
+    Args:
+        output (str): The path of the archive to create.
+
+    Returns:
+        str: The path of the created archive.
+
+    Raises:
+        subprocess.CalledProcessError: If the pip installation of the
+                                       dependencies fails.
+    """
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    staging = tempfile.mkdtemp()
+
+    try:
+
+        for name in sorted(os.listdir(source_dir)):
+
+            if name == "install_mia.py" or (
+                name.startswith("mia_install_")
+                and name.endswith(".py")
+                and name != os.path.basename(__file__)
+            ):
+                shutil.copy2(os.path.join(source_dir, name), staging)
+
+        subprocess.check_call(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--target",
+                staging,
+                "--no-deps",
+                "--no-compile",
+                "--only-binary=:all:",
+            ]
+            + PURE_PACKAGES
+        )
+        shutil.rmtree(os.path.join(staging, "bin"), ignore_errors=True)
+
+        for root, _, files in os.walk(staging):
+
+            for name in files:
+
+                if name.endswith((".so", ".pyd", ".dylib")):
+                    os.remove(os.path.join(root, name))
+
+        with open(
+            os.path.join(staging, "__main__.py"), "w", encoding="utf8"
+        ) as main_file:
+            main_file.write(MAIN_SOURCE)
+
+        compileall.compile_dir(
+            staging,
+            quiet=1,
+            legacy=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+        zipapp.create_archive(
+            staging, output, interpreter="/usr/bin/env python3"
+        )
+
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    print(
+        f"{output} has been created "
+        f"({os.path.getsize(output) / 1024 ** 2:.1f} MB)."
+    )
+    return output
+
+
+def measure_launch_time(archive, runs=3):
+    """Measures the launch-to-window time of the installer archive.
+
+    The archive is launched in a new interpreter (ignoring the PYTHON*
+    environment variables), which quits as soon as the installation
+    window is displayed. The measured time thus includes the interpreter
+    startup, the bootstrap and the construction of the window.
+
+    Args:
+        archive (str): The path of the installer archive.
+        runs (int): The number of launches.
+
+    Returns:
+        list: The launch-to-window times, in seconds.
+
+    Raises:
+        RuntimeError: If the installer exits without displaying its window
+                      (e.g. when there is no display).
+    """
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-E", archive, "--startup-time"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        output = []
+        displayed = False
+
+        for line in proc.stdout:
+            output.append(line)
+
+            if line.startswith("Window displayed"):
+                times.append(time.perf_counter() - start)
+                displayed = True
+                break
+
+        proc.communicate()
+
+        if not displayed:
+            raise RuntimeError(
+                "The installer window was not displayed:\n" + "".join(output)
+            )
+
+    print(
+        f"Launch-to-window time over {runs} run(s): "
+        f"min {min(times):.2f} s, mean {sum(times) / len(times):.2f} s."
+    )
+    return times
+
+
+def main(argv=None):
+    """Builds the installer archive from the command line.
+
+    Args:
+        argv (list): The command line arguments (sys.argv[1:] if None).
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the self-contained Mia installer."
+    )
+    parser.add_argument(
+        "--output",
+        default="mia_install.pyz",
+        help="path of the archive to create (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--measure",
+        type=int,
+        default=0,
+        metavar="RUNS",
+        help="measure the launch-to-window time over RUNS launches",
+    )
+    args = parser.parse_args(argv)
+    build_zipapp(args.output)
+
+    if args.measure:
+        measure_launch_time(args.output, args.measure)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Tests of the command lines built by the package installer backends."""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import sys
+
+import pytest
+
+from mia_install_backends import UvBackend, _upgrade_packages
+
+
+@pytest.fixture
+def uv(monkeypatch):
+    """Returns a uv backend, whatever the uv installation.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): The pytest monkeypatch fixture.
+
+    Returns:
+        UvBackend: The backend, with "uv" as executable.
+    """
+    monkeypatch.setattr(UvBackend, "executable", staticmethod(lambda: "uv"))
+    return UvBackend()
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (
+            ("--upgrade", "populse_mia", "capsul>=3"),
+            [
+                "populse_mia",
+                "capsul>=3",
+                "--upgrade-package",
+                "populse_mia",
+                "--upgrade-package",
+                "capsul",
+            ],
+        ),
+        (
+            ("-U", "-f", "/wheels", "/build/soma_base-5.2-py3-none-any.whl"),
+            [
+                "-f",
+                "/wheels",
+                "/build/soma_base-5.2-py3-none-any.whl",
+                "--upgrade-package",
+                "soma_base",
+            ],
+        ),
+        (
+            ("--upgrade", "--no-deps", "-r", "mia.lock"),
+            ["--no-deps", "-r", "mia.lock"],
+        ),
+        (
+            ("--upgrade", "--index-url", "https://index", "mia.processes"),
+            [
+                "--index-url",
+                "https://index",
+                "mia.processes",
+                "--upgrade-package",
+                "mia.processes",
+            ],
+        ),
+    ],
+    ids=["requirements", "local wheel", "requirements file", "index"],
+)
+def test_upgrade_packages(args, expected):
+    """Only the requirements themselves are upgraded, not the values of
+    the options.
+
+    Args:
+        args (tuple): The arguments of a pip install command.
+        expected (list): The arguments of the uv install command.
+    """
+    assert _upgrade_packages(args) == expected
+
+
+def test_uv_install_command(uv):
+    """The install commands are run by uv, for the current interpreter."""
+    assert uv.command("install", "--upgrade", "populse_mia") == [
+        "uv",
+        "pip",
+        "install",
+        "--python",
+        sys.executable,
+        "populse_mia",
+        "--upgrade-package",
+        "populse_mia",
+    ]
+    assert uv.command("uninstall", "capsul") == [
+        "uv",
+        "pip",
+        "uninstall",
+        "--python",
+        sys.executable,
+        "capsul",
+    ]
+
+
+@pytest.mark.parametrize(
+    "command, args",
+    [
+        ("wheel", ("--no-deps", "/src/capsul")),
+        ("install", ("--dry-run", "--report", "-", "populse_mia")),
+    ],
+    ids=["wheel", "report"],
+)
+def test_uv_pip_commands(uv, command, args):
+    """The commands uv does not provide are run by pip.
+
+    Args:
+        uv (UvBackend): See the `uv` fixture.
+        command (str): The pip command.
+        args (tuple): Its arguments.
+    """
+    line = uv.command(command, *args)
+    assert line[:4] == [sys.executable, "-m", "pip", command]
+    assert [arg for arg in line[4:] if arg != "--user"] == list(args)
@@ -0,0 +1,132 @@
+"""The fixtures shared by the tests of the installer.
+
+No test accesses the network: the installer's home and cache folders are
+temporary folders, and the steps which would download or install packages
+are replaced by local stand-ins (see `stub_steps`).
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import os
+from collections import Counter
+
+import pytest
+
+from mia_install_engine import MIAInstaller
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Gives each test its own home folder and installer cache.
+
+    Args:
+        tmp_path (pathlib.Path): The temporary folder of the test.
+        monkeypatch (pytest.MonkeyPatch): The pytest monkeypatch fixture.
+
+    Returns:
+        pathlib.Path: The home folder.
+    """
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("MIA_INSTALL_CACHE", str(tmp_path / "cache"))
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    return home
+
+
+@pytest.fixture
+def answers(tmp_path):
+    """Returns the answers of an installation in the temporary folder.
+
+    Args:
+        tmp_path (pathlib.Path): The temporary folder of the test.
+
+    Returns:
+        dict: The installation parameters (see DEFAULT_ANSWERS).
+    """
+    return {
+        "mia_config_path": str(tmp_path / "mia"),
+        "projects_path": str(tmp_path / "projects"),
+        "backend": "pip",
+        "existing_folders": {
+            "projects_mia": "keep",
+            "mri_conv": "overwrite",
+            "miaresources": "overwrite",
+        },
+    }
+
+
+@pytest.fixture
+def stub_steps(monkeypatch):
+    """Replaces the network, package and populse_mia operations of the
+    installation steps by local stand-ins.
+
+    The git clones create empty folders, the configuration steps write a
+    config.yml file, and the package steps only record their runs. The pip
+    transaction fails with the errors put in the returned "package_errors"
+    dictionary, if any.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): The pytest monkeypatch fixture.
+
+    Returns:
+        dict: The number of runs of each replaced method ("runs", a
+              collections.Counter), and the package errors of the next pip
+              transactions ("package_errors").
+    """
+    stubs = {"runs": Counter(), "package_errors": dict()}
+
+    def write_config_file(installer, text):
+        """Writes the config.yml file of the properties folder."""
+        os.makedirs(installer.properties_dir, exist_ok=True)
+
+        with open(
+            os.path.join(installer.properties_dir, "config.yml"), "w"
+        ) as stream:
+            stream.write(text)
+
+    def install_requirements(installer):
+        """Fails with the package errors of the test, if any."""
+        installer.package_errors.update(stubs["package_errors"])
+        return not installer.package_errors
+
+    actions = {
+        "require_populse_mia": None,
+        "build_soma_wheels": None,
+        "require_matlab_api": None,
+        "install_requirements": install_requirements,
+        "init_properties_folder": lambda installer: write_config_file(
+            installer, "initialized"
+        ),
+        "write_config": lambda installer: write_config_file(
+            installer, "configured"
+        ),
+        "make_mrifilemanager_folder": lambda installer, path: os.makedirs(
+            path
+        ),
+        "clone_miaResources": lambda installer, path: os.makedirs(path),
+        "write_configuration_path": None,
+    }
+
+    def stub(name, action):
+        """Returns a method recording its runs, then running the action."""
+
+        def method(installer, *args):
+            """Runs the stand-in of a method."""
+            stubs["runs"][name] += 1
+
+            if action is not None:
+                return action(installer, *args)
+
+        return method
+
+    for name, action in actions.items():
+        monkeypatch.setattr(MIAInstaller, name, stub(name, action))
+
+    return stubs
@@ -0,0 +1,69 @@
+"""Tests of the least recently used eviction of the git mirror cache (see
+`mia_install_git.evict_mirrors`)."""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import os
+
+from mia_install_git import evict_mirrors
+from mia_install_utils import cache_dir
+
+
+def make_mirror(name, size, mtime):
+    """Creates a fake mirror in the git cache.
+
+    Args:
+        name (str): The folder name of the mirror.
+        size (int): The size of its single file, in bytes.
+        mtime (int): Its modification time, i.e. its last use.
+
+    Returns:
+        str: The path of the mirror.
+    """
+    path = os.path.join(cache_dir("git"), name)
+    os.makedirs(os.path.join(path, "objects"))
+
+    with open(os.path.join(path, "objects", "pack"), "wb") as stream:
+        stream.write(b"\0" * size)
+
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_cache_in_environment_folder(tmp_path):
+    """The cache is located in the folder given by MIA_INSTALL_CACHE."""
+    assert cache_dir("git") == str(tmp_path / "cache" / "git")
+
+
+def test_evict_least_recently_used():
+    """The least recently used mirrors are evicted until the cache fits
+    in its maximum size."""
+    oldest = make_mirror("oldest.git", 1000, 1000)
+    old = make_mirror("old.git", 1000, 2000)
+    recent = make_mirror("recent.git", 1000, 3000)
+    assert evict_mirrors(1500) == [oldest, old]
+    assert not os.path.exists(oldest)
+    assert not os.path.exists(old)
+    assert os.path.isdir(recent)
+
+
+def test_evict_nothing_under_max_size():
+    """No mirror is evicted while the cache fits in its maximum size."""
+    mirrors = [make_mirror(f"{name}.git", 1000, 1000) for name in "ab"]
+    assert evict_mirrors(2000) == []
+    assert all(map(os.path.isdir, mirrors))
+
+
+def test_evict_only_mirrors():
+    """The other folders of the cache (e.g. an interrupted clone) are not
+    counted nor evicted."""
+    mirror = make_mirror("repository.git", 1000, 1000)
+    partial = make_mirror("repository.git.1234.partial", 5000, 500)
+    assert evict_mirrors(0) == [mirror]
+    assert os.path.isdir(partial)
@@ -0,0 +1,95 @@
+"""Tests of the resumption of an interrupted installation from its journal
+(see `MIAInstaller.completed_steps`)."""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import json
+import os
+import shutil
+
+from mia_install_engine import MIAInstaller
+
+
+def journal_steps(installer):
+    """Returns the steps recorded in the journal of an installation.
+
+    Args:
+        installer (MIAInstaller): The installer.
+
+    Returns:
+        list: The sorted names of the recorded steps.
+    """
+
+    with open(installer.journal_file, encoding="utf8") as stream:
+        return sorted(json.load(stream)["steps"])
+
+
+def interrupted_install(answers, stub_steps):
+    """Runs an installation whose pip transaction fails.
+
+    Args:
+        answers (dict): The installation parameters.
+        stub_steps (dict): See the `stub_steps` fixture.
+
+    Returns:
+        MIAInstaller: The installer of the interrupted installation.
+    """
+    stub_steps["package_errors"]["capsul"] = "No matching distribution"
+    installer = MIAInstaller(answers, log=lambda message: None)
+    assert installer.install() is False
+    stub_steps["package_errors"].clear()
+    stub_steps["runs"].clear()
+    return installer
+
+
+def test_package_error_is_not_journaled(answers, stub_steps):
+    """A pip transaction with package errors is left incomplete, while
+    the independent steps are journaled."""
+    installer = interrupted_install(answers, stub_steps)
+    steps = journal_steps(installer)
+    assert "pip_install" not in steps
+    assert {"properties", "projects", "mri_conv", "miaresources"} <= set(steps)
+
+
+def test_resume_runs_incomplete_steps(answers, stub_steps):
+    """The resumed installation only runs the incomplete steps, and the
+    steps whose result they use, then deletes the journal."""
+    interrupted_install(answers, stub_steps)
+    messages = []
+    installer = MIAInstaller(answers, log=messages.append)
+    assert installer.install() is True
+    assert any(message.startswith("Resuming") for message in messages)
+    assert stub_steps["runs"] == {
+        "require_populse_mia": 1,
+        "build_soma_wheels": 1,
+        "require_matlab_api": 1,
+        "install_requirements": 1,
+        "write_config": 1,
+    }
+    assert not os.path.exists(installer.journal_file)
+
+
+def test_resume_reruns_step_with_missing_output(answers, stub_steps):
+    """A journaled step is run again if its outputs have been deleted."""
+    installer = interrupted_install(answers, stub_steps)
+    shutil.rmtree(installer.mri_conv_path)
+    assert MIAInstaller(answers, log=lambda message: None).install()
+    assert stub_steps["runs"]["make_mrifilemanager_folder"] == 1
+    assert stub_steps["runs"]["clone_miaResources"] == 0
+
+
+def test_resume_reruns_step_with_changed_input(answers, stub_steps, tmp_path):
+    """A journaled step is run again if its inputs have changed."""
+    interrupted_install(answers, stub_steps)
+    answers["projects_path"] = str(tmp_path / "other_projects")
+    installer = MIAInstaller(answers, log=lambda message: None)
+    assert installer.install()
+    assert os.path.isdir(installer.projects_save_path)
+    assert stub_steps["runs"]["write_config"] == 1
+    assert stub_steps["runs"]["init_properties_folder"] == 0
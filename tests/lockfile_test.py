@@ -0,0 +1,226 @@
+"""Tests of the lockfiles (see `MIAInstaller.write_lockfile` and
+`MIAInstaller.require_populse_mia`).
+
+The locked distributions are fake ones, installed in a temporary folder
+added to `sys.path`, and their release files are taken from a local
+wheelhouse, so that no index is queried.
+"""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from mia_install_engine import MIAInstaller
+
+# The fake distributions: their version, requirements and whether they are
+# installed from a URL
+DISTRIBUTIONS = {
+    "mia-lock-root": (
+        "1.0",
+        [
+            "mia_lock_dep>=2",
+            "mia-lock-url",
+            'mia-lock-extra; extra == "doc"',
+            'mia-lock-other-os; sys_platform == "never"',
+            "mia-lock-absent",
+        ],
+        False,
+    ),
+    "mia-lock-dep": ("2.0", [], False),
+    "mia-lock-url": ("1.0", [], True),
+    "mia-lock-extra": ("1.0", [], False),
+    "mia-lock-other-os": ("1.0", [], False),
+}
+
+# The files of the wheelhouse
+RELEASE_FILES = (
+    "mia_lock_root-1.0-py3-none-any.whl",
+    "mia_lock_root-1.0.tar.gz",
+    "mia_lock_dep-2.0-py3-none-any.whl",
+    "mia_lock_dep-1.9-py3-none-any.whl",
+    "mia_lock_extra-1.0-py3-none-any.whl",
+)
+
+
+def install_distribution(site_packages, name, version, requires, url):
+    """Writes the metadata of a fake installed distribution.
+
+    Args:
+        site_packages (pathlib.Path): The folder of the distributions.
+        name (str): The name of the distribution.
+        version (str): Its version.
+        requires (list): Its requirements.
+        url (bool): Whether it is installed from a URL.
+    """
+
+    for dist_info in site_packages.glob(f"{name.replace('-', '_')}-*"):
+        shutil.rmtree(dist_info)
+
+    dist_info = site_packages / f"{name.replace('-', '_')}-{version}.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(
+        "\n".join(
+            [
+                "Metadata-Version: 2.1",
+                f"Name: {name}",
+                f"Version: {version}",
+                *(f"Requires-Dist: {line}" for line in requires),
+            ]
+        )
+        + "\n"
+    )
+
+    if url:
+        (dist_info / "direct_url.json").write_text(
+            '{"url": "file:///tmp/wheel.whl", "archive_info": {}}'
+        )
+
+
+@pytest.fixture
+def site_packages(tmp_path, monkeypatch):
+    """Installs the fake distributions in a folder added to `sys.path`.
+
+    Args:
+        tmp_path (pathlib.Path): The temporary folder of the test.
+        monkeypatch (pytest.MonkeyPatch): The pytest monkeypatch fixture.
+
+    Returns:
+        pathlib.Path: The folder of the distributions.
+    """
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+
+    for name, (version, requires, url) in DISTRIBUTIONS.items():
+        install_distribution(site_packages, name, version, requires, url)
+
+    monkeypatch.syspath_prepend(str(site_packages))
+    return site_packages
+
+
+@pytest.fixture
+def wheelhouse(tmp_path):
+    """Creates a wheelhouse with the release files.
+
+    Args:
+        tmp_path (pathlib.Path): The temporary folder of the test.
+
+    Returns:
+        pathlib.Path: The wheelhouse folder.
+    """
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+
+    for file_name in RELEASE_FILES:
+        (wheelhouse / file_name).write_text(file_name)
+
+    return wheelhouse
+
+
+@pytest.fixture
+def installer(answers, site_packages, wheelhouse, tmp_path):
+    """Returns an installer using the wheelhouse and a lockfile.
+
+    Args:
+        answers (dict): See the `answers` fixture.
+        site_packages (pathlib.Path): See the `site_packages` fixture.
+        wheelhouse (pathlib.Path): See the `wheelhouse` fixture.
+        tmp_path (pathlib.Path): The temporary folder of the test.
+
+    Returns:
+        MIAInstaller: The installer.
+    """
+    answers["wheelhouse"] = str(wheelhouse)
+    answers["lockfile"] = str(tmp_path / "locks" / "mia.lock")
+    return MIAInstaller(answers, log=lambda message: None)
+
+
+def locked_line(name, version, *file_names):
+    """Returns the line of a package in a lockfile.
+
+    Args:
+        name (str): The name of the package.
+        version (str): Its locked version.
+        *file_names (str): The files of its release in the wheelhouse.
+
+    Returns:
+        str: The pinned requirement, with the hashes of the files.
+    """
+    hashes = sorted(
+        hashlib.sha256(file_name.encode()).hexdigest()
+        for file_name in file_names
+    )
+    return " ".join(
+        [f"{name}=={version}"] + [f"--hash=sha256:{value}" for value in hashes]
+    )
+
+
+def test_write_lockfile(installer):
+    """The installed dependencies are locked with the hashes of all their
+    release files, except the ones installed from a URL, the extras which
+    are not requested and the ones of another platform."""
+    lockfile = installer.answers["lockfile"]
+    assert installer.write_lockfile(lockfile, ("mia-lock-root",)) == 2
+
+    with open(lockfile, encoding="utf8") as stream:
+        lines = [line.strip() for line in stream if not line.startswith("#")]
+
+    assert lines == [
+        locked_line("mia-lock-dep", "2.0", RELEASE_FILES[2]),
+        locked_line("mia-lock-root", "1.0", *RELEASE_FILES[:2]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "packages, message",
+    [
+        (("mia-lock-root", "mia-lock-absent"), "cannot be locked"),
+        (("mia-lock-url",), "No package to lock"),
+        (("mia-lock-other-os",), "are not found"),
+    ],
+    ids=["not installed", "only URLs", "no release files"],
+)
+def test_write_lockfile_errors(installer, packages, message):
+    """No lockfile is written when a package cannot be locked.
+
+    Args:
+        installer (MIAInstaller): See the `installer` fixture.
+        packages (tuple): The packages to lock.
+        message (str): A part of the expected error message.
+    """
+    lockfile = installer.answers["lockfile"]
+
+    with pytest.raises(ValueError, match=message):
+        installer.write_lockfile(lockfile, packages)
+
+    assert not os.path.exists(lockfile)
+
+
+def test_lockfile_up_to_date(installer):
+    """The locked packages installed at their locked version are
+    skipped."""
+    installer.write_lockfile(installer.answers["lockfile"], ("mia-lock-root",))
+    installer.require_populse_mia()
+    assert sorted(installer.skipped) == ["mia-lock-dep", "mia-lock-root"]
+    assert installer.requirements == dict()
+
+
+def test_lockfile_outdated(installer, site_packages):
+    """The locked packages which are not installed at their locked version
+    are required, with their hashes."""
+    installer.write_lockfile(installer.answers["lockfile"], ("mia-lock-root",))
+    install_distribution(site_packages, "mia-lock-dep", "1.9", [], False)
+    installer.require_populse_mia()
+    assert installer.skipped == ["mia-lock-root"]
+    assert installer.requirements == {
+        "populse_mia": [locked_line("mia-lock-dep", "2.0", RELEASE_FILES[2])]
+    }
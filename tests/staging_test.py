@@ -0,0 +1,112 @@
+"""Tests of the staged installations (see `MIAInstaller.commit_staging`
+and `MIAInstaller.rollback`)."""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import os
+
+import pytest
+
+from mia_install_engine import MIAInstaller
+
+
+@pytest.fixture
+def staged_answers(answers):
+    """Returns the answers of a staged installation over an existing
+    configuration folder.
+
+    The existing folder has a config.yml file containing "previous", and a
+    kept mri_conv folder.
+
+    Args:
+        answers (dict): See the `answers` fixture.
+
+    Returns:
+        dict: The installation parameters.
+    """
+    live = os.path.join(answers["mia_config_path"], "usr")
+    os.makedirs(os.path.join(live, "properties"))
+    os.makedirs(os.path.join(live, "mri_conv"))
+
+    with open(os.path.join(live, "properties", "config.yml"), "w") as stream:
+        stream.write("previous")
+
+    answers["staged"] = True
+    answers["existing_folders"]["mri_conv"] = "keep"
+    return answers
+
+
+def read_config(usr):
+    """Returns the content of the config.yml file of a configuration folder.
+
+    Args:
+        usr (str): The configuration folder.
+
+    Returns:
+        str: The content of the file.
+    """
+
+    with open(os.path.join(usr, "properties", "config.yml")) as stream:
+        return stream.read()
+
+
+def test_commit_staging(staged_answers, stub_steps):
+    """The staging folder replaces the configuration folder once all the
+    steps are completed, and the replaced folder is kept."""
+    installer = MIAInstaller(staged_answers, log=lambda message: None)
+    live = installer.live_properties_path
+    assert installer.properties_path != live
+    assert installer.install() is True
+    assert read_config(live) == "configured"
+    assert read_config(f"{live}.previous") == "previous"
+    assert os.path.isdir(os.path.join(live, "mri_conv"))
+    assert os.path.isdir(os.path.join(live, "miaresources"))
+    assert not os.path.exists(installer.staging_path)
+
+
+def test_incomplete_staging_not_committed(staged_answers, stub_steps):
+    """An incomplete staged installation leaves the configuration folder
+    untouched, and keeps its staging folder for the resumption."""
+    stub_steps["package_errors"]["capsul"] = "No matching distribution"
+    installer = MIAInstaller(staged_answers, log=lambda message: None)
+    assert installer.install() is False
+    assert read_config(installer.live_properties_path) == "previous"
+    assert not os.path.exists(f"{installer.live_properties_path}.previous")
+    assert read_config(installer.properties_path) == "configured"
+
+    stub_steps["package_errors"].clear()
+    installer = MIAInstaller(staged_answers, log=lambda message: None)
+    assert installer.install() is True
+    assert read_config(installer.live_properties_path) == "configured"
+    assert stub_steps["runs"]["init_properties_folder"] == 1
+
+
+def test_rollback(staged_answers, stub_steps):
+    """A rollback swaps the current and the previous configuration
+    folders, moving back the kept folders, and can itself be undone."""
+    installer = MIAInstaller(staged_answers, log=lambda message: None)
+    assert installer.install()
+    live = installer.live_properties_path
+
+    assert installer.rollback() is True
+    assert read_config(live) == "previous"
+    assert read_config(f"{live}.previous") == "configured"
+    assert os.path.isdir(os.path.join(live, "mri_conv"))
+    assert not os.path.exists(os.path.join(f"{live}.previous", "mri_conv"))
+    assert stub_steps["runs"]["write_configuration_path"] == 2
+
+    assert installer.rollback() is True
+    assert read_config(live) == "configured"
+    assert read_config(f"{live}.previous") == "previous"
+
+
+def test_rollback_without_previous_folder(answers):
+    """There is nothing to roll back before a staged installation."""
+    installer = MIAInstaller(answers, log=lambda message: None)
+    assert installer.rollback() is False
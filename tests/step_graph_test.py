@@ -0,0 +1,153 @@
+"""Tests of `mia_install_engine.run_step_graph`."""
+
+###############################################################################
+# Populse_mia - Copyright (C) IRMaGe/CEA, 2018
+# Distributed under the terms of the CeCILL license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL_V2.1-en.html
+# for details.
+###############################################################################
+
+import threading
+import time
+
+import pytest
+
+from mia_install_engine import run_step_graph
+
+
+def step(run, after=(), site_packages=False):
+    """Returns a step of a graph (see `MIAInstaller.install_steps`).
+
+    Args:
+        run (callable): The function of the step.
+        after (tuple): The names of the steps it depends on.
+        site_packages (bool): Whether the step uses site-packages.
+
+    Returns:
+        dict: The step.
+    """
+    return {
+        "run": run,
+        "after": after,
+        "site_packages": site_packages,
+        "groups": (),
+        "inputs": (),
+        "outputs": None,
+    }
+
+
+def fail(message, delay=0):
+    """Returns the function of a step which fails.
+
+    Args:
+        message (str): The message of the raised RuntimeError.
+        delay (float): The time spent before failing, in seconds.
+
+    Returns:
+        callable: The function of the step.
+    """
+
+    def run():
+        """Raises the RuntimeError."""
+        time.sleep(delay)
+        raise RuntimeError(message)
+
+    return run
+
+
+def test_dependencies_run_first():
+    """A step is only run once all the steps it depends on are done."""
+    order = []
+    steps = {
+        "config": step(lambda: order.append("config"), ("a", "b")),
+        "a": step(lambda: order.append("a")),
+        "b": step(lambda: order.append("b")),
+    }
+    done = []
+    run_step_graph(steps, done.append)
+    assert order[-1] == "config"
+    assert sorted(order) == ["a", "b", "config"]
+    assert done[-1] == "config"
+
+
+def test_failure_completes_independent_steps():
+    """A failure only skips the steps which depend on the failed step."""
+    ran = []
+    steps = {
+        "clone": step(fail("network down")),
+        "build": step(lambda: ran.append("build"), ("clone",)),
+        "folders": step(lambda: ran.append("folders")),
+    }
+    done = []
+
+    with pytest.raises(RuntimeError, match="network down"):
+        run_step_graph(steps, done.append)
+
+    assert ran == ["folders"]
+    assert done == ["folders"]
+
+
+def test_first_error_in_step_order():
+    """The error of the first failed step, in the order of the steps, is
+    raised, whatever the step which fails first."""
+    steps = {
+        "slow": step(fail("slow failure", delay=0.2)),
+        "fast": step(fail("fast failure")),
+    }
+
+    with pytest.raises(RuntimeError, match="slow failure"):
+        run_step_graph(steps)
+
+
+def test_site_packages_steps_serialized():
+    """At most one of the steps using site-packages runs at any time."""
+    lock = threading.Lock()
+    running = []
+    overlaps = []
+
+    def use_site_packages():
+        """Records whether another step uses site-packages meanwhile."""
+
+        with lock:
+            overlaps.append(bool(running))
+            running.append(1)
+
+        time.sleep(0.05)
+
+        with lock:
+            running.pop()
+
+    steps = {
+        name: step(use_site_packages, site_packages=True)
+        for name in ("pip_install", "config", "matlab")
+    }
+    run_step_graph(steps)
+    assert overlaps == [False, False, False]
+
+
+@pytest.mark.parametrize(
+    "after",
+    [
+        {"a": ("b",), "b": ("a",)},
+        {"a": ("a",), "b": ()},
+        {"a": ("missing",), "b": ()},
+    ],
+    ids=["cycle", "self", "unknown"],
+)
+def test_unrunnable_graph(after):
+    """A cyclic or unknown dependency is reported before any step runs.
+
+    Args:
+        after (dict): The dependencies of each step.
+    """
+    ran = []
+    steps = {
+        name: step(lambda name=name: ran.append(name), names)
+        for name, names in after.items()
+    }
+
+    with pytest.raises(ValueError, match="cyclic dependencies"):
+        run_step_graph(steps)
+
+    assert ran == []